@@ -0,0 +1,399 @@
+"""
+ASGI entry point: the same app with LLM waits awaited instead of holding a
+worker thread for each assessment.
+
+POST / and POST /stream are served by async handlers that await the async
+OpenAI client (or the replay backend), so one process can hold hundreds of
+assessments in flight. They run inside a Flask request context, with the
+same session cookie, templates, scoring and stores as the routes in main.py;
+the blocking store, cache and history calls run on threads.
+Every other route is handed to the Flask app unchanged, on a thread.
+
+The WSGI app in main.py stays the default; pick a mode when starting:
+
+    gunicorn main:app                          # sync (WSGI)
+    uvicorn asgi:app --workers 2               # async (ASGI, poetry install -E asgi)
+
+In ASGI mode POST / always runs the assessment inside the request: waiting
+costs no thread, so the background job queue is not used. POST /stream does
+not take a slot from assessment_queue.reserve() either, so nothing caps the
+number of LLM streams in flight; only the LLM rate governor (LLM_GOVERNOR)
+limits them.
+"""
+import asyncio
+import io
+import sys
+
+from flask import Response, redirect, request, session, url_for
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from llm_backends import Completion
+from main import (
+    COALESCE_ASSESSMENTS,
+    INDEPENDENT_SECTIONS,
+    PARALLEL_SECTIONS,
+    SSE_HEADERS,
+    TRUSTED_PROXY_HOPS,
+    AssessmentStreamParser,
+    assessment_cache_key,
+    backend,
+    build_assessment_input,
+    build_messages,
+    cached_assessment,
+    coalesced,
+    complete_assessment,
+    completion_options,
+    drafted_sections,
+    finish_streamed_assessment,
+    gate_messages,
+    governor_request,
+    immediate_stream_response,
+    lead_assessment,
+    llm_governor,
+    merged_completion,
+    observe_prompt_usage,
+    observe_provider_usage,
+    observe_reassessment,
+    planned_calls,
+    reassessment_plan,
+    save_assessment_error,
+    section_messages,
+    settle_assessment,
+    single_flight,
+    span,
+    sse_event,
+    start_streamed_assessment,
+    store_assessment,
+    store_assessment_error,
+    store_config_error,
+    stream_cancelled,
+    tenant_id,
+    too_many_requests,
+    whole_stream_response,
+)
+from main import app as flask_app
+from rate_governor import RateLimited
+
+
+class AsyncStreamingResponse(Response):
+    """Response whose body is an async iterator of text, sent by the ASGI handler."""
+
+    def __init__(self, body, **kwargs):
+        super().__init__(**kwargs)
+        self.async_body = body
+
+
+async def generate_sections(user_input):
+    """Async twin of main.generate_sections: the independent sections are gathered."""
+    completions = await asyncio.gather(*(
+        backend.acomplete(section_messages(number, user_input), temperature=0.2)
+        for number in INDEPENDENT_SECTIONS
+    ))
+    drafted = drafted_sections({
+        number: completion.text
+        for number, completion in zip(INDEPENDENT_SECTIONS, completions, strict=True)
+    })
+    gate = await backend.acomplete(gate_messages(user_input, drafted), temperature=0.2)
+    return merged_completion(drafted, [*completions, gate])
+
+
+async def reassess(assessment, plan):
+    """Async twin of main.reassess: the stale sections are gathered."""
+    observe_reassessment(plan)
+    if not plan["stale"]:
+        return Completion(plan["raw_result"])
+    user_input = assessment["user_input"]
+    completions = await asyncio.gather(*(
+        backend.acomplete(section_messages(number, user_input), temperature=0.2)
+        for number in plan["stale"]
+    ))
+    fresh = {number: completion.text
+             for number, completion in zip(plan["stale"], completions, strict=True)}
+    drafted = drafted_sections({**plan["sections"], **fresh})
+    gate = await backend.acomplete(gate_messages(user_input, drafted), temperature=0.2)
+    return merged_completion(drafted, [*completions, gate])
+
+
+async def run_assessment(assessment):
+    """Async twin of main.run_assessment; awaits identical assessments in flight."""
+    if not COALESCE_ASSESSMENTS:
+        return await generate_assessment(assessment)
+    return coalesced(*await single_flight.ado(
+        assessment_cache_key(assessment["user_input"]),
+        lambda: generate_assessment(assessment),
+        lambda: cached_assessment(assessment),
+    ))
+
+
+async def admit_assessment(assessment, calls=1):
+    """Async twin of main.admit_assessment: waiting for the governor is awaited."""
+    if llm_governor is None or not calls:
+        return None
+    with span("rate_limit_wait"):
+        return await llm_governor.aadmit(*governor_request(assessment, calls))
+
+
+async def generate_assessment(assessment):
+    """Async twin of main.generate_assessment: awaits the LLM, scores on a thread."""
+    observe_prompt_usage(assessment)
+    plan = await asyncio.to_thread(reassessment_plan, assessment)
+    grant = await admit_assessment(assessment, planned_calls(plan))
+    with span("llm_wait"):
+        if plan is not None:
+            completion = await reassess(assessment, plan)
+        elif PARALLEL_SECTIONS:
+            completion = await generate_sections(assessment["user_input"])
+        else:
+            completion = await backend.acomplete(
+                build_messages(assessment["user_input"]), temperature=0.2,
+                **completion_options()
+            )
+    await asyncio.to_thread(settle_assessment, grant, completion.usage)
+    # Parsing may re-ask for tiers with a blocking call, so it runs off the event loop
+    return await asyncio.to_thread(complete_assessment, assessment, completion)
+
+
+async def assess():
+    """POST / (see main.index): run the assessment and redirect to its permalink."""
+    if not backend:
+        await asyncio.to_thread(store_config_error)
+        return redirect(url_for('results'))
+
+    with span("build_input"):
+        assessment = build_assessment_input(request.form)
+    assessment["previous_id"] = session.get('assessment_id')
+    assessment["tenant"] = tenant_id()
+
+    # The stores, caches and history are SQLite (or Redis), so they're used from threads
+    outcome = await asyncio.to_thread(cached_assessment, assessment)
+    if outcome is None:
+        try:
+            outcome = await run_assessment(assessment)
+        except RateLimited as e:
+            return too_many_requests(str(e), e.retry_after, assessment)
+        except Exception as e:
+            assessment_id = await asyncio.to_thread(
+                store_assessment_error, assessment, e
+            )
+            return redirect(url_for('assessment_results', assessment_id=assessment_id))
+    assessment_id = await asyncio.to_thread(store_assessment, assessment, outcome)
+    return redirect(url_for('assessment_results', assessment_id=assessment_id))
+
+
+async def stream():
+    """POST /stream (see main.stream) with the model's deltas awaited."""
+    assessment = build_assessment_input(request.form)
+    assessment["previous_id"] = session.get('assessment_id')
+    assessment["tenant"] = tenant_id()
+    # Cache and history lookups block, and structured output, re-assessments and
+    # waits for an identical assessment already in flight are handled whole with
+    # blocking calls, so all of it runs on a thread
+    response = await asyncio.to_thread(immediate_stream_response, assessment)
+    if response is not None:
+        return response
+    flight = await asyncio.to_thread(lead_assessment, assessment)
+    if flight is None and COALESCE_ASSESSMENTS:
+        # An identical assessment started since the check above; wait for it instead
+        return await asyncio.to_thread(whole_stream_response, assessment)
+    assessment_id, results_url = start_streamed_assessment()
+
+    async def generate():
+        parser = AssessmentStreamParser()
+        try:
+            observe_prompt_usage(assessment)
+            grant = await admit_assessment(assessment)
+            usage = []
+
+            def on_usage(reported):
+                observe_provider_usage(reported)
+                usage.append(reported)
+
+            deltas = backend.astream(build_messages(assessment["user_input"]),
+                                     temperature=0.2, on_usage=on_usage)
+            with span("llm_stream"):
+                async for delta in deltas:
+                    for event, data in parser.feed(delta):
+                        yield sse_event(event, data)
+            if usage:
+                await asyncio.to_thread(settle_assessment, grant, usage[-1])
+            events, raw_result = parser.close()
+            for event, data in events:
+                yield sse_event(event, data)
+            yield await asyncio.to_thread(finish_streamed_assessment, assessment,
+                                          assessment_id, raw_result, flight)
+        except Exception as e:
+            await asyncio.to_thread(save_assessment_error, assessment, e, assessment_id)
+            if flight is not None:
+                await asyncio.to_thread(flight.fail, e)
+        finally:
+            # The client went away mid-stream: don't leave identical submissions waiting
+            if flight is not None and not flight.settled:
+                await asyncio.to_thread(flight.fail, stream_cancelled())
+        yield sse_event("done", {"redirect": results_url})
+
+    return AsyncStreamingResponse(generate(), mimetype="text/event-stream",
+                                  headers=SSE_HEADERS)
+
+
+ASYNC_ROUTES = {
+    ("POST", "/"): assess,
+    ("POST", "/stream"): stream,
+}
+
+
+# ---------- ASGI <-> Flask plumbing ----------
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def wsgi_environ(scope, body):
+    """Build the WSGI environ Flask expects from an ASGI HTTP scope."""
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def response_start(status, headers):
+    return {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers],
+    }
+
+
+async def dispatch(view, environ, send):
+    """
+    Run an async view the way Flask runs a sync one: before_request hooks,
+    error handlers, after_request hooks and the session cookie all apply.
+    """
+    if TRUSTED_PROXY_HOPS:
+        # Async views skip app.wsgi_app, so apply its ProxyFix to the environ here
+        ProxyFix(lambda _environ, _start_response: [],
+                 x_for=TRUSTED_PROXY_HOPS)(environ, None)
+    with flask_app.request_context(environ):
+        try:
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    rv = await view()
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(rv)
+        except Exception as e:
+            response = flask_app.handle_exception(e)
+
+        await send(response_start(response.status_code, response.headers.items()))
+        # The context stays pushed while streaming so logs keep the request's trace ID
+        async_body = getattr(response, "async_body", None)
+        if async_body is not None:
+            async for chunk in async_body:
+                await send({"type": "http.response.body", "body": chunk.encode("utf-8"),
+                            "more_body": True})
+        else:
+            try:
+                for chunk in response.iter_encoded():
+                    await send({"type": "http.response.body", "body": chunk,
+                                "more_body": True})
+            finally:
+                response.close()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def call_wsgi(environ, send):
+    """Run the Flask app for one request on a thread, relaying its response."""
+    loop = asyncio.get_running_loop()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        # An error raised after the headers went out can't replace them (PEP 3333)
+        if exc_info is not None and started.get("sent"):
+            raise exc_info[1].with_traceback(exc_info[2])
+        started["message"] = response_start(int(status.split(" ", 1)[0]), headers)
+
+    def relay(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def relay_start():
+        if "message" in started:
+            relay(started.pop("message"))
+            started["sent"] = True
+
+    def run():
+        result = flask_app(environ, start_response)
+        try:
+            for chunk in result:
+                relay_start()
+                if chunk:
+                    relay({"type": "http.response.body", "body": chunk,
+                           "more_body": True})
+            relay_start()
+            relay({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+    await asyncio.to_thread(run)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    environ = wsgi_environ(scope, await read_body(receive))
+    view = ASYNC_ROUTES.get((environ["REQUEST_METHOD"], environ["PATH_INFO"]))
+    if view is not None:
+        await dispatch(view, environ, send)
+    else:
+        await call_wsgi(environ, send)
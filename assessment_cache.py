@@ -0,0 +1,154 @@
+"""
+Content-addressed cache for LLM assessment results.
+
+Entries live in an in-memory LRU and, when a database path is configured, in
+an on-disk SQLite tier that survives restarts and is shared between gunicorn
+workers on the same machine.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def normalize_prompt(text):
+    """Normalize a prompt so whitespace and case edits hash to the same key."""
+    lines = (re.sub(r'\s+', ' ', line).strip() for line in text.lower().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def fingerprint(*parts):
+    """Hash any JSON-serializable values into a stable hex digest."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AssessmentCache:
+    """
+    Two-tier TTL cache of assessment results keyed by content hash.
+
+    Args:
+        max_entries: Maximum entries kept in memory (least recently used go first)
+        ttl_seconds: How long an entry stays valid in either tier
+        db_path: Optional SQLite file for the on-disk tier
+        max_db_entries: Maximum rows kept in the SQLite tier
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=86400, db_path=None,
+                 max_db_entries=10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_db_entries = max_db_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS assessment_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS assessment_cache_accessed "
+                    "ON assessment_cache (accessed)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expiry."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created < self.ttl_seconds:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+
+        stored = self._db_get(key, now)
+        with self.lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            value, created = stored
+            self.hits += 1
+            self._remember(key, value, created)
+        return value
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under key in both tiers."""
+        now = time.time()
+        with self.lock:
+            self._remember(key, value, now)
+        self._db_set(key, value, now)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM assessment_cache")
+
+    def _remember(self, key, value, created):
+        self.entries[key] = (created, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _db_get(self, key, now):
+        if not self.db_path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created FROM assessment_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl_seconds:
+                conn.execute("DELETE FROM assessment_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE assessment_cache SET accessed = ? WHERE key = ?",
+                         (now, key))
+        return json.loads(row[0]), row[1]
+
+    def _db_set(self, key, value, now):
+        if not self.db_path:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO assessment_cache "
+                "(key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute(
+                "DELETE FROM assessment_cache WHERE created < ?",
+                (now - self.ttl_seconds,)
+            )
+            conn.execute(
+                "DELETE FROM assessment_cache WHERE key IN (SELECT key FROM "
+                "assessment_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_db_entries,),
+            )
@@ -0,0 +1,216 @@
+"""
+Persistent, queryable history of finished assessments.
+
+Every assessment is written once to SQLite with its inputs, raw model output,
+tiers, score and vendor IDs, and can be served again by ID without re-running
+the model. Listing uses keyset pagination over covering indexes so it stays
+fast at hundreds of thousands of records.
+"""
+import json
+import math
+import sqlite3
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    system_name TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    user_input TEXT NOT NULL,
+    raw_result TEXT NOT NULL,
+    result_html TEXT NOT NULL,
+    tiers TEXT,
+    overall_score INTEGER,
+    recommendation TEXT,
+    vendor_risk_score INTEGER,
+    prompt_fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS assessments_created ON assessments (created DESC, id DESC);
+CREATE INDEX IF NOT EXISTS assessments_score
+    ON assessments (overall_score, created DESC, id DESC);
+CREATE INDEX IF NOT EXISTS assessments_recommendation
+    ON assessments (recommendation, created DESC, id DESC);
+CREATE TABLE IF NOT EXISTS assessment_vendors (
+    vendor_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    assessment_id TEXT NOT NULL REFERENCES assessments (id) ON DELETE CASCADE,
+    PRIMARY KEY (vendor_id, created, assessment_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assessment_vendors_assessment
+    ON assessment_vendors (assessment_id);
+"""
+
+SUMMARY_COLUMNS = (
+    "id, created, system_name, overall_score, recommendation, vendor_risk_score"
+)
+
+
+def parse_cursor(cursor):
+    """
+    Split a next_cursor into its (created, id) position.
+
+    Raises:
+        ValueError: If the cursor wasn't produced by list()
+    """
+    created, separator, assessment_id = cursor.partition(":")
+    try:
+        created = float(created)
+    except ValueError:
+        created = None
+    if (not separator or not assessment_id or created is None
+            or not math.isfinite(created)):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created, assessment_id
+
+
+class AssessmentHistory:
+    """
+    SQLite-backed assessment archive.
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"]
+                       for row in conn.execute("PRAGMA table_info(assessments)")}
+            # Databases created before fingerprints were stored
+            if "prompt_fingerprint" not in columns:
+                conn.execute(
+                    "ALTER TABLE assessments ADD COLUMN prompt_fingerprint TEXT"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, assessment_id, record):
+        """
+        Persist a finished assessment.
+
+        Args:
+            assessment_id: Stable ID used in permalinks
+            record: Dict with system_name, inputs, user_input, raw_result,
+                result_html, tiers, scores, recommendation, vendor_ids,
+                vendor_risk_score and prompt_fingerprint (the model and
+                prompts that wrote raw_result)
+        """
+        created = record.get("created") or time.time()
+        scores = record.get("scores") or {}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO assessments (id, created, system_name, inputs, "
+                "user_input, raw_result, result_html, tiers, overall_score, "
+                "recommendation, vendor_risk_score, prompt_fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    assessment_id,
+                    created,
+                    record.get("system_name") or "",
+                    json.dumps(record.get("inputs") or {}),
+                    record.get("user_input") or "",
+                    record.get("raw_result") or "",
+                    record.get("result_html") or "",
+                    json.dumps(record["tiers"]) if record.get("tiers") else None,
+                    scores.get("overall_score"),
+                    record.get("recommendation"),
+                    record.get("vendor_risk_score"),
+                    record.get("prompt_fingerprint"),
+                ),
+            )
+            conn.execute("DELETE FROM assessment_vendors WHERE assessment_id = ?",
+                         (assessment_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO assessment_vendors "
+                "(vendor_id, created, assessment_id) VALUES (?, ?, ?)",
+                [(vendor_id, created, assessment_id)
+                 for vendor_id in record.get("vendor_ids", [])],
+            )
+        return assessment_id
+
+    def get(self, assessment_id):
+        """Load a full assessment by ID, or None if it doesn't exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM assessments WHERE id = ?",
+                               (assessment_id,)).fetchone()
+            if row is None:
+                return None
+            vendor_ids = [vendor_row[0] for vendor_row in conn.execute(
+                "SELECT vendor_id FROM assessment_vendors WHERE assessment_id = ?",
+                (assessment_id,)
+            )]
+        record = dict(row)
+        record["inputs"] = json.loads(record["inputs"])
+        record["tiers"] = json.loads(record["tiers"]) if record["tiers"] else None
+        record["vendor_ids"] = vendor_ids
+        return record
+
+    def list(self, min_score=None, max_score=None, recommendation=None, vendor_id=None,
+             limit=25, cursor=None):
+        """
+        List assessment summaries, newest first.
+
+        Args:
+            min_score / max_score: Inclusive overall score range
+            recommendation: "GO", "GO WITH CONDITIONS" or "NO-GO"
+            vendor_id: Only assessments that matched this vendor
+            limit: Page size
+            cursor: Opaque cursor from the previous page's next_cursor
+
+        Returns:
+            Tuple of (list of summary dicts, next_cursor or None)
+
+        Raises:
+            ValueError: If cursor is malformed
+        """
+        if vendor_id:
+            source = (
+                "assessment_vendors v JOIN assessments a ON a.id = v.assessment_id",
+                "v.created", "v.assessment_id",
+            )
+            clauses, params = ["v.vendor_id = ?"], [vendor_id]
+        else:
+            source = ("assessments a", "a.created", "a.id")
+            clauses, params = [], []
+        table, created_col, id_col = source
+        if min_score is not None:
+            clauses.append("a.overall_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("a.overall_score <= ?")
+            params.append(max_score)
+        if recommendation:
+            clauses.append("a.recommendation = ?")
+            params.append(recommendation)
+        if cursor:
+            cursor_created, cursor_id = parse_cursor(cursor)
+            clauses.append(
+                f"({created_col} < ? OR ({created_col} = ? AND {id_col} < ?))"
+            )
+            params.extend([cursor_created, cursor_created, cursor_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ", ".join(f"a.{column.strip()}"
+                            for column in SUMMARY_COLUMNS.split(","))
+        query = (f"SELECT {columns} FROM {table} {where} "
+                 f"ORDER BY {created_col} DESC, {id_col} DESC LIMIT ?")
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(query, [*params, limit + 1])]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last['created']!r}:{last['id']}"
+        return rows, next_cursor
@@ -0,0 +1,248 @@
+"""
+Single-pass parser for assessment responses.
+
+The model is asked for six markdown sections followed by a fenced JSON block
+of tier classifications. Models don't always comply: the fence may be
+missing, carry no language tag or an extra backtick, share one line with the
+JSON, or the JSON may contain a backtick. This parser walks the response
+once, line by line, splitting it into sections 1-6 and the tier block, and
+validates the tiers against the scoring weights so a malformed block is
+detected instead of silently dropping the score.
+"""
+import json
+import re
+
+SECTION_TITLES = (
+    "SYSTEM INTAKE",
+    "PURPOSE & CONCEPT CLARITY",
+    "LEGAL & DATA FOUNDATIONS",
+    "STAKEHOLDER & IMPACT ASSESSMENT",
+    "IMPACT TRIAGE",
+    "FEASIBILITY GATE (GO / NO-GO)",
+)
+
+HEADING_RE = re.compile(r'^#{1,4}\s*(\d+)\.\s*(.*?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(`{3,}|~{3,})\s*([\w-]*)\s*$')
+# A whole block on one line: ```json {"external_impact": "High", ...}```
+INLINE_FENCE_RE = re.compile(
+    r'^\s*(`{3,}|~{3,})\s*([\w-]*)\s*(\{.*\})\s*(?:`{3,}|~{3,})\s*$'
+)
+
+
+class ParsedAssessment:
+    """
+    A model response split into its parts.
+
+    Attributes:
+        sections: List of (number, title, markdown) for each numbered section
+        display: Markdown shown to the user (the response minus the tier block)
+        tier_text: Raw text of the tier block, or None if none was found
+        tiers: Validated tier classifications, or None
+        problems: Reasons the tiers failed validation
+    """
+
+    def __init__(self, sections, display, tier_text, tiers, problems):
+        self.sections = sections
+        self.display = display
+        self.tier_text = tier_text
+        self.tiers = tiers
+        self.problems = problems
+
+
+def validate_tiers(candidate, weights):
+    """
+    Check tier classifications against the scoring weights.
+
+    Values are matched case-insensitively and normalised to the spelling used
+    in weights, so "medium" scores the same as "Medium".
+
+    Returns:
+        Tuple of (tiers dict or None, list of problems)
+    """
+    if not isinstance(candidate, dict):
+        return None, ["tier block is not a JSON object"]
+    tiers = {}
+    problems = []
+    for key, tier_map in weights.items():
+        value = candidate.get(key)
+        if not isinstance(value, str):
+            problems.append(f"missing {key}")
+            continue
+        allowed = {tier.lower(): tier for tier in tier_map}
+        tier = allowed.get(value.strip().lower())
+        if tier is None:
+            problems.append(f"{key} must be one of {'/'.join(tier_map)}, got {value!r}")
+            continue
+        tiers[key] = tier
+    return (tiers if not problems else None), problems
+
+
+def fenced_block(lines, start):
+    """
+    Read the code block opened at lines[start], if any.
+
+    A block is either a fence line (```json, ```, ````json, ~~~) closed by a
+    later line starting with the same fence character, or a whole block on
+    one line.
+
+    Returns:
+        (body, index of the closing line or None while the block is still
+        open), or None when lines[start] doesn't open a block
+    """
+    inline = INLINE_FENCE_RE.match(lines[start])
+    if inline:
+        return inline.group(3), start
+    fence = FENCE_RE.match(lines[start])
+    if not fence:
+        return None
+    marker = fence.group(1)[0] * 3
+    closing = next((j for j in range(start + 1, len(lines))
+                    if lines[j].strip().startswith(marker)), None)
+    end = len(lines) if closing is None else closing
+    return "\n".join(lines[start + 1:end]), closing
+
+
+def tier_candidate(text, weights):
+    """Parse text as a JSON object if it looks like a tier block."""
+    try:
+        candidate = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(candidate, dict) and any(key in candidate for key in weights):
+        return candidate
+    return None
+
+
+def bare_object(lines, start):
+    """
+    Read a JSON object written without a fence, starting at lines[start].
+
+    The object runs until the brace depth opened on its first line closes.
+
+    Returns:
+        (body, index of the closing line or None while the object is still
+        open), or None when lines[start] doesn't start with "{"
+    """
+    if not lines[start].lstrip().startswith("{"):
+        return None
+    depth = 0
+    for j in range(start, len(lines)):
+        depth += lines[j].count("{") - lines[j].count("}")
+        if depth <= 0:
+            return "\n".join(lines[start:j + 1]), j
+    return "\n".join(lines[start:]), None
+
+
+def parse_assessment(raw_result, weights):
+    """
+    Split a model response into sections, display markdown and validated tiers.
+
+    Args:
+        raw_result: Full model response
+        weights: GOVERNANCE_WEIGHTS; its keys and tiers define a valid block
+    """
+    lines = raw_result.splitlines()
+    display = []
+    sections = []
+    current = None
+    tier_text = None
+    candidate = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        block = fenced_block(lines, i) if candidate is None else None
+        # A fenced block (```json, ``` or ````json, or all on one line) holding
+        # the tiers
+        if block is not None:
+            body, closing = block
+            if closing is None:
+                closing = len(lines)
+            parsed = tier_candidate(body, weights)
+            if parsed is not None:
+                tier_text, candidate = body, parsed
+                i = closing + 1
+                continue
+            # Any other code block is part of the display, copied as-is
+            block = lines[i:closing + 1]
+            display.extend(block)
+            if current is not None:
+                current[2].extend(block)
+            i = closing + 1
+            continue
+        # A bare JSON object with no fence at all
+        obj = bare_object(lines, i) if candidate is None else None
+        if obj is not None:
+            body, closing = obj
+            parsed = tier_candidate(body, weights)
+            if parsed is not None:
+                tier_text, candidate = body, parsed
+                i = len(lines) if closing is None else closing + 1
+                continue
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            current = [int(heading.group(1)), heading.group(2), []]
+            sections.append(current)
+        if current is not None:
+            current[2].append(line)
+        display.append(line)
+        i += 1
+
+    tiers, problems = (validate_tiers(candidate, weights) if candidate is not None
+                       else (None, ["no tier block found"]))
+    sections = [(number, title, "\n".join(body).strip())
+                for number, title, body in sections]
+    # Drop a trailing horizontal rule left behind where the tier block was
+    while display and display[-1].strip() in ("", "---"):
+        display.pop()
+    return ParsedAssessment(sections, "\n".join(display), tier_text, tiers, problems)
+
+
+def structured_output_schema(weights):
+    """JSON schema for models that support structured (schema-enforced) output."""
+    section_keys = [f"section_{number}" for number in range(1, len(SECTION_TITLES) + 1)]
+    return {
+        "name": "governance_assessment",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["sections", "tiers"],
+            "properties": {
+                "sections": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": section_keys,
+                    "properties": {
+                        key: {"type": "string",
+                              "description": f"Markdown body of section {title}"}
+                        for key, title in zip(section_keys, SECTION_TITLES, strict=True)
+                    },
+                },
+                "tiers": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": list(weights),
+                    "properties": {key: {"type": "string", "enum": list(tier_map)}
+                                   for key, tier_map in weights.items()},
+                },
+            },
+        },
+    }
+
+
+def structured_to_markdown(payload):
+    """
+    Convert a structured-output response to the usual markdown-plus-JSON form.
+
+    Keeping one raw format means caching, history and rendering don't need to
+    know which mode produced a response.
+    """
+    data = json.loads(payload)
+    sections = data.get("sections", {})
+    parts = []
+    for number, title in enumerate(SECTION_TITLES, start=1):
+        body = (sections.get(f"section_{number}") or "").strip()
+        parts.append(f"### {number}. {title}\n{body}")
+    tiers = json.dumps(data.get("tiers", {}), indent=2)
+    return "\n\n".join(parts) + f"\n\n---\n\n```json\n{tiers}\n```\n"
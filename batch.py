@@ -0,0 +1,266 @@
+"""
+Batch assessment of a portfolio of AI concepts.
+
+Reads a CSV or JSONL file whose columns match the wizard's form fields, runs
+each row through the same prompt-build → LLM → tier-parse → score pipeline as
+the web form with bounded concurrency, and writes one JSONL result per row as
+soon as it finishes. Rows already written successfully to the output file are
+skipped on the next run, so an interrupted batch resumes where it stopped.
+
+    python batch.py concepts.csv -o results.jsonl --concurrency 4
+
+List fields (jurisdictions, safeguards, harm_pathways) are JSON arrays in
+JSONL input and semicolon-separated in CSV input.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from werkzeug.datastructures import MultiDict
+
+import main
+from llm_backends import is_retryable, retry_delay
+
+LIST_FIELDS = ("jurisdictions", "safeguards", "harm_pathways")
+
+
+class BatchInputError(ValueError):
+    """A batch file that can't be parsed; the message names the offending line."""
+
+
+def read_rows(stream, fmt):
+    """
+    Parse batch input into a list of row dicts.
+
+    Args:
+        stream: Text stream with the batch file contents
+        fmt: "csv" or "jsonl"
+
+    Raises:
+        BatchInputError: If the file isn't valid UTF-8 CSV/JSONL
+    """
+    if fmt == "jsonl":
+        return _read_jsonl(stream)
+    rows = []
+    reader = csv.DictReader(stream)
+    try:
+        if not reader.fieldnames:
+            raise BatchInputError("The CSV file is empty or has no header row.")
+        for row in reader:
+            if None in row:
+                raise BatchInputError(
+                    f"Line {reader.line_num}: more values than header columns."
+                )
+            for field in LIST_FIELDS:
+                if row.get(field):
+                    row[field] = [item.strip() for item in row[field].split(";")
+                                  if item.strip()]
+            rows.append(row)
+    except csv.Error as e:
+        raise BatchInputError(f"Line {reader.line_num}: {e}") from e
+    except UnicodeDecodeError as e:
+        raise BatchInputError(
+            f"Line {reader.line_num + 1}: the file is not UTF-8 encoded."
+        ) from e
+    return rows
+
+
+def _read_jsonl(stream):
+    rows = []
+    line_number = 0
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BatchInputError(
+                    f"Line {line_number}: invalid JSON ({e.msg})."
+                ) from e
+            if not isinstance(row, dict):
+                raise BatchInputError(f"Line {line_number}: expected a JSON object.")
+            rows.append(row)
+    except UnicodeDecodeError as e:
+        raise BatchInputError(
+            f"Line {line_number + 1}: the file is not UTF-8 encoded."
+        ) from e
+    return rows
+
+
+def read_upload(upload, fmt=None):
+    """Parse a batch file uploaded to the /batch endpoint."""
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8", newline="")
+    return read_rows(stream, fmt or detect_format(upload.filename or ""))
+
+
+def detect_format(filename):
+    jsonl = filename.lower().endswith((".jsonl", ".ndjson", ".json"))
+    return "jsonl" if jsonl else "csv"
+
+
+def row_id(row, index):
+    """Stable identifier for a row, used as the resume checkpoint key."""
+    return str(row.get("id") or index)
+
+
+def row_form(row):
+    """Wrap a row dict in the same interface as Flask's request.form."""
+    form = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if isinstance(value, list):
+            for item in value:
+                form.add(key, str(item))
+        else:
+            form.add(key, str(value))
+    return form
+
+
+def assess_row(row, index, retries=5, base_delay=1.0, tenant=None):
+    """
+    Run one batch row through the assessment pipeline.
+
+    Returns:
+        Result record written to the JSONL output
+    """
+    assessment = main.build_assessment_input(row_form(row))
+    assessment["tenant"] = tenant
+    record = {
+        "id": row_id(row, index),
+        "row": index,
+        "system_name": assessment["system_name"],
+        "vendors": [vendor["id"] for vendor in assessment["matched_vendors"]],
+        "vendor_risk_score": assessment["vendor_risk_score"],
+    }
+    for attempt in range(retries + 1):
+        try:
+            outcome = main.run_assessment(assessment)
+        except Exception as e:
+            if attempt < retries and is_retryable(e):
+                time.sleep(retry_delay(e, attempt, base_delay))
+                continue
+            record.update(status="error", error=str(e), assessment_id=None, scores=None,
+                          result_html=None)
+            return record
+        # Archive the row so it has a permalink like wizard submissions
+        assessment_id = main.save_assessment(assessment, outcome)
+        record.update(status="ok", error=None, assessment_id=assessment_id,
+                      scores=outcome["scores"], result_html=outcome["html"])
+        return record
+
+
+def run_batch(rows, concurrency=4, retries=5, skip_ids=(), tenant=None):
+    """
+    Assess rows with bounded concurrency, yielding each record as it finishes.
+
+    Args:
+        rows: Row dicts from read_rows
+        concurrency: Maximum LLM calls in flight
+        retries: Retries per row for rate limits and transient errors
+        skip_ids: Row IDs already completed by a previous run
+        tenant: Tenant the rows are rate limited as (see main.llm_governor)
+    """
+    skip_ids = set(skip_ids)
+    pending = ((index, row) for index, row in enumerate(rows)
+               if row_id(row, index) not in skip_ids)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = set()
+        for index, row in pending:
+            in_flight.add(executor.submit(assess_row, row, index, retries,
+                                          tenant=tenant))
+            if len(in_flight) >= concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in in_flight:
+            yield future.result()
+
+
+def completed_ids(output_path):
+    """Read the IDs of rows that already finished successfully."""
+    if output_path == "-" or not os.path.isfile(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Assess a CSV/JSONL portfolio of AI concepts."
+    )
+    parser.add_argument("input", help="CSV or JSONL file with one AI concept per row")
+    parser.add_argument(
+        "-o", "--output",
+        help="JSONL results file (also the resume checkpoint; - for stdout)",
+    )
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        help="Input format (default: from extension)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum LLM calls in flight")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Retries per row on rate limits")
+    parser.add_argument("--tenant", default="batch",
+                        help="Tenant the rows are rate limited as")
+    args = parser.parse_args(argv)
+
+    if not main.backend:
+        parser.error("OpenAI API key is not configured (set OPENAI_API_KEY).")
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    try:
+        with open(args.input, encoding="utf-8", newline="") as f:
+            rows = read_rows(f, args.format or detect_format(args.input))
+    except BatchInputError as e:
+        parser.error(f"{args.input}: {e}")
+    skip_ids = completed_ids(output)
+    remaining = sum(1 for index, row in enumerate(rows)
+                    if row_id(row, index) not in skip_ids)
+    print(f"{len(rows)} rows, {len(rows) - remaining} already done, "
+          f"{remaining} to assess", file=sys.stderr)
+
+    finished = 0
+    if output != "-":
+        end_last_record(output)
+    with (open(output, "a", encoding="utf-8") if output != "-"
+          else contextlib.nullcontext(sys.stdout)) as out:
+        for record in run_batch(rows, args.concurrency, args.retries, skip_ids,
+                                tenant=args.tenant):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            finished += 1
+            score = (record["scores"] or {}).get("overall_score")
+            print(f"[{finished}/{remaining}] {record['id']} {record['status']} "
+                  f"score={score}", file=sys.stderr)
+    return 0
+
+
+def end_last_record(path):
+    """Start appends on a fresh line if a previous run died halfway through a record."""
+    if not os.path.isfile(path) or not os.path.getsize(path):
+        return
+    # Checked in binary: seeking to an arbitrary offset of a text stream is undefined
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,119 @@
+"""
+Render time of a 10KB assessment before and after the section cache.
+
+Compares a markdown.markdown() call per render (the old path) with
+main.render_assessment() with a cold cache, after streaming (every section
+but the last already rendered) and with a warm cache. Appends p50/p95/p99
+per variant to benchmarks/results.jsonl. Run from the repository root:
+
+    python benchmarks/bench_markdown.py --iterations 500
+"""
+import argparse
+import time
+
+from common import configure_offline, print_table, summarize, write_results
+
+configure_offline()
+
+import markdown  # noqa: E402
+
+import main  # noqa: E402
+from assessment_parser import parse_assessment  # noqa: E402
+from llm_backends import DEFAULT_SECTIONS, DEFAULT_TIERS  # noqa: E402
+from markdown_renderer import EXTENSIONS, MarkdownRenderer, section_chunks  # noqa: E402
+
+SECTION_FILLER = """
+- **Finding:** The submission describes the data flow, but retention periods are not
+  stated.
+- **Risk:** Without a retention limit, personal data may be kept longer than the purpose
+  requires.
+- **Action:** Define retention per data category and document the deletion process.
+
+| Aspect | Status | Notes |
+|---|---|---|
+| Lawful basis | Partial | Legitimate interest claimed; balancing test missing |
+| Vendor review | Done | Transparency report on file |
+"""
+
+
+def sized_assessment(size):
+    """A markdown assessment in the model's layout, padded to about size bytes."""
+    bodies = [body for _, body in DEFAULT_SECTIONS]
+    index = 0
+    while sum(len(body) for body in bodies) < size:
+        bodies[index % len(bodies)] += "\n" + SECTION_FILLER
+        index += 1
+    titles = [title for title, _ in DEFAULT_SECTIONS]
+    sections = "\n\n".join(f"### {number}. {title}\n{body}" for number, (title, body)
+                           in enumerate(zip(titles, bodies, strict=True), start=1))
+    tiers = main.json.dumps(DEFAULT_TIERS, indent=2)
+    raw = f"{sections}\n\n---\n\n```json\n{tiers}\n```\n"
+    return parse_assessment(raw, main.GOVERNANCE_WEIGHTS).display
+
+
+def measure(func, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--size", type=int, default=10_000,
+                        help="Assessment size in bytes")
+    parser.add_argument("--output",
+                        help="Results JSONL file (default benchmarks/results.jsonl)")
+    args = parser.parse_args(argv)
+
+    text = sized_assessment(args.size)
+    uncached = MarkdownRenderer(cache_size=0)
+    expected = markdown.markdown(text.strip(), extensions=list(EXTENSIONS))
+    if main.render_assessment(text) != expected:
+        raise SystemExit("render_assessment output differs from markdown.markdown")
+
+    sections = section_chunks(text)
+
+    def cold_render():
+        main.markdown_renderer.cache.clear()
+        main.render_assessment(text)
+
+    def after_streaming():
+        # The stream has rendered every section but the last before the final render
+        main.markdown_renderer.cache.clear()
+        for section in sections[:-1]:
+            section = section.strip()
+            main.markdown_renderer.put(section, uncached.convert(section))
+        start = time.perf_counter()
+        main.render_assessment(text)
+        return time.perf_counter() - start
+
+    variants = {
+        "markdown.markdown (before)": lambda: markdown.markdown(text.strip(),
+                                                                extensions=list(EXTENSIONS)),
+        "render_assessment (cold cache)": cold_render,
+        "render_assessment (warm cache)": lambda: main.render_assessment(text),
+    }
+    results = {name: measure(func, args.iterations) for name, func in variants.items()}
+    results["render_assessment (streamed)"] = summarize(
+        [after_streaming() for _ in range(args.iterations)]
+    )
+    print_table(results)
+    before = results["markdown.markdown (before)"]["p50_ms"]
+    cold = results["render_assessment (cold cache)"]["p50_ms"]
+    streamed = results["render_assessment (streamed)"]["p50_ms"]
+    warm = results["render_assessment (warm cache)"]["p50_ms"]
+    print(f"\n{len(text)} byte assessment: p50 {before:.2f} ms before, "
+          f"{cold:.2f} ms cold, {streamed:.2f} ms after streaming, {warm:.3f} ms warm")
+
+    kwargs = {"path": args.output} if args.output else {}
+    write_results("markdown", results,
+                  {"iterations": args.iterations, "size": len(text)}, **kwargs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
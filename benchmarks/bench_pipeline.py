@@ -0,0 +1,77 @@
+"""
+Micro-benchmarks for the CPU-bound stages of the assessment pipeline.
+
+Times vendor matching, vendor and governance scoring, prompt assembly, tier
+parsing and markdown rendering (uncached, and as a cache hit) against the
+offline replay backend's canned response, then appends p50/p95/p99 per stage
+to benchmarks/results.jsonl.
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py --iterations 2000
+"""
+import argparse
+import time
+
+from common import SAMPLE_FORM, configure_offline, print_table, summarize, write_results
+
+configure_offline()
+
+from werkzeug.datastructures import MultiDict  # noqa: E402
+
+import main  # noqa: E402
+from assessment_parser import parse_assessment  # noqa: E402
+from llm_backends import default_response  # noqa: E402
+
+
+def measure(func, iterations, setup=None):
+    durations = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--output",
+                        help="Results JSONL file (default benchmarks/results.jsonl)")
+    args = parser.parse_args(argv)
+
+    form = MultiDict(SAMPLE_FORM)
+    third_parties = SAMPLE_FORM["third_parties"]
+    vendors = main.find_matching_vendors(third_parties)
+    raw_result = default_response("text")
+    parsed = parse_assessment(raw_result, main.GOVERNANCE_WEIGHTS)
+    # Warm up lazy loads (catalogue, matcher, tokenizer) outside the timings
+    main.build_assessment_input(form)
+
+    weights = main.GOVERNANCE_WEIGHTS
+    stages = {
+        "find_matching_vendors": lambda: main.find_matching_vendors(third_parties),
+        "calculate_vendor_risk_score":
+            lambda: main.calculate_vendor_risk_score(vendors),
+        "calculate_governance_score":
+            lambda: main.calculate_governance_score(parsed.tiers),
+        "build_assessment_input": lambda: main.build_assessment_input(form),
+        "parse_assessment": lambda: parse_assessment(raw_result, weights),
+        "render_assessment (cache hit)":
+            lambda: main.render_assessment(parsed.display),
+    }
+    results = {name: measure(func, args.iterations) for name, func in stages.items()}
+    # Conversion itself, with the rendered-section cache emptied before every iteration
+    results["render_assessment"] = measure(
+        lambda: main.render_assessment(parsed.display), args.iterations,
+        setup=main.markdown_renderer.cache.clear,
+    )
+    print_table(results)
+    kwargs = {"path": args.output} if args.output else {}
+    write_results("pipeline", results, {"iterations": args.iterations}, **kwargs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
@@ -0,0 +1,79 @@
+"""
+Wall-clock latency of single-call versus parallel section generation.
+
+Runs main.run_assessment against the replay backend, once with
+PARALLEL_SECTIONS off and once with it on, for the same number of fresh
+(uncached) submissions. The replay backend's latency grows with output
+length (time to first token plus a delay per chunk), so the canned section
+bodies are padded to a realistic length first. Appends the results to
+benchmarks/results.jsonl. Run from the repository root:
+
+    python benchmarks/bench_sections.py --iterations 10 --latency-ms 500 --chunk-ms 50
+"""
+import argparse
+import time
+
+from common import configure_offline, print_table, summarize, unique_form, write_results
+
+
+def pad(body, length):
+    filler = " Further analysis of the submitted inputs supports this finding."
+    while len(body) < length:
+        body += filler
+    return body
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=10,
+                        help="Assessments per mode")
+    parser.add_argument("--latency-ms", type=int, default=500,
+                        help="Replay backend time to first token")
+    parser.add_argument("--chunk-ms", type=int, default=50,
+                        help="Replay backend delay per 16-character chunk")
+    parser.add_argument("--section-chars", type=int, default=800,
+                        help="Length each canned section body is padded to")
+    parser.add_argument("--output",
+                        help="Results JSONL file (default benchmarks/results.jsonl)")
+    args = parser.parse_args(argv)
+
+    configure_offline(args.latency_ms, args.chunk_ms)
+    from werkzeug.datastructures import MultiDict
+
+    import llm_backends
+    import main
+
+    llm_backends.DEFAULT_SECTIONS = tuple(
+        (title, pad(body, args.section_chars))
+        for title, body in llm_backends.DEFAULT_SECTIONS
+    )
+
+    results = {}
+    index = 0
+    for mode in ("single", "parallel"):
+        main.PARALLEL_SECTIONS = mode == "parallel"
+        durations = []
+        for _ in range(args.iterations):
+            index += 1
+            assessment = main.build_assessment_input(MultiDict(unique_form(index)))
+            start = time.perf_counter()
+            outcome = main.run_assessment(assessment)
+            durations.append(time.perf_counter() - start)
+            if outcome["scores"] is None:
+                raise SystemExit(f"{mode} mode produced no scores")
+        results[f"run_assessment ({mode})"] = summarize(durations)
+
+    print_table(results)
+    single = results["run_assessment (single)"]["p50_ms"]
+    parallel = results["run_assessment (parallel)"]["p50_ms"]
+    results["speedup"] = {"p50": single / parallel}
+    print(f"\nparallel sections: p50 {parallel:.0f} ms vs {single:.0f} ms single-call "
+          f"({single / parallel:.2f}x)")
+
+    kwargs = {"path": args.output} if args.output else {}
+    write_results("sections", results, vars(args), **kwargs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
@@ -0,0 +1,97 @@
+"""
+Benchmark the compiled vendor matcher against the old nested alias scan.
+
+Builds a synthetic catalogue of 10,000 aliases and matches it against 5KB
+inputs. Run from the repository root:
+
+    python benchmarks/bench_vendor_matcher.py
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vendor_matcher import VendorMatcher  # noqa: E402
+
+VENDOR_COUNT = 2000
+ALIASES_PER_VENDOR = 5
+INPUT_BYTES = 5 * 1024
+INPUTS = 20
+
+
+def random_word(rng, low=3, high=10):
+    return "".join(rng.choice(string.ascii_lowercase)
+                   for _ in range(rng.randint(low, high)))
+
+
+def build_catalogue(rng):
+    vendors = []
+    for i in range(VENDOR_COUNT):
+        aliases = [f"{random_word(rng)}-{i}" if j % 2
+                   else f"{random_word(rng)} {random_word(rng)}"
+                   for j in range(ALIASES_PER_VENDOR - 1)]
+        vendors.append({"id": f"vendor-{i}", "name": f"Vendor {i}", "aliases": aliases})
+    return vendors
+
+
+def build_input(rng, vendors):
+    words = []
+    size = 0
+    while size < INPUT_BYTES:
+        if rng.random() < 0.02:
+            word = rng.choice(rng.choice(vendors)["aliases"])
+        else:
+            word = random_word(rng)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:INPUT_BYTES]
+
+
+def naive_match(vendors, text):
+    """The original find_matching_vendors scan."""
+    text_lower = text.lower()
+    matched = []
+    for vendor in vendors:
+        for alias in vendor.get("aliases", []):
+            if alias.lower() in text_lower:
+                matched.append(vendor["id"])
+                break
+        else:
+            if vendor["name"].lower() in text_lower:
+                matched.append(vendor["id"])
+    return matched
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    rng = random.Random(42)
+    vendors = build_catalogue(rng)
+    inputs = [build_input(rng, vendors) for _ in range(INPUTS)]
+    alias_count = sum(len(v["aliases"]) + 1 for v in vendors)
+
+    compile_seconds, matcher = timed(VendorMatcher, vendors)
+    naive_total = 0.0
+    compiled_total = 0.0
+    for text in inputs:
+        naive_seconds, _ = timed(naive_match, vendors, text)
+        compiled_seconds, _ = timed(matcher.match, text)
+        naive_total += naive_seconds
+        compiled_total += compiled_seconds
+
+    print(f"aliases: {alias_count}, input size: {INPUT_BYTES} bytes, inputs: {INPUTS}")
+    print(f"compile:        {compile_seconds * 1000:8.2f} ms (once per catalogue load)")
+    print(f"nested scan:    {naive_total / INPUTS * 1000:8.2f} ms per input")
+    print(f"aho-corasick:   {compiled_total / INPUTS * 1000:8.2f} ms per input")
+    print(f"speedup:        {naive_total / compiled_total:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
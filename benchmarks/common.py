@@ -0,0 +1,142 @@
+"""
+Shared helpers for the benchmark scripts: offline app configuration, a
+realistic wizard submission, latency statistics and the results file.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results.jsonl")
+
+SAMPLE_FORM = {
+    "system_name": "Claims Triage Assistant",
+    "short_description": (
+        "Summarises incoming insurance claims and suggests a priority for human "
+        "adjusters."
+    ),
+    "ai_type": "Generative AI / LLM",
+    "new_or_update": "New system",
+    "primary_intent": "Reduce time to first review for urgent claims.",
+    "reg_health": "on",
+    "problem": (
+        "Adjusters spend the first hour of each day sorting claims by hand. "
+        "Urgent claims wait behind routine ones."
+    ),
+    "who_problem": "Claims adjusters and policyholders with urgent losses.",
+    "value_created": "Faster triage and consistent prioritisation across teams.",
+    "non_ai_alt": "Rule-based keyword routing.",
+    "success_metrics": (
+        "Median time to first review under 2 hours; no increase in wrongful denials."
+    ),
+    "mvp_description": (
+        "A sidebar in the claims tool that shows a summary and a suggested priority "
+        "with reasons."
+    ),
+    "jurisdictions": ["EU", "United States"],
+    "jurisdiction_notes": "",
+    "data_sources": "Claim forms, adjuster notes and attached photos.",
+    "personal_data": "Names, addresses, health details in injury claims.",
+    "third_parties": (
+        "We call OpenAI GPT-4o through Azure and store embeddings with Cohere."
+    ),
+    "deployment_context": "Internal tool used by trained adjusters.",
+    "level_of_autonomy": "Human-in-the-loop",
+    "provenance": "Historic claims under existing customer agreements.",
+    "safeguards": ["Human review", "Audit logging"],
+    "custom_safeguards": "",
+    "primary_users": "Claims adjusters",
+    "affected_groups": "Policyholders, including elderly and disabled claimants.",
+    "harm_pathways": ["Unfair denial", "Privacy breach"],
+    "risk_tolerance": "Low",
+}
+
+
+def configure_offline(latency_ms=0, chunk_ms=0, workers=0):
+    """
+    Point the app at the replay backend and throwaway stores.
+
+    Must run before main is imported, since the app reads its configuration
+    at import time.
+    """
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update({
+        "LLM_BACKEND": "replay",
+        "LLM_REPLAY_LATENCY_MS": str(latency_ms),
+        "LLM_REPLAY_CHUNK_MS": str(chunk_ms),
+        "ASSESSMENT_WORKERS": str(workers),
+        "RESULTS_STORE_URL": "memory://",
+        "ASSESSMENT_HISTORY_DB": os.path.join(scratch, "assessments.db"),
+        "REPORT_ARTIFACTS_DIR": os.path.join(scratch, "reports"),
+        "COALESCE_DB": os.path.join(scratch, "coalescing.db"),
+        "LLM_GOVERNOR_DB": os.path.join(scratch, "llm_governor.db"),
+    })
+    os.environ.pop("ASSESSMENT_CACHE_DB", None)
+    os.environ.pop("LLM_RECORD_PATH", None)
+    return scratch
+
+
+def unique_form(index):
+    """A copy of SAMPLE_FORM that misses the assessment cache."""
+    return dict(SAMPLE_FORM, system_name=f"{SAMPLE_FORM['system_name']} #{index}")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = fraction * (len(sorted_values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    spread = sorted_values[high] - sorted_values[low]
+    return sorted_values[low] + spread * (rank - low)
+
+
+def summarize(seconds):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    values = sorted(seconds)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000 if values else None,
+        "p50_ms": percentile(values, 0.50) * 1000 if values else None,
+        "p95_ms": percentile(values, 0.95) * 1000 if values else None,
+        "p99_ms": percentile(values, 0.99) * 1000 if values else None,
+        "max_ms": values[-1] * 1000 if values else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(suite, results, config, path=DEFAULT_RESULTS_PATH):
+    """Append one run to the JSONL results file so runs can be compared over time."""
+    record = {
+        "suite": suite,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def print_table(results):
+    print(f"{'benchmark':<34}{'n':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    for name, stats in results.items():
+        if "p50_ms" not in stats:
+            continue
+        print(f"{name:<34}{stats['count']:>7}{stats['p50_ms']:>11.3f}{stats['p95_ms']:>11.3f}"
+              f"{stats['p99_ms']:>11.3f}")
@@ -0,0 +1,298 @@
+"""
+Tier stability and LLM cost of assessments, per model and prompt variant.
+
+Sends each prompt of a corpus --runs times, in parallel, through the same
+messages, tier parser and scoring as the app (no cache, coalescing or tier
+re-ask), and reports for each prompt and overall:
+  - parse failures: responses whose tier block is missing or invalid
+  - tier agreement: share of parsed runs that gave each dimension (and all
+    five at once) its most common tier
+  - calculate_governance_score mean, standard deviation and range, and how
+    often the recommendation agrees
+  - prompt/completion tokens, estimated cost (LLM_PRICE_* rates) and latency
+    per assessment
+
+The corpus is the stored prompts of an assessment history database
+(--history, as built by the wizard), a CSV/JSONL file of wizard fields in
+the batch.py format (--corpus), or the benchmark's sample submission.
+
+Backends:
+  - replay (default, offline): --replay answers from a recording. When the
+    recording holds several responses to the same prompt, runs take them in
+    turn, so a recorded live evaluation replays with its real variation.
+    Without --replay every run gets the same canned answer.
+  - openai: --model is called live; add --record to save every response
+    for offline replay later.
+
+Appends the summary to benchmarks/results.jsonl. Run from the repository root:
+
+    python benchmarks/eval_stability.py --backend openai --model gpt-4o-mini \\
+        --history instance/assessments.db --runs 10 --record eval-4o-mini.jsonl
+    python benchmarks/eval_stability.py --replay eval-4o-mini.jsonl \\
+        --history instance/assessments.db --runs 10
+"""
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from common import SAMPLE_FORM, configure_offline, summarize, write_results
+
+
+class RecordedSamples:
+    """
+    Replay backend that serves every recorded response to a request in turn.
+
+    Requests that were never recorded go to the fallback backend.
+    """
+
+    def __init__(self, path, fallback):
+        from llm_backends import replay_key
+
+        self.replay_key = replay_key
+        self.fallback = fallback
+        self.samples = {}
+        self.turns = {}
+        self.lock = threading.Lock()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.samples.setdefault(record["key"], []).append(record)
+
+    def complete(self, messages, **options):
+        from llm_backends import Completion, Usage
+
+        key = self.replay_key(messages, options)
+        samples = self.samples.get(key)
+        if not samples:
+            return self.fallback.complete(messages, **options)
+        with self.lock:
+            turn = self.turns.setdefault(key, itertools.count())
+            record = samples[next(turn) % len(samples)]
+        return Completion(record["text"],
+                          Usage(**record["usage"]) if record.get("usage") else None)
+
+
+def load_corpus(args, main):
+    """Return (prompt id, user prompt) pairs from the chosen source."""
+    if args.history:
+        conn = sqlite3.connect(f"file:{args.history}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT id, user_input FROM assessments WHERE user_input != '' "
+                "ORDER BY created DESC LIMIT ?",
+                (args.limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return rows
+    if args.corpus:
+        import batch
+
+        with open(args.corpus, encoding="utf-8", newline="") as f:
+            rows = batch.read_rows(f, batch.detect_format(args.corpus))[:args.limit]
+        return [(batch.row_id(row, index),
+                 main.build_assessment_input(batch.row_form(row))["user_input"])
+                for index, row in enumerate(rows)]
+    from werkzeug.datastructures import MultiDict
+
+    return [("sample",
+             main.build_assessment_input(MultiDict(SAMPLE_FORM))["user_input"])]
+
+
+def evaluate_run(main, backend, messages, temperature):
+    """Send one assessment and parse its tiers the way the app does."""
+    from assessment_parser import parse_assessment
+    from llm_backends import Usage
+    from prompt_budget import count_tokens
+
+    start = time.perf_counter()
+    completion = backend.complete(messages, temperature=temperature,
+                                  **main.completion_options())
+    latency = time.perf_counter() - start
+    text = main.response_text(completion.text)
+    usage = completion.usage
+    if usage is None:
+        usage = Usage(count_tokens("".join(message["content"] for message in messages)),
+                      count_tokens(text))
+    tiers = parse_assessment(text, main.GOVERNANCE_WEIGHTS).tiers
+    return {
+        "tiers": tiers,
+        "score": main.calculate_governance_score(tiers) if tiers else None,
+        "usage": usage,
+        "cost": main.llm_cost(usage),
+        "latency": latency,
+    }
+
+
+def agreement(values):
+    """Share of values equal to the most common one."""
+    if not values:
+        return None
+    return Counter(values).most_common(1)[0][1] / len(values)
+
+
+def prompt_stats(main, runs):
+    """Stability of one prompt's runs."""
+    parsed = [run for run in runs if run["tiers"]]
+    scores = [run["score"] for run in parsed]
+    dimensions = {key: agreement([run["tiers"][key] for run in parsed])
+                  for key in main.GOVERNANCE_WEIGHTS}
+    return {
+        "runs": len(runs),
+        "parse_failure_rate": 1 - len(parsed) / len(runs),
+        "tier_agreement": dimensions,
+        "all_tiers_agreement": agreement([tuple(sorted(run["tiers"].items()))
+                                          for run in parsed]),
+        "score_mean": statistics.mean(scores) if scores else None,
+        "score_stdev": statistics.pstdev(scores) if scores else None,
+        "score_range": max(scores) - min(scores) if scores else None,
+        "recommendation_agreement": agreement([main.governance_recommendation(score)
+                                               for score in scores]),
+    }
+
+
+def optional(value, spec):
+    """Format a statistic, or "-" when there were no parsed runs to compute it from."""
+    return "-" if value is None else format(value, spec)
+
+
+def mean(values):
+    values = [value for value in values if value is not None]
+    return statistics.mean(values) if values else None
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--history",
+                        help="Assessment history database to take stored prompts from")
+    source.add_argument("--corpus",
+                        help="CSV/JSONL file of wizard fields, one submission per row")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="Maximum prompts taken from the corpus")
+    parser.add_argument("--runs", type=int, default=5, help="Times each prompt is sent")
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls in flight")
+    parser.add_argument("--temperature", type=float, default=0.2,
+                        help="Sampling temperature (the app uses 0.2)")
+    parser.add_argument(
+        "--system-prompt",
+        help="File with a system prompt variant to use instead of BASE_PROMPT",
+    )
+    parser.add_argument("--backend", choices=("replay", "openai"), default="replay",
+                        help="LLM backend")
+    parser.add_argument("--model",
+                        help="Model for the OpenAI backend (default ASSESSMENT_MODEL)")
+    parser.add_argument("--replay", help="Recording to replay (replay backend)")
+    parser.add_argument("--record", help="Append every response to this recording")
+    parser.add_argument("--latency-ms", type=int, default=0,
+                        help="Replay backend time to first token")
+    parser.add_argument("--output",
+                        help="Results JSONL file (default benchmarks/results.jsonl)")
+    args = parser.parse_args(argv)
+
+    configure_offline(args.latency_ms)
+    os.environ["LLM_BACKEND"] = args.backend
+    if args.model:
+        os.environ["ASSESSMENT_MODEL"] = args.model
+    if args.replay:
+        os.environ["LLM_REPLAY_PATH"] = args.replay
+    if args.record:
+        os.environ["LLM_RECORD_PATH"] = args.record
+    import main
+
+    if not main.backend:
+        parser.error("OpenAI API key is not configured (set OPENAI_API_KEY).")
+    backend = main.backend
+    if args.replay and not args.record:
+        backend = RecordedSamples(args.replay, backend)
+
+    corpus = load_corpus(args, main)
+    if not corpus:
+        parser.error("The corpus has no prompts.")
+    system_prompt = None
+    if args.system_prompt:
+        with open(args.system_prompt, encoding="utf-8") as f:
+            system_prompt = f.read()
+
+    def run(prompt):
+        messages = main.build_messages(prompt)
+        if system_prompt is not None:
+            messages[0] = {"role": "system", "content": system_prompt}
+        return evaluate_run(main, backend, messages, args.temperature)
+
+    jobs = [(prompt_id, prompt) for prompt_id, prompt in corpus
+            for _ in range(args.runs)]
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(lambda job: run(job[1]), jobs))
+    by_prompt = {}
+    for (prompt_id, _), outcome in zip(jobs, outcomes, strict=True):
+        by_prompt.setdefault(prompt_id, []).append(outcome)
+    prompts = {prompt_id: prompt_stats(main, runs)
+               for prompt_id, runs in by_prompt.items()}
+
+    print(f"{'prompt':<34}{'runs':>6}{'parse fail':>12}{'all tiers':>11}"
+          f"{'score':>8}{'stdev':>8}{'range':>7}")
+    for prompt_id, stats in prompts.items():
+        all_tiers = optional(stats["all_tiers_agreement"], ".0%")
+        score = optional(stats["score_mean"], ".1f")
+        stdev = optional(stats["score_stdev"], ".1f")
+        spread = optional(stats["score_range"], "")
+        print(f"{str(prompt_id)[:33]:<34}{stats['runs']:>6}"
+              f"{stats['parse_failure_rate']:>12.0%}"
+              f"{all_tiers:>11}{score:>8}{stdev:>8}{spread:>7}")
+
+    stats = prompts.values()
+    results = {
+        "prompts": len(prompts),
+        "runs": len(outcomes),
+        "parse_failure_rate": sum(outcome["tiers"] is None
+                                  for outcome in outcomes) / len(outcomes),
+        "tier_agreement": {key: mean(prompt["tier_agreement"][key] for prompt in stats)
+                           for key in main.GOVERNANCE_WEIGHTS},
+        "all_tiers_agreement": mean(prompt["all_tiers_agreement"] for prompt in stats),
+        "recommendation_agreement": mean(prompt["recommendation_agreement"]
+                                         for prompt in stats),
+        "score_stdev_mean": mean(prompt["score_stdev"] for prompt in stats),
+        "score_range_max": max((prompt["score_range"] for prompt in stats
+                                if prompt["score_range"] is not None),
+                               default=None),
+        "prompt_tokens_mean": statistics.mean(outcome["usage"].prompt_tokens
+                                              for outcome in outcomes),
+        "completion_tokens_mean": statistics.mean(outcome["usage"].completion_tokens
+                                                  for outcome in outcomes),
+        "cost_usd_per_assessment": statistics.mean(outcome["cost"]
+                                                   for outcome in outcomes),
+        "latency": summarize([outcome["latency"] for outcome in outcomes]),
+        "by_prompt": prompts,
+    }
+
+    print(f"\nparse failures {results['parse_failure_rate']:.1%}, all tiers agree "
+          f"{results['all_tiers_agreement'] or 0:.1%}, recommendation agrees "
+          f"{results['recommendation_agreement'] or 0:.1%}, mean score stdev "
+          f"{results['score_stdev_mean'] or 0:.2f}")
+    print("tier agreement: " + ", ".join(
+        f"{key} {value:.1%}" for key, value in results["tier_agreement"].items()
+        if value is not None
+    ))
+    print(f"per assessment: {results['prompt_tokens_mean']:.0f} prompt + "
+          f"{results['completion_tokens_mean']:.0f} completion tokens, "
+          f"${results['cost_usd_per_assessment']:.5f}, "
+          f"p50 {results['latency']['p50_ms']:.0f} ms")
+
+    config = dict(vars(args),
+                  model=main.ASSESSMENT_MODEL if args.backend == "openai" else None)
+    kwargs = {"path": args.output} if args.output else {}
+    write_results("stability", results, config, **kwargs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
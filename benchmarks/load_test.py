@@ -0,0 +1,135 @@
+"""
+End-to-end load test of the web app against the replay LLM backend.
+
+Each simulated user submits the wizard (POST /), opens the results page and
+then the report, through the Flask test client in one process, so the
+numbers are per worker. The replay backend stands in for the model with a
+configurable latency. Reports p50/p95/p99 per endpoint, requests/sec and the
+stored bytes per session, and appends them to benchmarks/results.jsonl.
+Run from the repository root:
+
+    python benchmarks/load_test.py --users 8 --requests 50 --latency-ms 800
+"""
+import argparse
+import threading
+import time
+import tracemalloc
+
+from common import configure_offline, print_table, summarize, unique_form, write_results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=4,
+                        help="Concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=25,
+                        help="Wizard submissions per user")
+    parser.add_argument("--latency-ms", type=int, default=200,
+                        help="Replay backend time to first token")
+    parser.add_argument("--chunk-ms", type=int, default=0,
+                        help="Replay backend delay between chunks")
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="ASSESSMENT_WORKERS for the app (0 runs assessments inside POST /)",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Track peak Python heap with tracemalloc (slows every request)",
+    )
+    parser.add_argument("--output",
+                        help="Results JSONL file (default benchmarks/results.jsonl)")
+    args = parser.parse_args(argv)
+
+    configure_offline(args.latency_ms, args.chunk_ms, args.workers)
+    import main
+
+    app = main.app
+    timings = {"POST /": [], "GET /results": [], "GET /report": []}
+    cookie_bytes = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed(label, func):
+        start = time.perf_counter()
+        response = func()
+        elapsed = time.perf_counter() - start
+        with lock:
+            timings[label].append(elapsed)
+        if response.status_code >= 400:
+            errors.append(f"{label} returned {response.status_code}")
+        return response
+
+    def user(user_index):
+        client = app.test_client()
+        for request_index in range(args.requests):
+            form = unique_form(user_index * args.requests + request_index)
+            response = timed("POST /", lambda form=form: client.post("/", data=form))
+            results_url = response.location
+            # With background jobs, POST / only queues the job; wait for it to finish
+            while args.workers > 0:
+                job = client.get(results_url,
+                                 headers={"Accept": "application/json"}).get_json()
+                if job.get("status") not in ("queued", "running"):
+                    break
+                time.sleep(0.02)
+            timed("GET /results", lambda url=results_url: client.get(url))
+            report = timed("GET /report",
+                           lambda: client.get("/report", follow_redirects=True))
+            cookie = client.get_cookie("session")
+            with lock:
+                cookie_bytes.append(len(cookie.value) if cookie else 0)
+            if report.status_code != 200:
+                break
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(index,))
+               for index in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    peak_memory = None
+    if args.trace_memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    sessions = len(cookie_bytes)
+    total_requests = sum(len(durations) for durations in timings.values())
+    results = {label: summarize(durations) for label, durations in timings.items()}
+    results["throughput"] = {
+        "elapsed_s": elapsed,
+        "requests": total_requests,
+        "requests_per_s": total_requests / elapsed,
+        "assessments_per_s": len(timings["POST /"]) / elapsed,
+        "errors": len(errors),
+    }
+    results["memory"] = {
+        "sessions": sessions,
+        "session_cookie_bytes": sum(cookie_bytes) / sessions if sessions else None,
+        "results_store_bytes_per_session":
+            main.results_store.backend.size / sessions if sessions else None,
+        "peak_python_heap_bytes": peak_memory,
+    }
+
+    print_table(results)
+    throughput = results["throughput"]
+    memory = results["memory"]
+    print(f"\n{throughput['requests']} requests in {throughput['elapsed_s']:.2f}s: "
+          f"{throughput['requests_per_s']:.1f} req/s, "
+          f"{throughput['assessments_per_s']:.1f} assessments/s per worker, "
+          f"{throughput['errors']} errors")
+    print(f"per session: {memory['session_cookie_bytes']:.0f} B cookie, "
+          f"{memory['results_store_bytes_per_session']:.0f} B in the results store")
+    if errors:
+        print("first error:", errors[0])
+
+    kwargs = {"path": args.output} if args.output else {}
+    write_results("load", results, vars(args), **kwargs)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
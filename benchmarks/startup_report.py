@@ -0,0 +1,129 @@
+"""
+Startup report: import time and time to first request of a fresh worker.
+
+Starts fresh interpreters with `python -X importtime`, imports main, serves
+GET / and then a wizard submission through the test client, and reports the
+time from process start to each milestone (median over --runs), followed by
+the slowest imports by cumulative time. --preload also runs main.warm_up()
+after the import, as gunicorn.conf.py does in the master with
+GUNICORN_PRELOAD=1. Appends the results to benchmarks/results.jsonl. Run from
+the repository root:
+
+    python benchmarks/startup_report.py --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from common import ROOT, SAMPLE_FORM, configure_offline, write_results
+
+PROBE = """
+import json, sys, time
+marks = {}
+import main
+marks["import"] = time.time()
+if sys.argv[2] == "1":
+    main.warm_up()
+    marks["warm_up"] = time.time()
+client = main.app.test_client()
+client.get("/")
+marks["first_page"] = time.time()
+client.post("/", data=json.loads(sys.argv[1]))
+marks["first_assessment"] = time.time()
+print(json.dumps(marks))
+"""
+
+
+def parse_importtime(stderr):
+    """Return (module, self_us, cumulative_us, depth) rows from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def heaviest(rows):
+    """Import rows by cumulative time, slowest first."""
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def probe(preload):
+    started = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, json.dumps(SAMPLE_FORM),
+         "1" if preload else "0"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    marks = json.loads(completed.stdout.strip().splitlines()[-1])
+    milestones = {name: (at - started) * 1000 for name, at in marks.items()}
+    return milestones, parse_importtime(completed.stderr)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Fresh processes to take the median over")
+    parser.add_argument("--preload", action="store_true",
+                        help="Call main.warm_up() after importing")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--output",
+                        help="Results JSONL file (default benchmarks/results.jsonl)")
+    args = parser.parse_args(argv)
+
+    configure_offline()
+    runs = []
+    imports = None
+    for _ in range(args.runs):
+        marks, imports = probe(args.preload)
+        runs.append(marks)
+    milestones = {name: statistics.median(run[name] for run in runs)
+                  for name in runs[0]}
+
+    print(f"{'milestone (ms from process start)':<40}{'median':>10}")
+    for name, value in milestones.items():
+        print(f"{name:<40}{value:>10.1f}")
+
+    # -X importtime lists a module after its imports, one level deeper; the
+    # rows after main are imports deferred until warm-up or the first requests
+    main_index = next(index for index, row in enumerate(imports) if row[0] == "main")
+    main_depth = imports[main_index][3]
+    direct = []
+    for row in reversed(imports[:main_index]):
+        if row[3] <= main_depth:
+            break
+        if row[3] == main_depth + 1:
+            direct.append(row)
+    deferred = [row for row in imports[main_index + 1:] if row[3] == main_depth]
+    tables = {
+        "imported by main": heaviest(direct)[:args.top],
+        "deferred to first use": heaviest(deferred)[:args.top],
+    }
+    for title, rows in tables.items():
+        print(f"\n{title:<40}{'self ms':>10}{'cumul ms':>10}")
+        for name, self_us, cumulative_us, _ in rows:
+            print(f"{name:<40}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+
+    results = {
+        "milestones_ms": milestones,
+        "main_import_ms": imports[main_index][2] / 1000,
+        "imports_ms": {name: cumulative_us / 1000
+                       for name, _, cumulative_us, _ in tables["imported by main"]},
+        "deferred_imports_ms": {
+            name: cumulative_us / 1000
+            for name, _, cumulative_us, _ in tables["deferred to first use"]
+        },
+    }
+    kwargs = {"path": args.output} if args.output else {}
+    write_results("startup", results, vars(args), **kwargs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
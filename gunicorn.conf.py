@@ -0,0 +1,29 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory.
+
+By default each worker imports the app itself and loads heavy modules and the
+vendor catalogue on first use, which keeps cold starts short. Set
+GUNICORN_PRELOAD=1 to import the app once in the master and warm it up there
+(see main.warm_up) before forking: workers then start already warm and share
+the catalogue, matcher and imported modules copy-on-write.
+"""
+import gc
+import os
+import time
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker forks
+    if not preload_app:
+        return
+    import main
+
+    started = time.perf_counter()
+    main.warm_up()
+    # Move everything loaded so far out of the collector's reach, so collections
+    # in the workers don't write to (and so copy) the shared pages
+    gc.freeze()
+    server.log.info("Warmed up app in %.0f ms before forking workers",
+                    (time.perf_counter() - started) * 1000)
@@ -0,0 +1,467 @@
+"""
+LLM backends for assessments.
+
+Every backend exposes the same two calls, plus awaitable twins used by the
+ASGI entry point (asgi.py):
+
+    complete(messages, **options) -> Completion(text, usage)
+    stream(messages, on_usage=None, **options) -> iterator of text deltas
+    await acomplete(messages, **options) -> Completion(text, usage)
+    astream(messages, on_usage=None, **options) -> async iterator of text deltas
+
+OpenAIBackend talks to the OpenAI API over a pooled HTTP client with
+explicit timeouts, jittered retries and a cap on concurrent calls.
+ReplayBackend answers from recorded responses with configurable latency, so
+the whole pipeline can be benchmarked and load-tested offline.
+RecordingBackend wraps another backend and saves its responses for replay.
+
+asyncio is imported inside the async methods, since the sync app never
+needs it and importing it slows down loading the app.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+from assessment_cache import fingerprint
+from prompt_budget import count_tokens
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+PROMPT_HEADING_RE = re.compile(r'^### (\d+)\. ', re.MULTILINE)
+
+
+class Usage:
+    """Token usage of one completion."""
+
+    def __init__(self, prompt_tokens=0, completion_tokens=0, cached_tokens=0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+
+    def to_dict(self):
+        return {"prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_tokens": self.cached_tokens}
+
+
+class Completion:
+    """Text of a finished completion and its token usage (None if unknown)."""
+
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage = usage
+
+
+def is_retryable(error):
+    """Check whether an LLM error is a rate limit or transient failure."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError",
+                                    "RateLimitError")
+
+
+def retry_delay(error, attempt, base_delay):
+    """Seconds to wait before the next attempt, honouring Retry-After when sent."""
+    if getattr(error, "retry_after", None):
+        return float(error.retry_after)
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return base_delay * (2 ** attempt) * (0.5 + random.random())
+
+
+def replay_key(messages, options):
+    """Key identifying a request in a recording: the messages and output format."""
+    response_format = (options.get("response_format") or {}).get("type", "text")
+    return fingerprint(messages, response_format)
+
+
+class OpenAIBackend:
+    """
+    OpenAI chat completions with connection pooling, timeouts and retries.
+
+    Args:
+        api_key: OpenAI API key
+        model: Model name sent with every request
+        timeout: Seconds to wait for a response (connect timeout is capped at 10)
+        max_retries: Retries for rate limits and transient errors
+        max_connections: Size of the HTTP connection pool
+        max_concurrency: Maximum calls in flight from this process
+        base_url: Alternative OpenAI-compatible endpoint
+        on_headers: Called with the response headers and status code of every
+            response and failed attempt, e.g. to follow rate-limit headers
+    """
+
+    def __init__(self, api_key, model, timeout=60.0, max_retries=3, max_connections=20,
+                 max_concurrency=8, base_delay=1.0, base_url=None, on_headers=None):
+        self.model = model
+        self.on_headers = on_headers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.client_options = {"api_key": api_key, "base_url": base_url}
+        # The SDK and its HTTP clients are imported and built on the first
+        # call, so loading the app stays fast and no connection pool is
+        # inherited across a fork. The async client and its semaphore are only
+        # created when the ASGI app first awaits a call, so they belong to the
+        # server's event loop
+        self.lock = threading.Lock()
+        self.sync_client = None
+        self.async_client = None
+        self.async_slots = None
+
+    def _http_options(self):
+        import httpx
+
+        return {
+            "limits": httpx.Limits(max_connections=self.max_connections,
+                                   max_keepalive_connections=self.max_connections),
+            "timeout": httpx.Timeout(self.timeout, connect=min(self.timeout, 10.0)),
+        }
+
+    @property
+    def client(self):
+        if self.sync_client is None:
+            with self.lock:
+                if self.sync_client is None:
+                    import httpx
+                    from openai import OpenAI
+
+                    http_client = httpx.Client(**self._http_options())
+                    # Retries are handled here, with jitter, instead of by the SDK
+                    self.sync_client = OpenAI(http_client=http_client, max_retries=0,
+                                              **self.client_options)
+        return self.sync_client
+
+    def _observe(self, response):
+        if self.on_headers is not None and response is not None:
+            self.on_headers(response.headers, response.status_code)
+
+    def _create(self, messages, **options):
+        """
+        Send a request, retrying transient errors.
+
+        Called holding a slot of self.slots; the slot is given up while
+        waiting to retry, so a backed-off call doesn't keep others waiting.
+        """
+        client = self.client
+        for attempt in range(self.max_retries + 1):
+            try:
+                # The raw response exposes the rate-limit headers; parse() gives
+                # the usual object
+                response = client.chat.completions.with_raw_response.create(
+                    model=self.model, messages=messages, **options
+                )
+                self._observe(response)
+                return response.parse()
+            except Exception as e:
+                self._observe(getattr(e, "response", None))
+                if attempt < self.max_retries and is_retryable(e):
+                    self.slots.release()
+                    try:
+                        time.sleep(retry_delay(e, attempt, self.base_delay))
+                    finally:
+                        self.slots.acquire()
+                    continue
+                raise
+
+    def _async(self):
+        if self.async_client is None:
+            import asyncio
+
+            import httpx
+            from openai import AsyncOpenAI
+
+            http_client = httpx.AsyncClient(**self._http_options())
+            self.async_client = AsyncOpenAI(http_client=http_client, max_retries=0,
+                                            **self.client_options)
+            self.async_slots = asyncio.BoundedSemaphore(self.max_concurrency)
+        return self.async_client
+
+    async def _acreate(self, messages, **options):
+        """Async _create(), called holding a slot of self.async_slots."""
+        import asyncio
+
+        client = self._async()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.chat.completions.with_raw_response.create(
+                    model=self.model, messages=messages, **options
+                )
+                self._observe(response)
+                return response.parse()
+            except Exception as e:
+                self._observe(getattr(e, "response", None))
+                if attempt < self.max_retries and is_retryable(e):
+                    self.async_slots.release()
+                    try:
+                        await asyncio.sleep(retry_delay(e, attempt, self.base_delay))
+                    finally:
+                        await self.async_slots.acquire()
+                    continue
+                raise
+
+    @staticmethod
+    def _usage(usage):
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        return Usage(usage.prompt_tokens or 0, usage.completion_tokens or 0,
+                     getattr(details, "cached_tokens", None) or 0)
+
+    def complete(self, messages, **options):
+        with self.slots:
+            response = self._create(messages, **options)
+        return Completion(response.choices[0].message.content or "",
+                          self._usage(response.usage))
+
+    def stream(self, messages, on_usage=None, **options):
+        with self.slots:
+            response = self._create(messages, stream=True,
+                                    stream_options={"include_usage": True},
+                                    **options)
+            for chunk in response:
+                if not chunk.choices:
+                    # The final chunk carries the token usage and no choices
+                    if on_usage is not None and chunk.usage is not None:
+                        on_usage(self._usage(chunk.usage))
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+    async def acomplete(self, messages, **options):
+        self._async()
+        async with self.async_slots:
+            response = await self._acreate(messages, **options)
+        return Completion(response.choices[0].message.content or "",
+                          self._usage(response.usage))
+
+    async def astream(self, messages, on_usage=None, **options):
+        self._async()
+        async with self.async_slots:
+            response = await self._acreate(messages, stream=True,
+                                           stream_options={"include_usage": True},
+                                           **options)
+            async for chunk in response:
+                if not chunk.choices:
+                    if on_usage is not None and chunk.usage is not None:
+                        on_usage(self._usage(chunk.usage))
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+
+# Used by ReplayBackend when a request has no recording to answer from
+DEFAULT_TIERS = {
+    "external_impact": "Medium",
+    "internal_failure": "Low",
+    "regulatory_sensitivity": "Medium",
+    "data_legal_soundness": "Moderate",
+    "purpose_clarity": "Strong",
+}
+DEFAULT_SECTIONS = (
+    ("SYSTEM INTAKE", "- Offline replay assessment; no model was called."),
+    ("PURPOSE & CONCEPT CLARITY",
+     "The stated problem and MVP are specific enough to evaluate."),
+    ("LEGAL & DATA FOUNDATIONS",
+     "Confirm a lawful basis for any personal data before launch."),
+    ("STAKEHOLDER & IMPACT ASSESSMENT",
+     "Primary users and affected groups overlap; monitor for unequal error rates."),
+    ("IMPACT TRIAGE",
+     "- External impact risk: Medium\n- Internal failure risk: Low\n"
+     "- Regulatory sensitivity: Medium"),
+    ("FEASIBILITY GATE (GO / NO-GO)",
+     "**GO WITH CONDITIONS**\n\n- Add human review for adverse decisions"),
+)
+
+
+def requested_sections(messages):
+    """
+    Section numbers the system prompt asks for, and whether it asks for the
+    tier block. A prompt with no numbered headings asks for everything.
+    """
+    prompt = "\n".join(message["content"] for message in messages
+                       if message["role"] == "system")
+    numbers = sorted({int(number) for number in PROMPT_HEADING_RE.findall(prompt)})
+    if not numbers:
+        return None, True
+    return numbers, "RISK CLASSIFICATION" in prompt
+
+
+def default_response(response_format, sections=None, tiers=True):
+    """
+    Canned, correctly formatted answer for the requested output format.
+
+    Args:
+        sections: Section numbers to include in a markdown answer (default all)
+        tiers: Whether a markdown answer ends with the tier block
+    """
+    if response_format == "json_object":
+        return json.dumps(DEFAULT_TIERS)
+    if response_format == "json_schema":
+        return json.dumps({
+            "sections": {f"section_{number}": body
+                         for number, (_, body) in enumerate(DEFAULT_SECTIONS, start=1)},
+            "tiers": DEFAULT_TIERS,
+        })
+    numbers = sections or range(1, len(DEFAULT_SECTIONS) + 1)
+    text = "\n\n".join("### {}. {}\n{}".format(number, *DEFAULT_SECTIONS[number - 1])
+                       for number in numbers)
+    if not tiers:
+        return f"{text}\n"
+    return f"{text}\n\n---\n\n```json\n{json.dumps(DEFAULT_TIERS, indent=2)}\n```\n"
+
+
+class ReplayBackend:
+    """
+    Deterministic stand-in that replays recorded responses.
+
+    A request is answered with the recording made for the same messages. A
+    request that was never recorded gets one of the recordings for its output
+    format, chosen by its key so the same request always gets the same answer,
+    or a built-in canned response when there are none. Requests for only some
+    sections (parallel section mode) get the canned text of those sections.
+
+    Args:
+        path: JSONL recording written by RecordingBackend (optional)
+        latency: Seconds before the first token
+        chunk_delay: Seconds between streamed chunks
+        chunk_size: Characters per streamed chunk
+    """
+
+    def __init__(self, path=None, latency=0.0, chunk_delay=0.0, chunk_size=16):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.recordings = {}
+        self.by_format = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    self.recordings[record["key"]] = record
+                    response_format = record.get("response_format", "text")
+                    self.by_format.setdefault(response_format, []).append(record)
+
+    def _answer(self, messages, options):
+        key = replay_key(messages, options)
+        record = self.recordings.get(key)
+        if record is None:
+            response_format = (options.get("response_format") or {}).get("type", "text")
+            candidates = self.by_format.get(response_format)
+            sections, tiers = requested_sections(messages)
+            if sections is not None and (len(sections) < len(DEFAULT_SECTIONS)
+                                         or not tiers):
+                candidates = None
+            if not candidates:
+                text = default_response(response_format, sections, tiers)
+                prompt = "".join(message["content"] for message in messages)
+                return text, Usage(count_tokens(prompt), count_tokens(text))
+            record = candidates[int(key, 16) % len(candidates)]
+        return record["text"], Usage(**record["usage"]) if record.get("usage") else None
+
+    def complete(self, messages, **options):
+        text, usage = self._answer(messages, options)
+        time.sleep(self.latency + self.chunk_delay * (len(text) // self.chunk_size))
+        return Completion(text, usage)
+
+    def stream(self, messages, on_usage=None, **options):
+        text, usage = self._answer(messages, options)
+        time.sleep(self.latency)
+        for start in range(0, len(text), self.chunk_size):
+            if start and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+        if on_usage is not None and usage is not None:
+            on_usage(usage)
+
+    async def acomplete(self, messages, **options):
+        import asyncio
+
+        text, usage = self._answer(messages, options)
+        chunks = len(text) // self.chunk_size
+        await asyncio.sleep(self.latency + self.chunk_delay * chunks)
+        return Completion(text, usage)
+
+    async def astream(self, messages, on_usage=None, **options):
+        import asyncio
+
+        text, usage = self._answer(messages, options)
+        await asyncio.sleep(self.latency)
+        for start in range(0, len(text), self.chunk_size):
+            if start and self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+        if on_usage is not None and usage is not None:
+            on_usage(usage)
+
+
+class RecordingBackend:
+    """Wrap a backend and append each response to a JSONL recording to replay."""
+
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _record(self, messages, options, text, usage):
+        response_format = (options.get("response_format") or {}).get("type", "text")
+        record = {
+            "key": replay_key(messages, options),
+            "response_format": response_format,
+            "text": text,
+            "usage": usage.to_dict() if usage is not None else None,
+        }
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def complete(self, messages, **options):
+        completion = self.backend.complete(messages, **options)
+        self._record(messages, options, completion.text, completion.usage)
+        return completion
+
+    def stream(self, messages, on_usage=None, **options):
+        parts = []
+        usage = []
+
+        def capture(reported):
+            usage.append(reported)
+            if on_usage is not None:
+                on_usage(reported)
+
+        for delta in self.backend.stream(messages, on_usage=capture, **options):
+            parts.append(delta)
+            yield delta
+        self._record(messages, options, "".join(parts), usage[0] if usage else None)
+
+    async def acomplete(self, messages, **options):
+        completion = await self.backend.acomplete(messages, **options)
+        self._record(messages, options, completion.text, completion.usage)
+        return completion
+
+    async def astream(self, messages, on_usage=None, **options):
+        parts = []
+        usage = []
+
+        def capture(reported):
+            usage.append(reported)
+            if on_usage is not None:
+                on_usage(reported)
+
+        async for delta in self.backend.astream(messages, on_usage=capture, **options):
+            parts.append(delta)
+            yield delta
+        self._record(messages, options, "".join(parts), usage[0] if usage else None)
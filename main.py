@@ -1,250 +1,153 @@
-from flask import Flask, render_template, request, session, redirect, url_for
-from flask_session import Session
-from markupsafe import Markup
-from openai import OpenAI
-import markdown
+import itertools
 import json
-import re
 import os
+import queue
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    session,
+    stream_with_context,
+    url_for,
+)
+from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import tracing
+from assessment_cache import AssessmentCache, fingerprint, normalize_prompt
+from assessment_history import AssessmentHistory
+from assessment_parser import (
+    HEADING_RE,
+    SECTION_TITLES,
+    bare_object,
+    fenced_block,
+    parse_assessment,
+    structured_output_schema,
+    structured_to_markdown,
+    tier_candidate,
+    validate_tiers,
+)
+from llm_backends import (
+    Completion,
+    OpenAIBackend,
+    RecordingBackend,
+    ReplayBackend,
+    Usage,
+)
+from markdown_renderer import SECTION_HEADING_RE, MarkdownRenderer, section_chunks
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import NULL_TIMER
+from metrics import REGISTRY as metrics_registry
+from prompt_budget import assemble_prompt, count_tokens, field, split_sections
+from rate_governor import RateGovernor, RateLimited
+from report_artifacts import ReportArtifacts, pdf_available, render_pdf
+from results_store import ResultsStore
+from single_flight import SingleFlight
+from static_assets import AssetManifest
+from vendor_catalogue import VendorCatalogue
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 
-# Use server-side session storage to avoid cookie size limits
-app.config['SESSION_TYPE'] = 'filesystem'
-app.config['SESSION_FILE_DIR'] = '/tmp/flask_session'
+# The session cookie only carries the current assessment ID; the assessment
+# itself lives in the results store (see "Results store" below)
 app.config['SESSION_PERMANENT'] = False
-Session(app)
+
+# Deployments (Replit/Cloud Run) sit behind one proxy that appends the client
+# address to X-Forwarded-For; trust that many hops so request.remote_addr is
+# the client rather than the proxy. Set to 0 when clients connect directly.
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "1"))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+# ---------- Instrumentation ----------
+# Each stage of a request is timed into assessment_stage_seconds and exposed,
+# with request latency, token, cost, cache and error counters, on /metrics.
+# METRICS_ENABLED=0 turns the spans into no-ops and hides /metrics; TRACE_IDS=1
+# tags every log line with the request's X-Request-ID (generated if absent).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+TRACE_IDS_ENABLED = os.environ.get("TRACE_IDS", "0") == "1"
+
+REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_seconds", "Request latency by endpoint",
+    ["endpoint", "method", "status"]
+)
+STAGE_SECONDS = metrics_registry.histogram(
+    "assessment_stage_seconds", "Time spent in each stage of handling a request",
+    ["stage"]
+)
+ERRORS = metrics_registry.counter("assessment_errors_total",
+                                  "Failures by pipeline stage", ["stage"])
+CACHE_LOOKUPS = metrics_registry.counter(
+    "assessment_cache_lookups_total", "Assessment, report and markdown cache lookups",
+    ["cache", "result"]
+)
+
+
+def span(stage):
+    """Time a block of code as one stage of the current request."""
+    return STAGE_SECONDS.time(stage=stage) if METRICS_ENABLED else NULL_TIMER
+
+
+if METRICS_ENABLED:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                    method=request.method, status=response.status_code)
+        return response
+
+if TRACE_IDS_ENABLED:
+    tracing.install_log_format(app.logger)
+
+    @app.before_request
+    def start_trace():
+        g.trace_id = tracing.new_trace_id(request.headers.get(tracing.TRACE_HEADER))
+        g.trace_token = tracing.set_trace_id(g.trace_id)
+
+    @app.after_request
+    def add_trace_header(response):
+        response.headers[tracing.TRACE_HEADER] = g.trace_id
+        return response
+
+    @app.teardown_request
+    def end_trace(_exc):
+        token = g.pop("trace_token", None)
+        if token is not None:
+            tracing.reset_trace_id(token)
 
 # ---------- Vendor Database ----------
-VENDOR_DATABASE = [
-    {
-        "id": "openai-gpt4",
-        "name": "OpenAI GPT-4",
-        "aliases": ["openai", "gpt-4", "gpt4", "chatgpt", "gpt-4o", "gpt-4-turbo", "gpt"],
-        "logo": "🤖",
-        "category": "Large Language Model",
-        "trainingData": {
-            "sources": "Web crawl, licensed datasets, books, academic papers",
-            "cutoffDate": "September 2021 (GPT-4), April 2023 (GPT-4 Turbo)",
-            "geographicCoverage": "Global with heavy English/Western bias",
-            "knownDatasets": "Common Crawl, WebText, Books corpus (proprietary mix)"
-        },
-        "transparency": {
-            "level": "Low",
-            "details": "Does not disclose training data composition, ratios, or specific sources",
-            "dataLineage": False,
-            "auditability": False
-        },
-        "knownBiases": [
-            "Strong English language bias (~90% training data)",
-            "Western cultural perspectives overrepresented",
-            "Recency bias - limited post-2021 knowledge",
-            "Academic and formal writing style bias"
-        ],
-        "risks": [
-            {"severity": "high", "text": "No data lineage available for audit"},
-            {"severity": "high", "text": "Cannot verify training data consent/licensing"},
-            {"severity": "medium", "text": "Temporal data limitations (knowledge cutoff)"},
-            {"severity": "medium", "text": "Geographic/cultural bias in outputs"}
-        ],
-        "compliance": {
-            "gdpr": "Data processing addendum available",
-            "euAiAct": "Self-identifies as general purpose AI",
-            "licensing": "Prohibits certain use cases (weapons, surveillance, etc.)"
-        },
-        "dueDiligenceQuestions": [
-            "What proportion of training data comes from each source category?",
-            "How do you handle copyrighted material in training data?",
-            "What demographic representation exists in your training data?",
-            "Can you provide data lineage for specific model outputs?",
-            "What is your process for removing problematic training data?"
-        ],
-        "lastUpdated": "2024-12-01",
-        "documentationUrl": "https://openai.com/research/gpt-4"
-    },
-    {
-        "id": "anthropic-claude",
-        "name": "Anthropic Claude",
-        "aliases": ["anthropic", "claude", "claude-3", "claude-3.5", "claude sonnet", "claude opus"],
-        "logo": "🔶",
-        "category": "Large Language Model",
-        "trainingData": {
-            "sources": "Web crawl, licensed datasets, books, synthetic data",
-            "cutoffDate": "Early 2024 (Claude 3.5), August 2024 (Claude 3.5 Sonnet new)",
-            "geographicCoverage": "Global with English focus",
-            "knownDatasets": "Undisclosed proprietary mix"
-        },
-        "transparency": {
-            "level": "Low-Medium",
-            "details": "Limited disclosure of training data sources; publishes model cards",
-            "dataLineage": False,
-            "auditability": False
-        },
-        "knownBiases": [
-            "English language dominant in training",
-            "Constitutional AI training may affect certain viewpoints",
-            "Western ethical frameworks emphasized",
-            "More cautious/conservative outputs by design"
-        ],
-        "risks": [
-            {"severity": "high", "text": "Limited training data transparency"},
-            {"severity": "medium", "text": "Cannot audit data provenance"},
-            {"severity": "medium", "text": "Constitutional AI approach may introduce specific biases"},
-            {"severity": "low", "text": "Regular updates may change model behavior"}
-        ],
-        "compliance": {
-            "gdpr": "DPA available, EU data residency options",
-            "euAiAct": "Preparing for compliance",
-            "licensing": "Commercial use permitted with restrictions"
-        },
-        "dueDiligenceQuestions": [
-            "What is the breakdown of training data sources?",
-            "How does Constitutional AI training affect outputs for my use case?",
-            "What processes exist for training data quality control?",
-            "Can you provide demographic breakdowns of training data?",
-            "How do you handle copyrighted content in training?"
-        ],
-        "lastUpdated": "2024-12-01",
-        "documentationUrl": "https://www.anthropic.com/claude"
-    },
-    {
-        "id": "google-gemini",
-        "name": "Google Gemini",
-        "aliases": ["google", "gemini", "bard", "google ai", "gemini pro", "gemini ultra"],
-        "logo": "✨",
-        "category": "Multimodal AI",
-        "trainingData": {
-            "sources": "Web crawl, Google products data, licensed content, multimodal data",
-            "cutoffDate": "April 2024 (varies by model version)",
-            "geographicCoverage": "Global, multilingual",
-            "knownDatasets": "YouTube, Google Search, Google Books, undisclosed web data"
-        },
-        "transparency": {
-            "level": "Medium",
-            "details": "Some disclosure in technical reports; leverages Google ecosystem data",
-            "dataLineage": False,
-            "auditability": False
-        },
-        "knownBiases": [
-            "Google product ecosystem overrepresentation",
-            "Search ranking biases may affect training data",
-            "YouTube content biases",
-            "Multiple languages but English-dominant"
-        ],
-        "risks": [
-            {"severity": "high", "text": "Unclear separation between user data and training data"},
-            {"severity": "high", "text": "YouTube training data may include problematic content"},
-            {"severity": "medium", "text": "Google ecosystem creates unique bias patterns"},
-            {"severity": "medium", "text": "Rapid iteration may affect consistency"}
-        ],
-        "compliance": {
-            "gdpr": "Google Cloud DPA applies",
-            "euAiAct": "Working toward compliance",
-            "licensing": "Terms of service restrict certain applications"
-        },
-        "dueDiligenceQuestions": [
-            "What Google user data is included in training?",
-            "How is consent obtained for training data from Google products?",
-            "What content moderation exists for YouTube training data?",
-            "Can you separate model versions by training data source?",
-            "What is your data retention and model retraining policy?"
-        ],
-        "lastUpdated": "2024-12-01",
-        "documentationUrl": "https://deepmind.google/technologies/gemini/"
-    },
-    {
-        "id": "cohere",
-        "name": "Cohere",
-        "aliases": ["cohere", "cohere ai", "command", "command-r"],
-        "logo": "🌊",
-        "category": "Large Language Model",
-        "trainingData": {
-            "sources": "Web crawl, curated datasets, enterprise data (with permission)",
-            "cutoffDate": "Varies by model; regularly updated",
-            "geographicCoverage": "Global, multilingual focus",
-            "knownDatasets": "Proprietary curation, emphasis on quality filtering"
-        },
-        "transparency": {
-            "level": "Medium",
-            "details": "More transparent about enterprise data handling; publishes model cards",
-            "dataLineage": True,
-            "auditability": True
-        },
-        "knownBiases": [
-            "Curated data may introduce selection bias",
-            "Enterprise focus may affect general knowledge",
-            "Multilingual but quality varies by language",
-            "Business content overrepresented"
-        ],
-        "risks": [
-            {"severity": "medium", "text": "Data curation methodology not fully disclosed"},
-            {"severity": "medium", "text": "Enterprise data mixing may create conflicts"},
-            {"severity": "low", "text": "Better data lineage than competitors"},
-            {"severity": "low", "text": "Regular updates require version tracking"}
-        ],
-        "compliance": {
-            "gdpr": "Full DPA, data residency options",
-            "euAiAct": "Active compliance preparation",
-            "licensing": "Flexible commercial licensing"
-        },
-        "dueDiligenceQuestions": [
-            "What is your data curation methodology?",
-            "How do you separate enterprise customer data from model training?",
-            "Can you provide data lineage for my specific deployment?",
-            "What language-specific biases exist in multilingual models?",
-            "What are your data refresh and versioning practices?"
-        ],
-        "lastUpdated": "2024-12-01",
-        "documentationUrl": "https://cohere.com/"
-    },
-    {
-        "id": "huggingface",
-        "name": "Hugging Face (Hosted Models)",
-        "aliases": ["huggingface", "hugging face", "hf", "transformers"],
-        "logo": "🤗",
-        "category": "Model Repository/Inference",
-        "trainingData": {
-            "sources": "Varies by model - community uploaded",
-            "cutoffDate": "Model-dependent",
-            "geographicCoverage": "Model-dependent",
-            "knownDatasets": "Highly variable - check individual model cards"
-        },
-        "transparency": {
-            "level": "High",
-            "details": "Model cards required; community driven; variable quality",
-            "dataLineage": True,
-            "auditability": True
-        },
-        "knownBiases": [
-            "Biases vary dramatically by model",
-            "Community models may lack thorough bias testing",
-            "Documentation quality inconsistent",
-            "Older models may have outdated practices"
-        ],
-        "risks": [
-            {"severity": "high", "text": "Quality and safety vary dramatically by model"},
-            {"severity": "high", "text": "Some models lack proper documentation"},
-            {"severity": "medium", "text": "Community models may not be maintained"},
-            {"severity": "low", "text": "Transparency generally better than commercial options"}
-        ],
-        "compliance": {
-            "gdpr": "User responsible for compliance",
-            "euAiAct": "User responsible for compliance",
-            "licensing": "Varies by model - check individual licenses"
-        },
-        "dueDiligenceQuestions": [
-            "Does this specific model have a complete model card?",
-            "Who trained this model and what is their reputation?",
-            "What training data was used for this specific model?",
-            "Has this model been evaluated for bias?",
-            "Is this model actively maintained?",
-            "What is the license for this model?"
-        ],
-        "lastUpdated": "2024-12-01",
-        "documentationUrl": "https://huggingface.co/"
-    }
-]
+# Vendor profiles live in data/vendors.json (or VENDOR_CATALOGUE_PATH). The file
+# is loaded on first use, indexed once per load and picked up again whenever it
+# changes, so adding a vendor doesn't need a redeploy.
+VENDOR_CATALOGUE_PATH = os.environ.get(
+    "VENDOR_CATALOGUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vendors.json"),
+)
+vendor_catalogue = VendorCatalogue(
+    VENDOR_CATALOGUE_PATH,
+    check_interval=float(os.environ.get("VENDOR_CATALOGUE_CHECK_SECONDS", "5")),
+)
 
 
 def find_matching_vendors(user_input):
@@ -252,21 +155,7 @@ def find_matching_vendors(user_input):
     if not user_input:
         return []
     
-    user_input_lower = user_input.lower()
-    matched_vendors = []
-    
-    for vendor in VENDOR_DATABASE:
-        # Check if any alias matches
-        for alias in vendor.get("aliases", []):
-            if alias.lower() in user_input_lower:
-                matched_vendors.append(vendor)
-                break
-        else:
-            # Also check the vendor name
-            if vendor["name"].lower() in user_input_lower:
-                matched_vendors.append(vendor)
-    
-    return matched_vendors
+    return vendor_catalogue.find(user_input)
 
 
 def calculate_vendor_risk_score(vendors):
@@ -274,26 +163,26 @@ def calculate_vendor_risk_score(vendors):
     if not vendors:
         return None
     
-    total_high = 0
-    total_medium = 0
-    total_low = 0
-    
-    for vendor in vendors:
-        for risk in vendor.get("risks", []):
-            if risk["severity"] == "high":
-                total_high += 1
-            elif risk["severity"] == "medium":
-                total_medium += 1
-            elif risk["severity"] == "low":
-                total_low += 1
-    
     # Calculate risk score (lower is worse)
-    # High risks deduct 10 points, medium 5, low 2
+    # High risks deduct 10 points, medium 5, low 2 (precomputed per vendor at load)
     base_score = 100
-    score = base_score - (total_high * 10) - (total_medium * 5) - (total_low * 2)
+    score = base_score - vendor_catalogue.risk_deduction(vendors)
     return max(0, min(100, score))
 
 
+def score_vendor_portfolios(portfolios):
+    """
+    Calculate vendor risk scores for many vendor sets in one vectorized pass.
+
+    Args:
+        portfolios: Iterable of vendor ID lists
+
+    Returns:
+        NumPy array of scores, NaN where a set has no known vendors
+    """
+    return vendor_catalogue.score_portfolios(portfolios)
+
+
 # ---------- Deterministic Governance Scoring Engine ----------
 GOVERNANCE_WEIGHTS = {
     "external_impact": {"Low": 30, "Medium": 15, "High": 5},
@@ -330,6 +219,131 @@ def calculate_governance_score(tiers_json):
     return max(0, min(100, total_score))
 
 
+RECOMMENDATIONS = ("GO", "GO WITH CONDITIONS", "NO-GO")
+
+
+GO_THRESHOLD = 70
+CONDITIONS_THRESHOLD = 40
+
+
+def governance_recommendation(score):
+    """Map a governance score to its feasibility decision (70+ GO, 40-69 conditions)."""
+    if score is None:
+        return None
+    if score >= GO_THRESHOLD:
+        return "GO"
+    if score >= CONDITIONS_THRESHOLD:
+        return "GO WITH CONDITIONS"
+    return "NO-GO"
+
+
+# ---------- What-if scoring ----------
+# Scores are a pure function of the tiers and vendors, so hypothetical changes
+# ("what if regulatory sensitivity drops to Medium?") are rescored locally
+# instead of resubmitting the form. The score of every tier combination is
+# computed once, in one vectorized pass, for the client-side sensitivity view.
+_governance_score_grid = None
+
+
+def governance_score_grid():
+    """
+    Score every combination of tiers (3^5) at once.
+
+    Returns:
+        Dict with the categories (one grid axis each), each category's tiers
+        in axis order, the grid shape and the scores flattened in row-major
+        order
+    """
+    global _governance_score_grid
+    if _governance_score_grid is None:
+        points = [list(tier_map.values()) for tier_map in GOVERNANCE_WEIGHTS.values()]
+        try:
+            import numpy as np
+        except ImportError:
+            scores = [max(0, min(100, sum(combination)))
+                      for combination in itertools.product(*points)]
+        else:
+            # np.ix_ gives each category's points its own axis; adding them
+            # broadcasts to the score of every combination
+            scores = np.clip(sum(np.ix_(*points)), 0, 100).ravel().tolist()
+        _governance_score_grid = {
+            "categories": list(GOVERNANCE_WEIGHTS),
+            "tiers": {category: list(tier_map)
+                      for category, tier_map in GOVERNANCE_WEIGHTS.items()},
+            "shape": [len(tier_map) for tier_map in GOVERNANCE_WEIGHTS.values()],
+            "scores": scores,
+            "thresholds": {"GO": GO_THRESHOLD,
+                           "GO WITH CONDITIONS": CONDITIONS_THRESHOLD},
+        }
+    return _governance_score_grid
+
+
+def what_if_tiers(tiers, changes):
+    """
+    Apply hypothetical tier changes, matched case-insensitively like parsed tiers.
+
+    Raises:
+        ValueError: For an unknown category or tier
+    """
+    if not isinstance(changes, dict):
+        raise ValueError("tiers must be an object of category: tier")
+    tiers = dict(tiers)
+    for category, value in changes.items():
+        tier_map = GOVERNANCE_WEIGHTS.get(category)
+        if tier_map is None:
+            raise ValueError(f"unknown category {category!r}")
+        allowed = {tier.lower(): tier for tier in tier_map}
+        tier = allowed.get(value.strip().lower()) if isinstance(value, str) else None
+        if tier is None:
+            raise ValueError(f"{category} must be one of {'/'.join(tier_map)}, "
+                             f"got {value!r}")
+        tiers[category] = tier
+    return tiers
+
+
+def what_if_scenario(tiers, vendor_ids):
+    """Score one set of tiers and vendor IDs, skipping vendors not in the catalogue."""
+    vendors = [vendor for vendor in map(vendor_catalogue.get, vendor_ids)
+               if vendor is not None]
+    overall_score = calculate_governance_score(tiers)
+    return {
+        "tiers": tiers,
+        "overall_score": overall_score,
+        "recommendation": governance_recommendation(overall_score),
+        "vendor_ids": [vendor["id"] for vendor in vendors],
+        "vendor_risk_score": calculate_vendor_risk_score(vendors),
+    }
+
+
+def what_if_sensitivity(tiers):
+    """Overall score with each category moved to each of its tiers, the others held."""
+    return {
+        category: {tier: calculate_governance_score(dict(tiers, **{category: tier}))
+                   for tier in tier_map}
+        for category, tier_map in GOVERNANCE_WEIGHTS.items()
+    }
+
+
+# Swap candidates offered per category of an assessed vendor
+WHAT_IF_ALTERNATIVES = int(os.environ.get("WHAT_IF_ALTERNATIVES", "5"))
+
+
+def what_if_vendor_choices(vendor_ids):
+    """
+    Vendors offered in the what-if panel: the assessed ones, then a few others
+    from the same categories to swap in, rather than the whole catalogue.
+    """
+    assessed = [vendor for vendor in map(vendor_catalogue.get, vendor_ids)
+                if vendor is not None]
+    choices = {vendor["id"]: vendor for vendor in assessed}
+    for category in dict.fromkeys(vendor.get("category", "") for vendor in assessed):
+        alternatives = [vendor for vendor in vendor_catalogue.by_category(category)
+                        if vendor["id"] not in choices]
+        choices.update((vendor["id"], vendor)
+                       for vendor in alternatives[:WHAT_IF_ALTERNATIVES])
+    return list(choices.values())
+
+
 # ---------- Compressed governance prompt ----------
 BASE_PROMPT = """
 You are an AI Governance Assistant specialized in IDEATION-STAGE evaluation.
@@ -432,241 +446,1968 @@ Classification Guidelines:
 - purpose_clarity: Clarity of MVP and goals (Strong=well-defined, Moderate=needs refinement, Weak=unclear)
 """
 
-# ---------- OpenAI client ----------
+# ---------- LLM backend ----------
+# LLM_BACKEND=openai (default) calls the OpenAI API; LLM_BACKEND=replay answers
+# from recorded responses (LLM_REPLAY_PATH, written via LLM_RECORD_PATH) so the
+# app can run, be benchmarked and be load-tested with no network.
+ASSESSMENT_MODEL = os.environ.get("ASSESSMENT_MODEL", "gpt-4o-mini")
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "openai")
+
+# Opt-in: ask for schema-enforced JSON instead of markdown with a trailing tier block
+STRUCTURED_OUTPUT = os.environ.get("STRUCTURED_OUTPUT", "0") == "1"
+# Re-ask for just the tiers when a response's tier block is missing or invalid
+TIER_REASK_ENABLED = os.environ.get("TIER_REASK_ENABLED", "1") != "0"
+STRUCTURED_OUTPUT_INSTRUCTIONS = (
+    "Return your answer as JSON matching the provided schema: put the markdown body "
+    "of each section (without its heading) in sections.section_1 to "
+    "sections.section_6, and the tier classifications in tiers."
+)
+TIER_REASK_MAX_TOKENS = 150
+TIER_REASK_PROMPT = (
+    "You are a Risk Classifier. Read the governance assessment and classify each "
+    "dimension. "
+    "Respond with a JSON object only, using exactly these keys and tiers: "
+    + json.dumps({key: "/".join(tier_map)
+                  for key, tier_map in GOVERNANCE_WEIGHTS.items()})
+    + "\n\n" + BASE_PROMPT[BASE_PROMPT.index("Classification Guidelines:"):].strip()
+)
+
+# ---------- LLM rate governor ----------
+# One team's batch of submissions must not use up the provider's rate limit for
+# everyone else. Every assessment's LLM calls are admitted through token
+# buckets (requests and tokens per minute, per tenant and in total) shared by
+# all workers through a SQLite file; waiting tenants take turns, and the
+# provider's rate-limit headers pause admissions when it asks us to back off.
+# On by default for the OpenAI backend only.
+LLM_GOVERNOR_ENABLED = os.environ.get("LLM_GOVERNOR",
+                                      "1" if LLM_BACKEND == "openai" else "0") == "1"
+LLM_GOVERNOR_DB = os.environ.get("LLM_GOVERNOR_DB",
+                                 os.path.join(app.instance_path, "llm_governor.db"))
+# Expected completion tokens per assessment, charged up front and corrected from
+# the usage reported
+LLM_GOVERNOR_COMPLETION_TOKENS = int(os.environ.get("LLM_GOVERNOR_COMPLETION_TOKENS",
+                                                    "1500"))
+# Requests are rate limited per client address unless TENANT_HEADER names a
+# header that the proxy in front of the app sets (overwriting whatever the
+# client sent); TENANT_ALLOWLIST then limits it to known tenants. Clients can
+# pick any value for a header the proxy doesn't control, so it is off by default.
+TENANT_HEADER = os.environ.get("TENANT_HEADER", "")
+TENANT_ALLOWLIST = {tenant.strip()
+                    for tenant in os.environ.get("TENANT_ALLOWLIST", "").split(",")
+                    if tenant.strip()}
+DEFAULT_TENANT = "default"
+
+GOVERNOR_WAIT_SECONDS = metrics_registry.histogram(
+    "llm_governor_wait_seconds", "Time assessments waited for the rate governor",
+    ["outcome"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+GOVERNOR_REJECTIONS = metrics_registry.counter(
+    "llm_governor_rejections_total", "Assessments refused by the rate governor",
+    ["reason"]
+)
+GOVERNOR_BACKOFFS = metrics_registry.counter(
+    "llm_governor_backoffs_total",
+    "Admission pauses requested by the provider's rate-limit headers", ["source"]
+)
+
+
+def observe_rejection(reason, waited):
+    GOVERNOR_REJECTIONS.inc(reason=reason)
+    GOVERNOR_WAIT_SECONDS.observe(waited, outcome="rejected")
+
+
+if LLM_GOVERNOR_ENABLED:
+    os.makedirs(os.path.dirname(os.path.abspath(LLM_GOVERNOR_DB)), exist_ok=True)
+    llm_governor = RateGovernor(
+        LLM_GOVERNOR_DB,
+        global_rpm=int(os.environ.get("LLM_GLOBAL_RPM", "500")),
+        global_tpm=int(os.environ.get("LLM_GLOBAL_TPM", "200000")),
+        tenant_rpm=int(os.environ.get("LLM_TENANT_RPM", "100")),
+        tenant_tpm=int(os.environ.get("LLM_TENANT_TPM", "60000")),
+        max_wait=float(os.environ.get("LLM_GOVERNOR_MAX_WAIT", "30")),
+        on_admit=lambda waited: GOVERNOR_WAIT_SECONDS.observe(
+            waited, outcome="admitted"),
+        on_reject=observe_rejection,
+        on_backoff=lambda _seconds, source: GOVERNOR_BACKOFFS.inc(source=source),
+    )
+else:
+    llm_governor = None
+
+
+def tenant_id():
+    """Tenant the current request is rate limited as."""
+    if TENANT_HEADER:
+        tenant = request.headers.get(TENANT_HEADER, "").strip()
+        if tenant and (not TENANT_ALLOWLIST or tenant in TENANT_ALLOWLIST):
+            return tenant
+    # The client's own address, as reported by the trusted proxies (see
+    # TRUSTED_PROXY_HOPS)
+    return request.remote_addr or DEFAULT_TENANT
+
+
+def governor_request(assessment, calls):
+    """Tenant, calls and estimated tokens to ask the governor to admit."""
+    prompt_tokens = system_prompt_tokens() + assessment["prompt_usage"]["total_tokens"]
+    return (assessment.get("tenant") or DEFAULT_TENANT, calls,
+            calls * prompt_tokens + LLM_GOVERNOR_COMPLETION_TOKENS)
+
+
+def admit_assessment(assessment, calls=1):
+    """
+    Wait for the rate governor to admit an assessment's LLM calls.
+
+    Returns:
+        Grant to settle with the reported usage, or None when not governed
+
+    Raises:
+        RateLimited: If the calls can't be admitted in time
+    """
+    if llm_governor is None or not calls:
+        return None
+    with span("rate_limit_wait"):
+        return llm_governor.admit(*governor_request(assessment, calls))
+
+
+def settle_assessment(grant, usage):
+    """Correct a grant's token estimate with the usage the provider reported."""
+    if grant is not None and usage is not None:
+        grant.settle(usage.prompt_tokens + usage.completion_tokens)
+
 api_key = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPEN_AI_API_KEY")
-client = OpenAI(api_key=api_key) if api_key else None
+if LLM_BACKEND == "replay":
+    backend = ReplayBackend(
+        os.environ.get("LLM_REPLAY_PATH") or None,
+        latency=float(os.environ.get("LLM_REPLAY_LATENCY_MS", "0")) / 1000,
+        chunk_delay=float(os.environ.get("LLM_REPLAY_CHUNK_MS", "0")) / 1000,
+    )
+elif LLM_BACKEND == "openai":
+    backend = OpenAIBackend(
+        api_key,
+        ASSESSMENT_MODEL,
+        timeout=float(os.environ.get("LLM_TIMEOUT_SECONDS", "60")),
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", "3")),
+        max_connections=int(os.environ.get("LLM_MAX_CONNECTIONS", "20")),
+        max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "8")),
+        base_url=os.environ.get("OPENAI_BASE_URL") or None,
+        on_headers=llm_governor.observe_headers if llm_governor else None,
+    ) if api_key else None
+else:
+    raise ValueError(f"Unsupported LLM_BACKEND: {LLM_BACKEND}")
+if backend is not None and os.environ.get("LLM_RECORD_PATH"):
+    backend = RecordingBackend(backend, os.environ["LLM_RECORD_PATH"])
+
+
+# ---------- Prompt token budget ----------
+# The user prompt is capped at PROMPT_TOKEN_BUDGET tokens (0 disables the cap).
+# BASE_PROMPT always goes first and never varies between requests, so the
+# provider's prompt cache can reuse it; per-request counts go to /metrics.
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "2000")) or None
+
+PROMPT_TOKENS = metrics_registry.histogram(
+    "assessment_prompt_tokens", "Locally counted prompt tokens per assessment call",
+    ["section"],
+    buckets=(25, 50, 100, 250, 500, 1000, 1500, 2000, 3000, 5000),
+)
+PROMPT_FIELDS_DROPPED = metrics_registry.counter(
+    "assessment_prompt_fields_dropped_total", "Empty form fields left out of the prompt"
+)
+PROMPT_FIELDS_TRUNCATED = metrics_registry.counter(
+    "assessment_prompt_fields_truncated_total",
+    "Free-text fields shortened to fit the token budget",
+    ["field"],
+)
+PROVIDER_PROMPT_TOKENS = metrics_registry.counter(
+    "assessment_provider_prompt_tokens_total", "Prompt tokens reported by the provider",
+    ["cached"]
+)
+PROVIDER_COMPLETION_TOKENS = metrics_registry.counter(
+    "assessment_provider_completion_tokens_total",
+    "Completion tokens reported by the provider"
+)
+LLM_COST = metrics_registry.counter("assessment_llm_cost_usd_total",
+                                    "Estimated LLM spend in USD")
+# USD per million tokens; defaults are gpt-4o-mini list prices
+LLM_PRICE_INPUT = float(os.environ.get("LLM_PRICE_INPUT_PER_MTOK", "0.15"))
+LLM_PRICE_CACHED_INPUT = float(os.environ.get("LLM_PRICE_CACHED_INPUT_PER_MTOK",
+                                              "0.075"))
+LLM_PRICE_OUTPUT = float(os.environ.get("LLM_PRICE_OUTPUT_PER_MTOK", "0.60"))
+
+_system_prompt_tokens = None
+
+
+def system_prompt_tokens():
+    global _system_prompt_tokens
+    if _system_prompt_tokens is None:
+        _system_prompt_tokens = count_tokens(BASE_PROMPT)
+    return _system_prompt_tokens
+
+
+def observe_prompt_usage(assessment):
+    """Record the local token counts of a prompt about to be sent."""
+    usage = assessment["prompt_usage"]
+    PROMPT_TOKENS.observe(system_prompt_tokens(), section="system")
+    for title, tokens in usage["sections"].items():
+        PROMPT_TOKENS.observe(tokens, section=title)
+    PROMPT_TOKENS.observe(system_prompt_tokens() + usage["total_tokens"],
+                          section="total")
+    PROMPT_FIELDS_DROPPED.inc(len(usage["dropped_fields"]))
+    for label in usage["truncated_fields"]:
+        PROMPT_FIELDS_TRUNCATED.inc(field=label)
+
+
+def llm_cost(usage):
+    """Estimated USD cost of a completion's token usage at the LLM_PRICE_* rates."""
+    return (
+        (usage.prompt_tokens - usage.cached_tokens) * LLM_PRICE_INPUT
+        + usage.cached_tokens * LLM_PRICE_CACHED_INPUT
+        + usage.completion_tokens * LLM_PRICE_OUTPUT
+    ) / 1_000_000
+
+
+def observe_provider_usage(usage):
+    """Record the token usage the backend reports, split by prompt cache hits."""
+    if usage is None:
+        return
+    PROVIDER_PROMPT_TOKENS.inc(usage.cached_tokens, cached="true")
+    PROVIDER_PROMPT_TOKENS.inc(usage.prompt_tokens - usage.cached_tokens,
+                               cached="false")
+    PROVIDER_COMPLETION_TOKENS.inc(usage.completion_tokens)
+    LLM_COST.inc(llm_cost(usage))
+
+
+def build_assessment_input(form):
+    """
+    Collect the wizard fields from a submitted form and build the GPT prompt.
+
+    Args:
+        form: The submitted form (anything with Flask's .get/.getlist interface)
+
+    Returns:
+        Dictionary with the system name, matched vendors, vendor risk score
+        and the structured user prompt sent alongside BASE_PROMPT
+    """
+    # Collect all fields from the wizard
+    system_name = form.get("system_name", "").strip()
+    short_description = form.get("short_description", "").strip()
+    ai_type = form.get("ai_type", "").strip()
+    new_or_update = form.get("new_or_update", "").strip()
+    primary_intent = form.get("primary_intent", "").strip()
+    
+    # Regulatory exposure checkboxes
+    reg_triggers = []
+    if form.get("reg_biometric"):
+        reg_triggers.append("Uses biometric data")
+    if form.get("reg_minors"):
+        reg_triggers.append("Involves minors")
+    if form.get("reg_employment"):
+        reg_triggers.append("Involves employment decisions")
+    if form.get("reg_housing"):
+        reg_triggers.append("Involves housing decisions")
+    if form.get("reg_credit"):
+        reg_triggers.append("Involves credit or financial eligibility")
+    if form.get("reg_health"):
+        reg_triggers.append("Involves health information")
+    regulatory_exposure = ", ".join(reg_triggers) if reg_triggers else "None selected"
+
+    problem = form.get("problem", "").strip()
+    who_problem = form.get("who_problem", "").strip()
+    value_created = form.get("value_created", "").strip()
+    non_ai_alt = form.get("non_ai_alt", "").strip()
+    success_metrics = form.get("success_metrics", "").strip()
+    mvp_description = form.get("mvp_description", "").strip()
+
+    # Jurisdictions
+    jurisdictions = form.getlist("jurisdictions")
+    jurisdictions_str = ", ".join(jurisdictions) if jurisdictions else "None selected"
+    jurisdiction_notes = form.get("jurisdiction_notes", "").strip()
+    
+    data_sources = form.get("data_sources", "").strip()
+    personal_data = form.get("personal_data", "").strip()
+    third_parties = form.get("third_parties", "").strip()
+    
+    # Context of Use
+    deployment_context = form.get("deployment_context", "").strip()
+    level_of_autonomy = form.get("level_of_autonomy", "").strip()
+    deployment_notes = form.get("deployment_notes", "").strip()
+    
+    provenance = form.get("provenance", "").strip()
+    
+    # Human annotators section
+    uses_annotators = "Yes" if form.get("uses_annotators") else "No"
+    annotation_source = form.get("annotation_source", "").strip()
+    labour_safeguards = form.get("labour_safeguards", "").strip()
+    pay_verified = form.get("pay_verified", "").strip()
+    vulnerable_annotators = form.get("vulnerable_annotators", "").strip()
+    
+    # Planned safeguards
+    safeguards = form.getlist("safeguards")
+    safeguards_str = ", ".join(safeguards) if safeguards else "None selected"
+    custom_safeguards = form.get("custom_safeguards", "").strip()
+
+    primary_users = form.get("primary_users", "").strip()
+    affected_groups = form.get("affected_groups", "").strip()
+    harm_pathways = form.getlist("harm_pathways")
+    harm_pathways_str = ", ".join(harm_pathways) if harm_pathways else "None selected"
+    risk_tolerance = form.get("risk_tolerance", "").strip()
+
+    # Find matching vendors from third_parties input
+    with span("vendor_matching"):
+        matched_vendors = find_matching_vendors(third_parties)
+        vendor_risk_score = calculate_vendor_risk_score(matched_vendors)
+    
+    # Build vendor summary for GPT
+    vendor_summary = ""
+    if matched_vendors:
+        vendor_lines = []
+        for v in matched_vendors:
+            risk_counts = vendor_catalogue.risk_counts(v)
+            vendor_lines.append(
+                f"- {v['name']} (Transparency: {v['transparency']['level']}, "
+                f"High Risks: {risk_counts['high']}, "
+                f"Medium Risks: {risk_counts['medium']})"
+            )
+        vendor_summary = "\n".join(vendor_lines)
+    else:
+        vendor_summary = "No known vendors detected"
+
+    # Build a single structured prompt for GPT; empty fields are left out and
+    # free-text answers are shortened if the prompt is over budget
+    with span("prompt_assembly"):
+        user_input, prompt_usage = assemble_prompt([
+            ("SECTION 1: SYSTEM INTAKE", [
+                field("System name", system_name),
+                field("Short description", short_description, free_text=True),
+                field("AI type", ai_type),
+                field("New or update", new_or_update),
+                field("Primary intent", primary_intent, free_text=True),
+                field("Regulatory exposure triggers", regulatory_exposure),
+            ]),
+            ("SECTION 2: PURPOSE & CONCEPT", [
+                field("Problem it solves", problem, free_text=True),
+                field("Who experiences this problem today", who_problem,
+                      free_text=True),
+                field("Value created by AI", value_created, free_text=True),
+                field("Non-AI alternative today", non_ai_alt, free_text=True),
+                field("Success will be measured by", success_metrics, free_text=True),
+                field("MVP description", mvp_description, free_text=True),
+            ]),
+            ("SECTION 3: LEGAL & DATA FOUNDATIONS", [
+                field("Regions / Jurisdictions", jurisdictions_str),
+                field("Jurisdiction notes", jurisdiction_notes, free_text=True),
+                field("Data sources", data_sources, free_text=True),
+                field("Personal / sensitive data involved", personal_data,
+                      free_text=True),
+                field("Third-party models / APIs / vendors", third_parties),
+                field("Detected vendor risk profiles", vendor_summary, block=True),
+                field("Deployment context", deployment_context, free_text=True),
+                field("Level of autonomy", level_of_autonomy),
+                field("Deployment notes", deployment_notes, free_text=True),
+                field("Data provenance / licensing notes", provenance, free_text=True),
+                field("Uses human annotators/reviewers/moderators", uses_annotators),
+                field("Annotation source", annotation_source, free_text=True),
+                field("Labour safeguards", labour_safeguards, free_text=True),
+                field("Pay is fair & verified", pay_verified),
+                field("Vulnerable annotator groups", vulnerable_annotators,
+                      free_text=True),
+                field("Planned safeguards / mitigations", safeguards_str),
+                field("Custom safeguards", custom_safeguards, free_text=True),
+            ]),
+            ("SECTION 4: STAKEHOLDERS & IMPACT", [
+                field("Primary users", primary_users, free_text=True),
+                field("Affected groups (including vulnerable groups)", affected_groups,
+                      free_text=True),
+                field("Harm pathways that may apply", harm_pathways_str),
+                field("Stated risk tolerance", risk_tolerance),
+            ]),
+        ], budget=PROMPT_TOKEN_BUDGET)
+
+    inputs = {key: values if len(values) > 1 else values[0]
+              for key, values in form.to_dict(flat=False).items()}
+
+    return {
+        "system_name": system_name,
+        "inputs": inputs,
+        "matched_vendors": matched_vendors,
+        "vendor_risk_score": vendor_risk_score,
+        "user_input": user_input,
+        "prompt_usage": prompt_usage,
+    }
+
+
+def build_messages(user_input):
+    """Build the chat messages for an assessment call."""
+    # Static system messages come first and stay byte-identical across
+    # requests so provider-side prompt caching can match the prefix
+    messages = [{"role": "system", "content": BASE_PROMPT}]
+    if STRUCTURED_OUTPUT:
+        messages.append({"role": "system", "content": STRUCTURED_OUTPUT_INSTRUCTIONS})
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
+
+def completion_options():
+    """Extra chat completion arguments for the configured output mode."""
+    if STRUCTURED_OUTPUT:
+        schema = structured_output_schema(GOVERNANCE_WEIGHTS)
+        return {"response_format": {"type": "json_schema", "json_schema": schema}}
+    return {}
+
+
+def response_text(content):
+    """Normalise a completion's content to the markdown-plus-tier-block format."""
+    content = content or ""
+    if STRUCTURED_OUTPUT:
+        try:
+            return structured_to_markdown(content)
+        except (ValueError, AttributeError):
+            # Not valid structured output; parse it like a markdown response
+            return content
+    return content
+
+
+def reask_tiers(parsed, tenant=None):
+    """
+    Ask the model for just the tier classifications of an existing assessment.
+
+    Used when a response's tier block is missing or fails validation; a short
+    JSON-only completion is far cheaper than regenerating the assessment.
+    The call is admitted by the rate governor as the given tenant.
+
+    Returns:
+        Validated tiers dict or None
+    """
+    if not backend or not TIER_REASK_ENABLED:
+        return None
+    app.logger.warning("Re-asking for tiers: %s", "; ".join(parsed.problems))
+    grant = None
+    if llm_governor is not None:
+        tokens = (count_tokens(TIER_REASK_PROMPT) + count_tokens(parsed.display)
+                  + TIER_REASK_MAX_TOKENS)
+        with span("rate_limit_wait"):
+            grant = llm_governor.admit(tenant or DEFAULT_TENANT, 1, tokens)
+    completion = backend.complete(
+        [
+            {"role": "system", "content": TIER_REASK_PROMPT},
+            {"role": "user", "content": parsed.display},
+        ],
+        temperature=0,
+        max_tokens=TIER_REASK_MAX_TOKENS,
+        response_format={"type": "json_object"},
+    )
+    settle_assessment(grant, completion.usage)
+    observe_provider_usage(completion.usage)
+    try:
+        candidate = json.loads(completion.text)
+    except ValueError:
+        return None
+    tiers, _ = validate_tiers(candidate, GOVERNANCE_WEIGHTS)
+    return tiers
+
+
+def build_scores(tiers):
+    """Build the score summary shown on the results page from the tiers."""
+    # Calculate governance score deterministically using Python
+    # This prevents AI math hallucinations
+    if not tiers:
+        return None
+    overall_score = calculate_governance_score(tiers)
+    return {
+        "overall_score": overall_score,
+        "external_impact": tiers.get("external_impact", ""),
+        "internal_failure": tiers.get("internal_failure", ""),
+        "regulatory_sensitivity": tiers.get("regulatory_sensitivity", ""),
+        "data_legal_soundness": tiers.get("data_legal_soundness", ""),
+        "purpose_clarity": tiers.get("purpose_clarity", "")
+    }
+
+
+# One reusable converter per thread; rendered sections are cached by content
+# hash so streamed and reused sections are converted only once
+markdown_renderer = MarkdownRenderer(
+    cache_size=int(os.environ.get("MARKDOWN_CACHE_SIZE", "512")))
+
+
+def render_markdown(text):
+    """Render a markdown fragment to HTML through the renderer's cache."""
+    html, hit = markdown_renderer.render(text)
+    CACHE_LOOKUPS.inc(cache="markdown", result="hit" if hit else "miss")
+    return html
+
+
+def render_assessment(display_result):
+    """
+    Render assessment markdown to HTML.
+
+    Sections already rendered, while streaming or by an earlier assessment
+    that a re-assessment reuses, come from the cache and only the others are
+    converted. With none cached the text is converted in one pass, which is
+    cheaper than section by section.
+    """
+    text = display_result.strip()
+    chunks = section_chunks(text)
+    cached = [markdown_renderer.get(chunk.strip()) for chunk in chunks]
+    hits = sum(html is not None for html in cached)
+    if not hits:
+        return render_markdown(text)
+    CACHE_LOOKUPS.inc(hits, cache="markdown", result="hit")
+    return "\n".join(html if html is not None else render_markdown(chunk)
+                     for chunk, html in zip(chunks, cached, strict=True))
+
+
+def assessment_outcome(raw_result, tenant=None):
+    """
+    Process a raw LLM response into the outcome of an assessment.
+
+    Invalid tiers trigger a targeted re-ask, rate limited as tenant, rather
+    than a failed score.
+
+    Returns:
+        Dictionary with the raw result, tiers, rendered HTML and scores
+    """
+    with span("parse"):
+        parsed = parse_assessment(raw_result, GOVERNANCE_WEIGHTS)
+    tiers = parsed.tiers
+    if tiers is None:
+        ERRORS.inc(stage="tiers")
+        try:
+            with span("tier_reask"):
+                tiers = reask_tiers(parsed, tenant)
+        except Exception:
+            ERRORS.inc(stage="tier_reask")
+            app.logger.exception("Tier re-ask failed")
+    with span("render_markdown"):
+        html = render_assessment(parsed.display)
+    return {"raw_result": raw_result, "tiers": tiers, "html": html,
+            "scores": build_scores(tiers)}
+
+
+# ---------- Parallel section generation ----------
+# PARALLEL_SECTIONS=1 splits an assessment across several smaller calls:
+# sections 1-4 only depend on the form, so they are written concurrently;
+# one more call then writes sections 5-6 and the tier block from them. The
+# outputs are merged into the single-call markdown layout, so parsing,
+# scoring, caching and results.html are unchanged. Structured output keeps
+# the single call; streaming is switched off in this mode.
+PARALLEL_SECTIONS = (os.environ.get("PARALLEL_SECTIONS", "0") == "1"
+                     and not STRUCTURED_OUTPUT)
+INDEPENDENT_SECTIONS = (1, 2, 3, 4)
+PARALLEL_SECTION_WORKERS = int(os.environ.get("PARALLEL_SECTION_WORKERS", "16"))
+_section_pool = None
+_section_pool_lock = threading.Lock()
+
+
+def section_pool():
+    """
+    The executor shared by every request in the process for section calls.
+
+    Built on first use, so workers forked from a preloaded app each get their
+    own, and apps that never split an assessment don't create one.
+    """
+    global _section_pool
+    if _section_pool is None:
+        with _section_pool_lock:
+            if _section_pool is None:
+                _section_pool = ThreadPoolExecutor(max_workers=PARALLEL_SECTION_WORKERS,
+                                                   thread_name_prefix="section")
+    return _section_pool
+
+
+def split_base_prompt():
+    """
+    Split BASE_PROMPT into its preamble, the instructions for each numbered
+    section and the tier classification instructions.
+    """
+    headings = list(re.finditer(r'^### (\d+)\. ', BASE_PROMPT, re.MULTILINE))
+    preamble = BASE_PROMPT[:headings[0].start()]
+    preamble = preamble[:preamble.index("Always respond")].strip()
+    tail_start = BASE_PROMPT.index("\n---\n", headings[-1].start())
+    instructions = {}
+    for heading, following in zip(headings, headings[1:] + [None], strict=True):
+        end = following.start() if following else tail_start
+        instructions[int(heading.group(1))] = BASE_PROMPT[heading.start():end].strip()
+    classification = BASE_PROMPT[tail_start:].strip().lstrip("-").strip()
+    return preamble, instructions, classification
+
+
+_preamble, _section_instructions, _classification = split_base_prompt()
+SECTION_PROMPTS = {
+    number: (
+        f"{_preamble}\n\nRespond in CLEAN MARKDOWN with ONLY the section below, "
+        f"starting with its heading. Do not write any other section or a tier "
+        f"classification.\n\n"
+        f"{_section_instructions[number]}\n"
+    )
+    for number in INDEPENDENT_SECTIONS
+}
+GATE_PROMPT = (
+    f"{_preamble}\n\nThe user message holds the form inputs followed by drafted "
+    f"sections 1-4 of the assessment. Building on those sections, respond in CLEAN "
+    f"MARKDOWN with ONLY these headings:\n\n"
+    + "\n\n".join(text for number, text in sorted(_section_instructions.items())
+                  if number not in INDEPENDENT_SECTIONS)
+    + f"\n\n---\n\n{_classification}\n"
+)
+
+
+def section_messages(number, user_input):
+    """Chat messages for writing one of the independent sections."""
+    return [{"role": "system", "content": SECTION_PROMPTS[number]},
+            {"role": "user", "content": user_input}]
+
+
+def drafted_sections(texts):
+    """
+    Merge the independent sections' markdown ({number: text}) in order, each
+    under its heading.
+    """
+    parts = []
+    for number in INDEPENDENT_SECTIONS:
+        text = texts[number].strip()
+        if not HEADING_RE.match(text.split("\n", 1)[0]):
+            text = f"### {number}. {SECTION_TITLES[number - 1]}\n{text}"
+        parts.append(text)
+    return "\n\n".join(parts)
+
+
+def gate_messages(user_input, drafted):
+    """Chat messages for writing sections 5-6 and the tiers from the drafted ones."""
+    return [{"role": "system", "content": GATE_PROMPT},
+            {"role": "user",
+             "content": f"{user_input}\n\n---\n\nDRAFTED SECTIONS 1-4:\n\n{drafted}"}]
+
+
+def merged_completion(drafted, completions):
+    """Combine the section calls into one completion in the single-call layout."""
+    usages = [completion.usage for completion in completions
+              if completion.usage is not None]
+    usage = Usage(sum(u.prompt_tokens for u in usages),
+                  sum(u.completion_tokens for u in usages),
+                  sum(u.cached_tokens for u in usages)) if usages else None
+    return Completion(f"{drafted}\n\n{completions[-1].text.strip()}\n", usage)
+
+
+def generate_sections(user_input):
+    """Write an assessment as concurrent section calls followed by the gate call."""
+    pool = section_pool()
+    futures = [pool.submit(backend.complete, section_messages(number, user_input),
+                           temperature=0.2)
+               for number in INDEPENDENT_SECTIONS]
+    completions = [future.result() for future in futures]
+    drafted = drafted_sections({
+        number: completion.text
+        for number, completion in zip(INDEPENDENT_SECTIONS, completions, strict=True)
+    })
+    gate = backend.complete(gate_messages(user_input, drafted), temperature=0.2)
+    return merged_completion(drafted, [*completions, gate])
+
+
+# ---------- Incremental re-assessment ----------
+# When a user goes back to the wizard and resubmits, the prompt sections are
+# diffed against the session's previous assessment (from the history) and
+# only the output sections they influence are regenerated; the rest of the
+# previous response is reused. Sections 5-6 and the tiers are written from
+# sections 1-4, so they are regenerated only when one of those was. When
+# every independent section is affected, or the previous assessment was
+# written by a different model or prompts, the assessment is run in full.
+INCREMENTAL_REASSESSMENT = (os.environ.get("INCREMENTAL_REASSESSMENT", "1") != "0"
+                            and not STRUCTURED_OUTPUT)
+
+# Stored with each assessment; sections are only reused from a matching one
+PROMPT_FINGERPRINT = fingerprint(ASSESSMENT_MODEL, BASE_PROMPT, SECTION_PROMPTS,
+                                 GATE_PROMPT, GOVERNANCE_WEIGHTS)
+
+# Output sections (see BASE_PROMPT) that read each section of the user prompt
+SECTION_INFLUENCE = {
+    # Description, intent and regulatory triggers frame the purpose, legal and
+    # stakeholder analysis
+    "SECTION 1: SYSTEM INTAKE": (1, 2, 3, 4),
+    "SECTION 2: PURPOSE & CONCEPT": (2,),
+    # Deployment, autonomy and safeguards also shape the harm analysis
+    "SECTION 3: LEGAL & DATA FOUNDATIONS": (3, 4),
+    "SECTION 4: STAKEHOLDERS & IMPACT": (4,),
+}
+
+REASSESSED_SECTIONS = metrics_registry.counter(
+    "assessment_incremental_sections_total",
+    "Output sections of incremental re-assessments, reused or regenerated", ["source"],
+)
+
+
+def reassessment_plan(assessment):
+    """
+    Work out which output sections of the session's previous assessment a
+    resubmission can reuse.
+
+    Returns:
+        Dict with the previous raw result, the reusable sections' markdown by
+        number and the stale section numbers, or None to run in full
+    """
+    previous_id = assessment.get("previous_id")
+    if not INCREMENTAL_REASSESSMENT or not previous_id:
+        return None
+    with span("history_read"):
+        archived = assessment_history.get(previous_id)
+    if (archived is None or not archived["raw_result"]
+            or archived["prompt_fingerprint"] != PROMPT_FINGERPRINT):
+        return None
+    parsed = parse_assessment(archived["raw_result"], GOVERNANCE_WEIGHTS)
+    outputs = {number: markdown for number, _, markdown in parsed.sections}
+    if parsed.tiers is None or any(number not in outputs
+                                   for number in range(1, len(SECTION_TITLES) + 1)):
+        return None
+
+    before = split_sections(archived["user_input"])
+    after = split_sections(assessment["user_input"])
+    stale = set()
+    for title in before.keys() | after.keys():
+        if before.get(title) != after.get(title):
+            stale.update(SECTION_INFLUENCE.get(title, INDEPENDENT_SECTIONS))
+    if stale.issuperset(INDEPENDENT_SECTIONS):
+        return None
+    return {
+        "raw_result": archived["raw_result"],
+        "sections": {number: outputs[number] for number in INDEPENDENT_SECTIONS
+                     if number not in stale},
+        "stale": sorted(stale),
+    }
+
+
+def observe_reassessment(plan):
+    REASSESSED_SECTIONS.inc(len(plan["sections"]), source="reused")
+    REASSESSED_SECTIONS.inc(len(plan["stale"]), source="regenerated")
+
+
+def reassess(assessment, plan):
+    """
+    Regenerate the stale sections of a previous assessment, then sections 5-6
+    and the tiers.
+    """
+    observe_reassessment(plan)
+    if not plan["stale"]:
+        return Completion(plan["raw_result"])
+    user_input = assessment["user_input"]
+    pool = section_pool()
+    futures = {number: pool.submit(backend.complete,
+                                   section_messages(number, user_input),
+                                   temperature=0.2)
+               for number in plan["stale"]}
+    completions = {number: future.result() for number, future in futures.items()}
+    drafted = drafted_sections({**plan["sections"],
+                                **{number: completion.text
+                                   for number, completion in completions.items()}})
+    gate = backend.complete(gate_messages(user_input, drafted), temperature=0.2)
+    return merged_completion(drafted, [*completions.values(), gate])
+
+
+# ---------- Results store ----------
+# Finished assessments are kept as compact compressed records holding vendor
+# IDs rather than full vendor profiles; /results and /report rebuild the vendor
+# details from the catalogue. The backend is chosen by RESULTS_STORE_URL.
+results_store = ResultsStore(
+    os.environ.get("RESULTS_STORE_URL")
+    or "sqlite:///" + os.path.join(tempfile.gettempdir(), "assessment_results.db"),
+    ttl_seconds=int(os.environ.get("RESULTS_STORE_TTL", "86400")),
+    max_bytes=int(os.environ.get("RESULTS_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+    max_rows=int(os.environ.get("RESULTS_STORE_MAX_ROWS", "50000")),
+)
+# Job status records share the store; load_assessment() never resolves them
+JOB_STATUS_PREFIX = "job:"
+
+
+def assessment_record(assessment, html=None, scores=None, error=None):
+    """Build the record saved in the results store for an assessment."""
+    return {
+        "result": html,
+        "error": error,
+        "scores": scores,
+        "vendor_ids": [vendor["id"] for vendor in assessment["matched_vendors"]],
+        "vendor_risk_score": assessment["vendor_risk_score"],
+        "system_name": assessment["system_name"],
+    }
+
+
+# ---------- Assessment history ----------
+# Every finished assessment is also archived in SQLite so it can be served by
+# permalink (/results/<id>, /report/<id>) and listed at /assessments long after
+# the results store has expired it.
+ASSESSMENT_HISTORY_DB = os.environ.get(
+    "ASSESSMENT_HISTORY_DB", os.path.join(app.instance_path, "assessments.db")
+)
+os.makedirs(os.path.dirname(os.path.abspath(ASSESSMENT_HISTORY_DB)), exist_ok=True)
+assessment_history = AssessmentHistory(ASSESSMENT_HISTORY_DB)
+
+
+def save_assessment(assessment, outcome, assessment_id=None):
+    """Save a finished assessment to the results store and the history."""
+    with span("results_store_write"):
+        assessment_id = results_store.put(
+            assessment_record(assessment, outcome["html"], outcome["scores"]),
+            assessment_id
+        )
+    scores = outcome["scores"]
+    with span("history_write"):
+        assessment_history.save(assessment_id, {
+            "system_name": assessment["system_name"],
+            "inputs": assessment["inputs"],
+            "user_input": assessment["user_input"],
+            "raw_result": outcome["raw_result"],
+            "result_html": outcome["html"],
+            "tiers": outcome["tiers"],
+            "scores": scores,
+            "recommendation": (governance_recommendation(scores["overall_score"])
+                               if scores else None),
+            "vendor_ids": [vendor["id"] for vendor in assessment["matched_vendors"]],
+            "vendor_risk_score": assessment["vendor_risk_score"],
+            "prompt_fingerprint": PROMPT_FINGERPRINT,
+        })
+    return assessment_id
+
+
+def save_assessment_error(assessment, error, assessment_id=None):
+    """Save a failed assessment so /results shows the error."""
+    if isinstance(error, RateLimited):
+        ERRORS.inc(stage="rate_limit")
+        app.logger.warning("Assessment rate limited: %s", error)
+    else:
+        ERRORS.inc(stage="llm")
+        app.logger.error("Assessment failed: %s", error, exc_info=error)
+    record = assessment_record(assessment, error=assessment_error_message(error))
+    return results_store.put(record, assessment_id)
+
+
+def assessment_error_message(error):
+    """Message shown to the user for a failed assessment."""
+    if isinstance(error, RateLimited):
+        return str(error)
+    return f"An error occurred while calling the API: {str(error)}"
+
+
+def store_assessment(assessment, outcome, assessment_id=None):
+    """Save a finished assessment and make it the session's current one."""
+    session['assessment_id'] = save_assessment(assessment, outcome, assessment_id)
+    return session['assessment_id']
+
+
+def store_assessment_error(assessment, error, assessment_id=None):
+    """Save a failed assessment and make it the session's current one."""
+    session['assessment_id'] = save_assessment_error(assessment, error, assessment_id)
+    return session['assessment_id']
+
+
+def store_config_error():
+    """Store the error shown when no OpenAI API key is configured."""
+    session['assessment_id'] = results_store.put({
+        "result": None, "error": "OpenAI API key is not configured in Replit Secrets.",
+        "scores": None, "vendor_ids": [], "vendor_risk_score": None,
+        "system_name": "AI System",
+    })
+
+
+def load_assessment(assessment_id):
+    """
+    Load an assessment by ID with vendor details rebuilt from the catalogue.
+
+    Recent assessments (and failed ones) come from the results store; older
+    ones fall back to the history.
+    """
+    if not assessment_id or assessment_id.startswith(JOB_STATUS_PREFIX):
+        return None
+    with span("results_store_read"):
+        record = results_store.get(assessment_id)
+    if record is not None and "vendor_ids" not in record:
+        return None
+    if record is None:
+        with span("history_read"):
+            archived = assessment_history.get(assessment_id)
+        if archived is None:
+            return None
+        tiers = archived["tiers"]
+        record = {
+            "result": archived["result_html"],
+            "error": None,
+            "scores": (dict(tiers, overall_score=archived["overall_score"])
+                       if tiers else None),
+            "vendor_ids": archived["vendor_ids"],
+            "vendor_risk_score": archived["vendor_risk_score"],
+            "system_name": archived["system_name"],
+        }
+    vendors = [vendor_catalogue.get(vendor_id) for vendor_id in record["vendor_ids"]]
+    record["vendors"] = [vendor for vendor in vendors if vendor is not None]
+    return record
+
+
+# ---------- Report artifacts ----------
+# A finished report never changes, so it is rendered once to disk and served
+# as a static file with ETag/Last-Modified; browsers revalidate with a 304.
+REPORT_ARTIFACTS_DIR = os.environ.get("REPORT_ARTIFACTS_DIR",
+                                      os.path.join(app.instance_path, "reports"))
+REPORT_MAX_AGE = int(os.environ.get("REPORT_MAX_AGE", "0"))
+report_artifacts = ReportArtifacts(REPORT_ARTIFACTS_DIR)
+
+
+# ---------- Static assets ----------
+# `python static_assets.py` (the deployment build step) writes minified,
+# fingerprinted and pre-compressed copies of the stylesheets and scripts to
+# static/dist/. A fingerprinted URL changes whenever the file does, so it is
+# served as immutable and repeat visits never re-download it. Without a build,
+# templates fall back to the plain files under /static.
+ASSET_MAX_AGE = 365 * 24 * 3600
+asset_manifest = AssetManifest(app.static_folder)
+
+
+def asset_url(name):
+    built = asset_manifest.get(name)
+    if built is None:
+        return url_for('static', filename=name)
+    return url_for('asset', filename=built)
+
+
+@app.context_processor
+def inject_asset_url():
+    return {"asset_url": asset_url}
+
+
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    path, encoding = asset_manifest.variant(filename, request.accept_encodings)
+    if path is None:
+        abort(404)
+    mimetype = "text/css" if filename.endswith(".css") else "text/javascript"
+    response = send_file(path, mimetype=mimetype, conditional=True,
+                         max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    # Every variant varies, so caches never hand gzip to a client that didn't ask for it
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+# ---------- Assessment cache ----------
+# Identical (or whitespace/case-only different) submissions reuse the stored
+# result instead of paying for another LLM call. The key covers the model and
+# a fingerprint of BASE_PROMPT, GOVERNANCE_WEIGHTS and the vendor catalogue, so any
+# change to those invalidates old entries automatically.
+assessment_cache = AssessmentCache(
+    max_entries=int(os.environ.get("ASSESSMENT_CACHE_SIZE", "256")),
+    ttl_seconds=int(os.environ.get("ASSESSMENT_CACHE_TTL", "86400")),
+    db_path=os.environ.get("ASSESSMENT_CACHE_DB") or None,
+)
+
+
+def assessment_cache_key(user_input):
+    """Build the content-addressed cache key for a user prompt."""
+    config = fingerprint(BASE_PROMPT, GOVERNANCE_WEIGHTS, vendor_catalogue.version)
+    return fingerprint(ASSESSMENT_MODEL, config, normalize_prompt(user_input))
+
+
+def cached_assessment(assessment):
+    """
+    Look up a previous result for this assessment's prompt.
+
+    Returns:
+        Outcome dict (see assessment_outcome), or None on a cache miss
+    """
+    with span("cache_lookup"):
+        cached = assessment_cache.get(assessment_cache_key(assessment["user_input"]))
+    CACHE_LOOKUPS.inc(cache="assessment", result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    return dict(cached, scores=build_scores(cached["tiers"]))
+
+
+def remember_assessment(assessment, outcome):
+    """Cache a successfully parsed result so resubmissions skip the LLM call."""
+    # Results without tiers are not cached, so a resubmit gets a fresh attempt
+    if not outcome["tiers"]:
+        return
+    assessment_cache.set(assessment_cache_key(assessment["user_input"]), {
+        "raw_result": outcome["raw_result"],
+        "tiers": outcome["tiers"],
+        "html": outcome["html"],
+    })
+
+
+# ---------- Request coalescing ----------
+# When a team shares a draft, several people often submit the same form within
+# seconds. Concurrent submissions with the same cache key wait for one LLM
+# call and share its result: in this process directly, and in other gunicorn
+# workers through a lock table in COALESCE_DB. Streamed assessments lead a
+# flight too, so identical submissions wait for the stream instead of calling
+# the model again.
+COALESCE_ASSESSMENTS = os.environ.get("COALESCE_ASSESSMENTS", "1") == "1"
+COALESCE_DB = os.environ.get("COALESCE_DB",
+                             os.path.join(app.instance_path, "coalescing.db"))
+if COALESCE_ASSESSMENTS:
+    os.makedirs(os.path.dirname(os.path.abspath(COALESCE_DB)), exist_ok=True)
+
+single_flight = SingleFlight(
+    db_path=COALESCE_DB if COALESCE_ASSESSMENTS else None,
+    lease_seconds=int(os.environ.get("COALESCE_LEASE_SECONDS", "300")),
+)
+
+COALESCED = metrics_registry.counter(
+    "assessment_coalesced_total",
+    "Assessments served by another request's in-flight LLM call", ["scope"],
+)
+
+
+def coalesced(result, source):
+    """Count a coalesced result; waiters get their own copy of the outcome."""
+    if source == "leader":
+        return result
+    COALESCED.inc(scope=source)
+    return dict(result)
+
+
+def assessment_in_flight(assessment):
+    """Whether an identical assessment is being generated right now."""
+    key = assessment_cache_key(assessment["user_input"])
+    return COALESCE_ASSESSMENTS and single_flight.in_flight(key)
+
+
+def lead_assessment(assessment):
+    """
+    Register an assessment generated outside run_assessment (a stream) as in flight.
+
+    Returns:
+        Flight to settle with the outcome, or None when an identical
+        assessment is already in flight (or coalescing is off)
+    """
+    if not COALESCE_ASSESSMENTS:
+        return None
+    return single_flight.begin(assessment_cache_key(assessment["user_input"]))
+
+
+def run_assessment(assessment):
+    """
+    Call the LLM for a built assessment and score the response.
+
+    Identical assessments already in flight are waited for instead of being
+    sent again (see COALESCE_ASSESSMENTS).
+
+    Returns:
+        Outcome dict with the raw result, tiers, rendered HTML and scores
+    """
+    cached = cached_assessment(assessment)
+    if cached is not None:
+        return cached
+    if not COALESCE_ASSESSMENTS:
+        return generate_assessment(assessment)
+    return coalesced(*single_flight.do(
+        assessment_cache_key(assessment["user_input"]),
+        lambda: generate_assessment(assessment),
+        lambda: cached_assessment(assessment),
+    ))
+
+
+def generate_assessment(assessment):
+    """Run the LLM call(s) for an assessment and score the result."""
+    observe_prompt_usage(assessment)
+    plan = reassessment_plan(assessment)
+    grant = admit_assessment(assessment, planned_calls(plan))
+    with span("llm_wait"):
+        if plan is not None:
+            completion = reassess(assessment, plan)
+        elif PARALLEL_SECTIONS:
+            completion = generate_sections(assessment["user_input"])
+        else:
+            completion = backend.complete(
+                build_messages(assessment["user_input"]), temperature=0.2,
+                **completion_options()
+            )
+    settle_assessment(grant, completion.usage)
+    return complete_assessment(assessment, completion)
+
+
+def planned_calls(plan):
+    """Number of LLM calls an assessment will make, given its re-assessment plan."""
+    if plan is not None:
+        return len(plan["stale"]) + 1 if plan["stale"] else 0
+    return len(INDEPENDENT_SECTIONS) + 1 if PARALLEL_SECTIONS else 1
+
+
+def complete_assessment(assessment, completion):
+    """Score a finished completion and cache the outcome."""
+    observe_provider_usage(completion.usage)
+    outcome = assessment_outcome(response_text(completion.text),
+                                 assessment.get("tenant"))
+    remember_assessment(assessment, outcome)
+    return outcome
+
+
+# ---------- Background assessment jobs ----------
+# POST / enqueues the assessment and returns at once; a bounded pool of worker
+# threads runs the LLM call so a slow response never pins a gunicorn worker.
+# Set ASSESSMENT_WORKERS=0 to run assessments inline in the request instead.
+JOB_WORKERS = int(os.environ.get("ASSESSMENT_WORKERS", "4"))
+JOB_QUEUE_DEPTH = int(os.environ.get("ASSESSMENT_QUEUE_DEPTH", "20"))
+JOB_TTL_SECONDS = int(os.environ.get("ASSESSMENT_JOB_TTL", "3600"))
+JOB_RETRY_AFTER_SECONDS = 30
+
+
+class TenantQueue:
+    """
+    Bounded FIFO per tenant, served round-robin.
+
+    One tenant's backlog doesn't hold up the others: the next job always comes
+    from the tenant after the one served last. Raises queue.Full like
+    queue.Queue when the total reaches maxsize.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.queues = OrderedDict()
+        self.size = 0
+        self.ready = threading.Condition()
+
+    def put_nowait(self, item, tenant=DEFAULT_TENANT):
+        with self.ready:
+            if self.size >= self.maxsize:
+                raise queue.Full
+            self.queues.setdefault(tenant, deque()).append(item)
+            self.size += 1
+            self.ready.notify()
+
+    def get(self):
+        with self.ready:
+            while not self.size:
+                self.ready.wait()
+            tenant, items = self.queues.popitem(last=False)
+            item = items.popleft()
+            self.size -= 1
+            # Back of the line for this tenant's next job
+            if items:
+                self.queues[tenant] = items
+            return item
+
+    def qsize(self):
+        return self.size
+
+
+class AssessmentQueue:
+    """
+    In-process job queue with a fixed pool of worker threads.
+
+    The queue is bounded so bursts are rejected with a 429 instead of piling
+    up behind the pool, and tenants are served round-robin. Assessments that
+    run inside a request (streams) reserve a place too, so queued, running
+    and streamed assessments share one limit. Job status is published to the
+    results store, so any gunicorn worker can answer a poll. Worker threads
+    start on the first submission so each gunicorn worker process gets its
+    own pool after forking.
+    """
+
+    def __init__(self, workers, max_depth, ttl_seconds, status_store):
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.capacity = workers + max_depth
+        self.status_store = status_store
+        self.queue = TenantQueue(max_depth)
+        self.jobs = {}
+        self.running = 0
+        self.inline = 0
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def submit(self, assessment):
+        """
+        Enqueue an assessment and return its job ID.
+
+        Raises:
+            queue.Full: If the queue is at its depth limit
+        """
+        self._start_workers()
+        self._prune()
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created": time.time(),
+            "finished": None,
+            "assessment": assessment,
+            "scores": None,
+            "error": None,
+            # Logs from the worker carry the trace ID of the request that queued the job
+            "trace_id": tracing.current_trace_id(),
+        }
+        with self.lock:
+            if self._load() >= self.capacity:
+                raise queue.Full
+            self.jobs[job_id] = job
+            try:
+                self.queue.put_nowait(job_id,
+                                      assessment.get("tenant") or DEFAULT_TENANT)
+            except queue.Full:
+                del self.jobs[job_id]
+                raise
+        self._publish(job)
+        return job_id
+
+    def reserve(self):
+        """
+        Count an assessment run inside a request against the queue's limit.
+
+        Returns:
+            Function that gives the place back (safe to call more than once)
+
+        Raises:
+            queue.Full: If queued, running and inline assessments are at the limit
+        """
+        with self.lock:
+            if self._load() >= self.capacity:
+                raise queue.Full
+            self.inline += 1
+        released = threading.Event()
+
+        def release():
+            with self.lock:
+                if not released.is_set():
+                    released.set()
+                    self.inline -= 1
+
+        return release
+
+    def status(self, job_id):
+        """
+        Public status of a job: id, status, system_name, scores and error message.
+
+        Jobs queued by another gunicorn worker are read from the results store.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return self._status(job)
+        return self.status_store.get(JOB_STATUS_PREFIX + job_id)
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _load(self):
+        return self.queue.qsize() + self.running + self.inline
+
+    def _status(self, job):
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "system_name": job["assessment"]["system_name"],
+            "scores": job["scores"],
+            "error": (assessment_error_message(job["error"])
+                      if job["error"] is not None else None),
+        }
+
+    def _publish(self, job):
+        try:
+            self.status_store.put(self._status(job), JOB_STATUS_PREFIX + job["id"])
+        except Exception:
+            # Polls on this worker still see the job; only other workers miss it
+            app.logger.exception("Could not publish status of job %s", job["id"])
+
+    def _start_workers(self):
+        with self.lock:
+            self.threads = [t for t in self.threads if t.is_alive()]
+            for _ in range(self.workers - len(self.threads)):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job["finished"] and job["finished"] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+    def _work(self):
+        while True:
+            job_id = self.queue.get()
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                self.running += 1
+            job["status"] = "running"
+            self._publish(job)
+            trace_token = tracing.set_trace_id(job["trace_id"])
+            try:
+                outcome = run_assessment(job["assessment"])
+                save_assessment(job["assessment"], outcome, job_id)
+                job["scores"] = outcome["scores"]
+                job["status"] = "done"
+            except Exception as e:
+                save_assessment_error(job["assessment"], e, job_id)
+                job["error"] = e
+                job["status"] = "error"
+            finally:
+                tracing.reset_trace_id(trace_token)
+                with self.lock:
+                    self.running -= 1
+            job["finished"] = time.time()
+            self._publish(job)
+
+
+assessment_queue = AssessmentQueue(JOB_WORKERS, JOB_QUEUE_DEPTH, JOB_TTL_SECONDS,
+                                   results_store)
+
+
+def wants_json():
+    """Check whether the client asked for a JSON response."""
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return best == "application/json"
+
+
+def job_status_payload(job):
+    """Build the JSON status returned while polling a job."""
+    payload = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "queue_depth": assessment_queue.depth(),
+    }
+    if job["status"] in ("done", "error"):
+        payload["results_url"] = url_for('assessment_results', assessment_id=job["id"])
+    if job["status"] == "done":
+        payload["scores"] = job["scores"]
+    if job["status"] == "error":
+        payload["error"] = job["error"]
+    return payload
+
+
+# ---------- Streaming assessments ----------
+# Streaming forwards the model output to the browser as it is generated, so the
+# first section shows up within a second instead of after the whole completion.
+# Structured output is a single JSON document, and parallel sections arrive
+# out of order, so neither is streamed.
+STREAMING_ENABLED = (os.environ.get("STREAMING_ENABLED", "1") != "0"
+                     and not STRUCTURED_OUTPUT
+                     and not PARALLEL_SECTIONS)
+
+# A line that may still turn out to open a fence or a bare JSON object once the
+# rest of it arrives
+BLOCK_PREFIX_RE = re.compile(r'^\s*(`+|~+)?$|^\s*(`{3,}|~{3,}|\{)')
+
+
+class AssessmentStreamParser:
+    """
+    Incrementally split a streamed assessment into display text and tier JSON.
+
+    Text is forwarded as deltas and each of sections 1-6 is rendered to HTML
+    as soon as the next heading starts. Code blocks and bare JSON objects are
+    recognised the same way as in parse_assessment() (fenced_block() and
+    bare_object()) and held back until they close: the first one holding
+    tiers, and everything after it, is kept out of the display and parsed for
+    tiers when the stream ends; any other is forwarded.
+    """
+
+    def __init__(self):
+        self.display = ""
+        self.tail = ""
+        self.line_start = True
+        self.tier_block = None
+        self.sent = 0
+        self.section_start = 0
+
+    def feed(self, text):
+        """Consume a chunk of model output and return the events it produces."""
+        events = []
+        if self.tier_block is not None:
+            self.tier_block += text
+            return events
+
+        self.tail += text
+        self._release()
+        if len(self.display) > self.sent:
+            events.append(("delta", {"text": self.display[self.sent:]}))
+            self.sent = len(self.display)
+        events.extend(self._completed_sections())
+        return events
+
+    def _release(self, final=False):
+        """Move held text to the display up to the next unfinished code block."""
+        while self.tail and self.tier_block is None:
+            if not self.line_start:
+                # The rest of a line already known not to open a fence
+                newline = self.tail.find("\n")
+                if newline == -1:
+                    self.display += self.tail
+                    self.tail = ""
+                    return
+                self.display += self.tail[:newline + 1]
+                self.tail = self.tail[newline + 1:]
+                self.line_start = True
+                continue
+            lines = self.tail.split("\n")
+            if len(lines) == 1 and not final:
+                # Hold back a partial line until it can't open a block
+                if BLOCK_PREFIX_RE.match(lines[0]):
+                    return
+                self.line_start = False
+                continue
+            block = fenced_block(lines, 0)
+            if block is None:
+                obj = bare_object(lines, 0)
+                if obj is not None:
+                    body, closing = obj
+                    # The object's last line may still be arriving
+                    if not final and (closing is None or closing == len(lines) - 1):
+                        return
+                    if tier_candidate(body, GOVERNANCE_WEIGHTS) is not None:
+                        self.tier_block = self.tail
+                        self.tail = ""
+                        return
+                line = lines[0] + ("\n" if len(lines) > 1 else "")
+                self.display += line
+                self.tail = self.tail[len(line):]
+                continue
+            body, closing = block
+            if closing is None and not final:
+                return
+            if tier_candidate(body, GOVERNANCE_WEIGHTS) is not None:
+                self.tier_block = self.tail
+                self.tail = ""
+                return
+            # Any other code block is part of the display
+            end = len(lines) - 1 if closing is None else closing
+            released = "\n".join(lines[:end + 1])
+            if end < len(lines) - 1:
+                released += "\n"
+            else:
+                self.line_start = False
+            self.display += released
+            self.tail = self.tail[len(released):]
+
+    def _completed_sections(self):
+        events = []
+        while True:
+            heading = SECTION_HEADING_RE.search(self.display, self.section_start + 1)
+            if not heading:
+                return events
+            section_text = self.display[self.section_start:heading.start()]
+            if section_text.strip():
+                events.append(("section", {"html": render_assessment(section_text)}))
+            self.section_start = heading.start()
+
+    def close(self):
+        """Flush the remaining text and return (events, raw_result)."""
+        events = []
+        if self.tier_block is None and self.tail:
+            self._release(final=True)
+            self.display += self.tail
+            self.tail = ""
+        if len(self.display) > self.sent:
+            events.append(("delta", {"text": self.display[self.sent:]}))
+            self.sent = len(self.display)
+        remaining = self.display[self.section_start:]
+        if remaining.strip():
+            events.append(("section", {"html": render_assessment(remaining)}))
+        self.section_start = len(self.display)
+        return events, self.display + (self.tier_block or "")
+
+
+def sse_event(event, data):
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def immediate_stream_response(assessment):
+    """
+    Answer /stream in one response when there is nothing to stream: no
+    backend, a cached assessment, structured output or an incremental
+    re-assessment.
+
+    Returns:
+        Response, or None when the assessment should be streamed
+    """
+    if not backend:
+        store_config_error()
+        return Response(sse_event("done", {"redirect": url_for('results')}),
+                        mimetype="text/event-stream")
+
+    outcome = cached_assessment(assessment)
+    if outcome is None and (STRUCTURED_OUTPUT or assessment_in_flight(assessment)
+                            or reassessment_plan(assessment) is not None):
+        # Structured output is one JSON document, and a re-assessment only
+        # regenerates some sections, so both are run whole and sent at once.
+        # An identical assessment already running is waited for, not streamed again
+        return whole_stream_response(assessment)
+    if outcome is None:
+        return None
+    return outcome_stream_response(assessment, outcome)
+
+
+def whole_stream_response(assessment):
+    """Run an assessment in the request and answer /stream with the whole result."""
+    try:
+        release = assessment_queue.reserve()
+    except queue.Full:
+        return queue_full_response(assessment)
+    try:
+        outcome = run_assessment(assessment)
+    except Exception as e:
+        store_assessment_error(assessment, e)
+        return Response(sse_event("done", {"redirect": url_for('results')}),
+                        mimetype="text/event-stream")
+    finally:
+        release()
+    return outcome_stream_response(assessment, outcome)
+
+
+def outcome_stream_response(assessment, outcome):
+    """Store a finished outcome and send it as a complete /stream response."""
+    assessment_id = store_assessment(assessment, outcome)
+    redirect_url = url_for('assessment_results', assessment_id=assessment_id)
+    events = [sse_event("section", {"html": outcome["html"]}),
+              sse_event("scores", {"scores": outcome["scores"]}),
+              sse_event("done", {"redirect": redirect_url})]
+    return Response("".join(events), mimetype="text/event-stream")
+
+
+def start_streamed_assessment():
+    """
+    Fix the assessment ID of a streamed assessment before the first byte.
+
+    The session cookie is sent with the response headers, before the stream
+    finishes, so the ID is chosen up front and the record filled in at the end.
+
+    Returns:
+        (assessment_id, results_url)
+    """
+    assessment_id = uuid.uuid4().hex
+    session['assessment_id'] = assessment_id
+    return assessment_id, url_for('assessment_results', assessment_id=assessment_id)
+
+
+def finish_streamed_assessment(assessment, assessment_id, raw_result, flight=None):
+    """Score and save a fully streamed response; returns its scores event."""
+    outcome = assessment_outcome(raw_result, assessment.get("tenant"))
+    remember_assessment(assessment, outcome)
+    save_assessment(assessment, outcome, assessment_id)
+    if flight is not None:
+        # Identical submissions waiting on this stream get the outcome
+        flight.finish(outcome)
+    return sse_event("scores", {"scores": outcome["scores"]})
+
+
+def stream_cancelled():
+    """Error handed to submissions waiting on a stream whose client went away."""
+    return RuntimeError("The identical assessment being streamed was cancelled. "
+                        "Please submit again.")
+
+
+@app.route("/stream", methods=["POST"])
+def stream():
+    assessment = build_assessment_input(request.form)
+    assessment["previous_id"] = session.get('assessment_id')
+    assessment["tenant"] = tenant_id()
+    response = immediate_stream_response(assessment)
+    if response is not None:
+        return response
+    # The model call runs in this request, so it takes a place in the job queue's limit
+    try:
+        release = assessment_queue.reserve()
+    except queue.Full:
+        return queue_full_response(assessment)
+    flight = lead_assessment(assessment)
+    if flight is None and COALESCE_ASSESSMENTS:
+        # An identical assessment started since the check above; wait for it instead
+        release()
+        return whole_stream_response(assessment)
+    assessment_id, results_url = start_streamed_assessment()
+
+    def close():
+        release()
+        if flight is not None:
+            flight.fail(stream_cancelled())
+
+    def generate():
+        parser = AssessmentStreamParser()
+        try:
+            observe_prompt_usage(assessment)
+            grant = admit_assessment(assessment)
+
+            def on_usage(usage):
+                observe_provider_usage(usage)
+                settle_assessment(grant, usage)
+
+            deltas = backend.stream(build_messages(assessment["user_input"]),
+                                    temperature=0.2, on_usage=on_usage)
+            with span("llm_stream"):
+                for delta in deltas:
+                    for event, data in parser.feed(delta):
+                        yield sse_event(event, data)
+            events, raw_result = parser.close()
+            for event, data in events:
+                yield sse_event(event, data)
+            yield finish_streamed_assessment(assessment, assessment_id, raw_result,
+                                             flight)
+        except Exception as e:
+            save_assessment_error(assessment, e, assessment_id)
+            if flight is not None:
+                flight.fail(e)
+        yield sse_event("done", {"redirect": results_url})
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream",
+                        headers=SSE_HEADERS)
+    # Also runs when the client goes away, before or during the stream
+    response.call_on_close(close)
+    return response
+
+
+# ---------- Batch assessments ----------
+# Portfolio reviews upload a CSV/JSONL file of concepts instead of using the
+# wizard; see batch.py for the file format and the resumable CLI.
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+
+
+@app.route("/batch", methods=["POST"])
+def batch_assess():
+    """Assess an uploaded portfolio file, streaming JSONL results as rows finish."""
+    import batch
+
+    upload = request.files.get("file")
+    if upload is None:
+        error = "Upload a CSV or JSONL file in the 'file' field."
+        return jsonify({"error": error}), 400
+    if not backend:
+        error = "OpenAI API key is not configured in Replit Secrets."
+        return jsonify({"error": error}), 503
+
+    try:
+        rows = batch.read_upload(upload, request.form.get("format"))
+    except batch.BatchInputError as e:
+        return jsonify({"error": str(e)}), 400
+    concurrency = max(1, min(request.form.get("concurrency", 4, type=int),
+                             BATCH_MAX_CONCURRENCY))
+    # Row IDs a client already has results for, so a dropped connection can resume
+    skip_ids = [item for item in request.form.get("skip", "").split(",") if item]
+    tenant = tenant_id()
+    pending = sum(1 for index, row in enumerate(rows)
+                  if batch.row_id(row, index) not in skip_ids)
+
+    # Each row in flight takes a place in the job queue's limit, like /stream,
+    # so a batch can't crowd out single submissions
+    releases = []
+    for _ in range(min(concurrency, max(pending, 1))):
+        try:
+            releases.append(assessment_queue.reserve())
+        except queue.Full:
+            break
+    if not releases:
+        error = "The assessment queue is full. Please try again in a moment."
+        return (jsonify({"error": error}), 429,
+                {"Retry-After": str(JOB_RETRY_AFTER_SECONDS)})
+
+    def close():
+        for release in releases:
+            release()
+
+    def generate():
+        for record in batch.run_batch(rows, len(releases), skip_ids=skip_ids,
+                                      tenant=tenant):
+            yield json.dumps(record) + "\n"
+
+    response = Response(generate(), mimetype="application/x-ndjson")
+    # Also runs when the client goes away, before or during the stream
+    response.call_on_close(close)
+    return response
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
-        if not client:
-            session['error'] = "OpenAI API key is not configured in Replit Secrets."
+        if not backend:
+            store_config_error()
             return redirect(url_for('results'))
         
-        # Collect all fields from the wizard
-        system_name = request.form.get("system_name", "").strip()
-        short_description = request.form.get("short_description", "").strip()
-        ai_type = request.form.get("ai_type", "").strip()
-        new_or_update = request.form.get("new_or_update", "").strip()
-        primary_intent = request.form.get("primary_intent", "").strip()
-        
-        # Regulatory exposure checkboxes
-        reg_triggers = []
-        if request.form.get("reg_biometric"):
-            reg_triggers.append("Uses biometric data")
-        if request.form.get("reg_minors"):
-            reg_triggers.append("Involves minors")
-        if request.form.get("reg_employment"):
-            reg_triggers.append("Involves employment decisions")
-        if request.form.get("reg_housing"):
-            reg_triggers.append("Involves housing decisions")
-        if request.form.get("reg_credit"):
-            reg_triggers.append("Involves credit or financial eligibility")
-        if request.form.get("reg_health"):
-            reg_triggers.append("Involves health information")
-        regulatory_exposure = ", ".join(reg_triggers) if reg_triggers else "None selected"
-
-        problem = request.form.get("problem", "").strip()
-        who_problem = request.form.get("who_problem", "").strip()
-        value_created = request.form.get("value_created", "").strip()
-        non_ai_alt = request.form.get("non_ai_alt", "").strip()
-        success_metrics = request.form.get("success_metrics", "").strip()
-        mvp_description = request.form.get("mvp_description", "").strip()
-
-        # Jurisdictions
-        jurisdictions = request.form.getlist("jurisdictions")
-        jurisdictions_str = ", ".join(jurisdictions) if jurisdictions else "None selected"
-        jurisdiction_notes = request.form.get("jurisdiction_notes", "").strip()
-        
-        data_sources = request.form.get("data_sources", "").strip()
-        personal_data = request.form.get("personal_data", "").strip()
-        third_parties = request.form.get("third_parties", "").strip()
-        
-        # Context of Use
-        deployment_context = request.form.get("deployment_context", "").strip()
-        level_of_autonomy = request.form.get("level_of_autonomy", "").strip()
-        deployment_notes = request.form.get("deployment_notes", "").strip()
-        
-        provenance = request.form.get("provenance", "").strip()
-        
-        # Human annotators section
-        uses_annotators = "Yes" if request.form.get("uses_annotators") else "No"
-        annotation_source = request.form.get("annotation_source", "").strip()
-        labour_safeguards = request.form.get("labour_safeguards", "").strip()
-        pay_verified = request.form.get("pay_verified", "").strip()
-        vulnerable_annotators = request.form.get("vulnerable_annotators", "").strip()
-        
-        # Planned safeguards
-        safeguards = request.form.getlist("safeguards")
-        safeguards_str = ", ".join(safeguards) if safeguards else "None selected"
-        custom_safeguards = request.form.get("custom_safeguards", "").strip()
-
-        primary_users = request.form.get("primary_users", "").strip()
-        affected_groups = request.form.get("affected_groups", "").strip()
-        harm_pathways = request.form.getlist("harm_pathways")
-        harm_pathways_str = ", ".join(harm_pathways) if harm_pathways else "None selected"
-        risk_tolerance = request.form.get("risk_tolerance", "").strip()
-
-        # Find matching vendors from third_parties input
-        matched_vendors = find_matching_vendors(third_parties)
-        vendor_risk_score = calculate_vendor_risk_score(matched_vendors)
-        
-        # Build vendor summary for GPT
-        vendor_summary = ""
-        if matched_vendors:
-            vendor_lines = []
-            for v in matched_vendors:
-                high_risks = sum(1 for r in v.get("risks", []) if r["severity"] == "high")
-                medium_risks = sum(1 for r in v.get("risks", []) if r["severity"] == "medium")
-                vendor_lines.append(
-                    f"- {v['name']} (Transparency: {v['transparency']['level']}, "
-                    f"High Risks: {high_risks}, Medium Risks: {medium_risks})"
-                )
-            vendor_summary = "\n".join(vendor_lines)
-        else:
-            vendor_summary = "No known vendors detected"
-
-        # Build a single structured prompt for GPT
-        user_input = f"""
-[SECTION 1: SYSTEM INTAKE]
-System name: {system_name}
-Short description: {short_description}
-AI type: {ai_type}
-New or update: {new_or_update}
-Primary intent: {primary_intent}
-Regulatory exposure triggers: {regulatory_exposure}
-
-[SECTION 2: PURPOSE & CONCEPT]
-Problem it solves: {problem}
-Who experiences this problem today: {who_problem}
-Value created by AI: {value_created}
-Non-AI alternative today: {non_ai_alt}
-Success will be measured by: {success_metrics}
-MVP description: {mvp_description}
-
-[SECTION 3: LEGAL & DATA FOUNDATIONS]
-Regions / Jurisdictions: {jurisdictions_str}
-Jurisdiction notes: {jurisdiction_notes}
-Data sources: {data_sources}
-Personal / sensitive data involved: {personal_data}
-Third-party models / APIs / vendors: {third_parties}
-Detected vendor risk profiles:
-{vendor_summary}
-Deployment context: {deployment_context}
-Level of autonomy: {level_of_autonomy}
-Deployment notes: {deployment_notes}
-Data provenance / licensing notes: {provenance}
-Uses human annotators/reviewers/moderators: {uses_annotators}
-Annotation source: {annotation_source}
-Labour safeguards: {labour_safeguards}
-Pay is fair & verified: {pay_verified}
-Vulnerable annotator groups: {vulnerable_annotators}
-Planned safeguards / mitigations: {safeguards_str}
-Custom safeguards: {custom_safeguards}
-
-[SECTION 4: STAKEHOLDERS & IMPACT]
-Primary users: {primary_users}
-Affected groups (including vulnerable groups): {affected_groups}
-Harm pathways that may apply: {harm_pathways_str}
-Stated risk tolerance: {risk_tolerance}
-"""
+        with span("build_input"):
+            assessment = build_assessment_input(request.form)
+        # The session's last assessment, for re-assessing only what changed
+        assessment["previous_id"] = session.get('assessment_id')
+        assessment["tenant"] = tenant_id()
+
+        cached = cached_assessment(assessment)
+        if cached is not None:
+            assessment_id = store_assessment(assessment, cached)
+            return redirect(url_for('assessment_results', assessment_id=assessment_id))
+
+        if JOB_WORKERS <= 0:
+            try:
+                assessment_id = store_assessment(assessment, run_assessment(assessment))
+            except RateLimited as e:
+                return too_many_requests(str(e), e.retry_after, assessment)
+            except Exception as e:
+                assessment_id = store_assessment_error(assessment, e)
+            return redirect(url_for('assessment_results', assessment_id=assessment_id))
 
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": BASE_PROMPT},
-                    {"role": "user", "content": user_input},
-                ],
-                temperature=0.2,
-            )
-            raw_result = response.choices[0].message.content or ""
-            
-            # Extract JSON tier classifications from the response
-            tiers = None
-            json_match = re.search(r'```json\s*(\{[^`]+\})\s*```', raw_result, re.DOTALL)
-            if json_match:
-                try:
-                    tiers = json.loads(json_match.group(1))
-                except json.JSONDecodeError:
-                    tiers = None
-            
-            # Calculate governance score deterministically using Python
-            # This prevents AI math hallucinations
-            scores = None
-            if tiers:
-                overall_score = calculate_governance_score(tiers)
-                scores = {
-                    "overall_score": overall_score,
-                    "external_impact": tiers.get("external_impact", ""),
-                    "internal_failure": tiers.get("internal_failure", ""),
-                    "regulatory_sensitivity": tiers.get("regulatory_sensitivity", ""),
-                    "data_legal_soundness": tiers.get("data_legal_soundness", ""),
-                    "purpose_clarity": tiers.get("purpose_clarity", "")
-                }
-            
-            # Remove the JSON block from the markdown display
-            display_result = re.sub(r'```json\s*\{[^`]+\}\s*```', '', raw_result, flags=re.DOTALL)
-            
-            session['result'] = markdown.markdown(display_result.strip(), extensions=['tables', 'fenced_code'])
-            session['scores'] = scores
-            session['vendors'] = matched_vendors
-            session['vendor_risk_score'] = vendor_risk_score
-            session['system_name'] = system_name
-            session['error'] = None
-        except Exception as e:
-            session['error'] = f"An error occurred while calling the API: {str(e)}"
-            session['result'] = None
-            session['scores'] = None
-            session['vendors'] = matched_vendors
-            session['vendor_risk_score'] = vendor_risk_score
+            job_id = assessment_queue.submit(assessment)
+        except queue.Full:
+            return queue_full_response(assessment)
+
+        status_url = url_for('assessment_results', assessment_id=job_id)
+        if wants_json():
+            return jsonify({"job_id": job_id, "status": "queued",
+                            "status_url": status_url}), 202
+        return redirect(status_url)
+
+    return render_template("index.html", streaming_enabled=STREAMING_ENABLED)
+
+
+def too_many_requests(error, retry_after, assessment):
+    """429 response for a submission that can't be taken on right now."""
+    headers = {"Retry-After": str(retry_after)}
+    if wants_json():
+        return jsonify({"error": error}), 429, headers
+    return render_template("results.html", result=None, error=error, scores=None,
+                           vendors=[], vendor_risk_score=None,
+                           system_name=assessment["system_name"]), 429, headers
+
+
+def queue_full_response(assessment):
+    """429 response for a submission turned away because the job queue is full."""
+    return too_many_requests("The assessment queue is full. "
+                             "Please try again in a moment.",
+                             JOB_RETRY_AFTER_SECONDS, assessment)
 
-        return redirect(url_for('results'))
 
-    return render_template("index.html")
+def render_results(template, record, assessment_id, **context):
+    """Render the results or report page for a loaded assessment record."""
+    result = Markup(record["result"]) if record["result"] else None
+    with span("template_render"):
+        return render_template(template, result=result, error=record["error"],
+                               scores=record["scores"], vendors=record["vendors"],
+                               vendor_risk_score=record["vendor_risk_score"],
+                               system_name=record["system_name"] or 'AI System',
+                               assessment_id=assessment_id,
+                               results_url=url_for('assessment_results',
+                                                   assessment_id=assessment_id),
+                               report_url=url_for('assessment_report',
+                                                  assessment_id=assessment_id),
+                               **context)
 
 
 @app.route("/results")
 def results():
-    result = session.get('result', None)
-    error = session.get('error', None)
-    scores = session.get('scores', None)
-    vendors = session.get('vendors', [])
-    vendor_risk_score = session.get('vendor_risk_score', None)
-    system_name = session.get('system_name', 'AI System')
-    
-    if result:
-        result = Markup(result)
-    
-    if not result and not error:
+    assessment_id = session.get('assessment_id')
+    record = load_assessment(assessment_id)
+    if record is None or not record["result"] and not record["error"]:
         return redirect(url_for('index'))
     
-    return render_template("results.html", result=result, error=error, scores=scores, 
-                          vendors=vendors, vendor_risk_score=vendor_risk_score,
-                          system_name=system_name)
+    return render_results("results.html", record, assessment_id,
+                          catalogue_vendors=what_if_vendor_choices(record["vendor_ids"]))
+
+
+@app.route("/results/<assessment_id>")
+def assessment_results(assessment_id):
+    job = assessment_queue.status(assessment_id)
+    if job is not None and (wants_json() or job["status"] in ("queued", "running")):
+        if wants_json():
+            return jsonify(job_status_payload(job))
+        return render_template("job.html", job=job, system_name=job["system_name"])
+
+    record = load_assessment(assessment_id)
+    if record is None:
+        abort(404)
+    if wants_json():
+        return jsonify({key: value for key, value in record.items()
+                        if key != "vendors"})
+
+    # Make this the session's current assessment so /report and /results follow it
+    session['assessment_id'] = assessment_id
+    return render_results("results.html", record, assessment_id,
+                          catalogue_vendors=what_if_vendor_choices(record["vendor_ids"]))
+
+
+@app.route("/results/<assessment_id>/what-if", methods=["POST"])
+def assessment_what_if(assessment_id):
+    """
+    Rescore a stored assessment under hypothetical tiers or vendors, without the LLM.
+
+    The JSON body may hold "tiers" (category: tier changes) and "vendor_ids"
+    (the full replacement vendor list, for vendor swaps).
+    """
+    record = load_assessment(assessment_id)
+    if record is None:
+        abort(404)
+    if not record["scores"]:
+        return jsonify({"error": "This assessment has no tiers to rescore."}), 409
+
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "The request body must be a JSON object."}), 400
+    baseline_tiers = {category: record["scores"].get(category, "")
+                      for category in GOVERNANCE_WEIGHTS}
+    vendor_ids = body.get("vendor_ids", record["vendor_ids"])
+    try:
+        tiers = what_if_tiers(baseline_tiers, body.get("tiers") or {})
+        if not isinstance(vendor_ids, list) or not all(
+                isinstance(item, str) for item in vendor_ids):
+            raise ValueError("vendor_ids must be a list of vendor IDs")
+        unknown = [vendor_id for vendor_id in vendor_ids
+                   if vendor_catalogue.get(vendor_id) is None]
+        if unknown:
+            raise ValueError(f"unknown vendor IDs: {', '.join(unknown)}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    baseline = what_if_scenario(baseline_tiers, record["vendor_ids"])
+    scenario = what_if_scenario(tiers, vendor_ids)
+    delta = {
+        key: (None if scenario[key] is None or baseline[key] is None
+              else scenario[key] - baseline[key])
+        for key in ("overall_score", "vendor_risk_score")
+    }
+    return jsonify({"assessment_id": assessment_id, "baseline": baseline,
+                    "scenario": scenario, "delta": delta,
+                    "sensitivity": what_if_sensitivity(tiers)})
+
+
+@app.route("/what-if/grid")
+def what_if_grid():
+    """Overall score of every tier combination, for client-side what-if lookups."""
+    return jsonify(governance_score_grid())
 
 
 @app.route("/report")
 def report():
+    assessment_id = session.get('assessment_id')
+    record = load_assessment(assessment_id)
+    if record is None or not record["result"] and not record["error"]:
+        return redirect(url_for('index'))
+    if record["error"]:
+        return render_report(record, assessment_id)
+    return redirect(url_for('assessment_report', assessment_id=assessment_id))
+
+
+def render_report(record, assessment_id):
     from datetime import datetime
-    result = session.get('result', None)
-    error = session.get('error', None)
-    scores = session.get('scores', None)
-    vendors = session.get('vendors', [])
-    vendor_risk_score = session.get('vendor_risk_score', None)
-    system_name = session.get('system_name', 'AI System')
     now = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-    
-    if result:
-        result = Markup(result)
-    
-    if not result and not error:
-        return redirect(url_for('index'))
-    
-    return render_template("report.html", result=result, error=error, scores=scores, 
-                          vendors=vendors, vendor_risk_score=vendor_risk_score,
-                          system_name=system_name, now=now)
+    pdf_url = None
+    if pdf_available():
+        pdf_url = url_for('assessment_report_pdf', assessment_id=assessment_id)
+    return render_results("report.html", record, assessment_id, now=now,
+                          pdf_url=pdf_url)
+
+
+def report_artifact(assessment_id):
+    """
+    Return the path of an assessment's pre-rendered report, rendering it on first use.
+
+    Returns None when the assessment doesn't exist or failed; failed
+    assessments are rendered per request and never stored.
+    """
+    path = report_artifacts.path(assessment_id, "html")
+    if path is None:
+        return None
+    if os.path.exists(path):
+        CACHE_LOOKUPS.inc(cache="report", result="hit")
+        return path
+    CACHE_LOOKUPS.inc(cache="report", result="miss")
+    record = load_assessment(assessment_id)
+    if record is None or not record["result"]:
+        return None
+    html = render_report(record, assessment_id)
+    with span("report_write"):
+        report_artifacts.put(assessment_id, "html", html)
+    return path
+
+
+@app.route("/report/<assessment_id>")
+def assessment_report(assessment_id):
+    path = report_artifact(assessment_id)
+    if path is None:
+        record = load_assessment(assessment_id)
+        if record is None:
+            abort(404)
+        return render_report(record, assessment_id)
+    return send_file(path, mimetype="text/html", conditional=True,
+                     max_age=REPORT_MAX_AGE)
+
+
+@app.route("/report/<assessment_id>/pdf")
+def assessment_report_pdf(assessment_id):
+    if not pdf_available():
+        abort(404)
+    pdf_path = report_artifacts.path(assessment_id, "pdf")
+    if pdf_path is None:
+        abort(404)
+    if not os.path.exists(pdf_path):
+        html_path = report_artifact(assessment_id)
+        if html_path is None:
+            abort(404)
+        with open(html_path, encoding="utf-8") as f:
+            html = f.read()
+        report_artifacts.put(assessment_id, "pdf",
+                             render_pdf(html, app.static_folder, app.static_url_path))
+    return send_file(pdf_path, mimetype="application/pdf", conditional=True,
+                     max_age=REPORT_MAX_AGE,
+                     download_name=f"governance-report-{assessment_id}.pdf")
+
+
+@app.route("/assessments")
+def assessments():
+    filters = {
+        "min_score": request.args.get("min_score", type=int),
+        "max_score": request.args.get("max_score", type=int),
+        "recommendation": request.args.get("recommendation") or None,
+        "vendor_id": request.args.get("vendor") or None,
+    }
+    limit = max(1, min(request.args.get("limit", 25, type=int), 100))
+    cursor = request.args.get("cursor") or None
+    try:
+        rows, next_cursor = assessment_history.list(limit=limit, cursor=cursor,
+                                                    **filters)
+    except ValueError:
+        if wants_json():
+            return jsonify({"error": "Invalid cursor."}), 400
+        abort(400)
+
+    next_url = None
+    if next_cursor:
+        next_args = {key: value for key, value in request.args.items()
+                     if key != "cursor"}
+        next_url = url_for('assessments', cursor=next_cursor, **next_args)
+
+    if wants_json():
+        return jsonify({"assessments": rows, "next_cursor": next_cursor,
+                        "next_url": next_url})
+
+    return render_template("assessments.html", assessments=rows, filters=filters,
+                           next_url=next_url, recommendations=RECOMMENDATIONS,
+                           vendors=vendor_catalogue.vendors)
+
+
+@app.route("/metrics")
+def metrics():
+    if not METRICS_ENABLED:
+        abort(404)
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+# ---------- Startup ----------
+# Heavy imports (markdown, the OpenAI SDK, NumPy, tiktoken, WeasyPrint), the
+# OpenAI client and the vendor catalogue are all deferred to first use, so a
+# new worker serves its first request sooner (Cloud Run cold starts). With
+# GUNICORN_PRELOAD=1, gunicorn.conf.py calls warm_up() in the master instead,
+# so every forked worker shares the result copy-on-write.
+# `python benchmarks/startup_report.py` tracks import and first-request times.
+def warm_up():
+    """Do the work otherwise left to the first requests, except opening connections."""
+    vendor_catalogue.snapshot()
+    markdown_renderer.convert("")
+    system_prompt_tokens()
+    for template in ("index.html", "job.html", "results.html", "report.html",
+                     "assessments.html"):
+        app.jinja_env.get_template(template)
+    if backend is not None and LLM_BACKEND == "openai":
+        # Only the modules; clients are built per worker on their first call
+        import httpx  # noqa: F401
+        import openai  # noqa: F401
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+Prompt assembly under a token budget.
+
+The assessment prompt is built from labelled form fields grouped into
+sections. Empty fields are dropped, every section is tokenized locally so
+its cost can be reported, and when the prompt is over budget the longest
+free-text fields are cut back to their leading sentences until it fits.
+"""
+import math
+import re
+
+TOKEN_ENCODING = "o200k_base"  # Tokenizer used by the gpt-4o model family
+TRUNCATION_MARKER = " [truncated]"
+# Free-text fields are never cut below this many tokens
+MIN_FIELD_TOKENS = 40
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+SECTION_HEADER_RE = re.compile(r'^\[(SECTION \d+:[^\]]*)\]$', re.MULTILINE)
+ESTIMATE_RE = re.compile(r"\w+|[^\w\s]")
+
+# None until first use, False when tiktoken is not installed
+_encoding = None
+
+
+def tokenizer():
+    """The model's tokenizer, loaded on first use, or None without tiktoken."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+        except ImportError:  # Token counts fall back to an estimate without tiktoken
+            _encoding = False
+        else:
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    return _encoding or None
+
+
+def count_tokens(text):
+    """Count tokens with the model's tokenizer, or estimate them without tiktoken."""
+    if not text:
+        return 0
+    encoding = tokenizer()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly one token per word or punctuation mark, plus one per 4 chars of long words
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in ESTIMATE_RE.findall(text))
+
+
+def field(label, value, free_text=False, block=False):
+    """
+    A labelled prompt field.
+
+    Args:
+        label: Text shown before the value
+        value: Field value; empty values are left out of the prompt
+        free_text: Whether the field may be shortened to fit the budget
+        block: Put the value on its own lines below the label
+    """
+    return {"label": label, "value": (value or "").strip(), "free_text": free_text,
+            "block": block}
+
+
+def render_field(prompt_field):
+    separator = ":\n" if prompt_field["block"] else ": "
+    return f"{prompt_field['label']}{separator}{prompt_field['value']}"
+
+
+def render_section(title, fields):
+    return "\n".join([f"[{title}]", *(render_field(f) for f in fields)])
+
+
+def render_sections(sections):
+    return "\n" + "\n\n".join(render_section(title, fields)
+                              for title, fields in sections) + "\n"
+
+
+def split_sections(text):
+    """Split a rendered prompt back into {section title: rendered fields}."""
+    headers = list(SECTION_HEADER_RE.finditer(text))
+    return {
+        header.group(1):
+            text[header.end():following.start() if following else len(text)].strip()
+        for header, following in zip(headers, headers[1:] + [None], strict=True)
+    }
+
+
+def shorten(text, max_tokens):
+    """Cut text to at most max_tokens, keeping whole leading sentences if possible."""
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    kept = []
+    for sentence in SENTENCE_RE.split(text):
+        if count_tokens(" ".join([*kept, sentence])) > budget:
+            break
+        kept.append(sentence)
+    if not kept:
+        # The first sentence alone is too long; fall back to whole words
+        for word in text.split():
+            if count_tokens(" ".join([*kept, word])) > budget:
+                break
+            kept.append(word)
+    return " ".join(kept) + TRUNCATION_MARKER
+
+
+def assemble_prompt(sections, budget=None):
+    """
+    Render prompt sections, dropping empty fields and enforcing a token budget.
+
+    Args:
+        sections: List of (title, [field, ...]) pairs
+        budget: Maximum tokens for the rendered prompt, or None for no limit
+
+    Returns:
+        Tuple of (prompt text, usage dict with per-section token counts, total,
+        and the labels of dropped and truncated fields)
+    """
+    dropped = []
+    kept_sections = []
+    for title, fields in sections:
+        kept = []
+        for prompt_field in fields:
+            if prompt_field["value"]:
+                kept.append(dict(prompt_field))
+            else:
+                dropped.append(prompt_field["label"])
+        if kept:
+            kept_sections.append((title, kept))
+
+    truncated = []
+    if budget is not None:
+        candidates = [f for _, fields in kept_sections for f in fields
+                      if f["free_text"]]
+        total = count_tokens(render_sections(kept_sections))
+        while total > budget and candidates:
+            largest = max(candidates, key=lambda f: count_tokens(f["value"]))
+            candidates.remove(largest)
+            tokens = count_tokens(largest["value"])
+            target = max(MIN_FIELD_TOKENS, tokens - (total - budget))
+            if target >= tokens:
+                continue
+            largest["value"] = shorten(largest["value"], target)
+            truncated.append(largest["label"])
+            total = count_tokens(render_sections(kept_sections))
+
+    section_tokens = {title: count_tokens(render_section(title, fields))
+                      for title, fields in kept_sections}
+    text = render_sections(kept_sections)
+    usage = {
+        "sections": section_tokens,
+        "total_tokens": count_tokens(text),
+        "dropped_fields": dropped,
+        "truncated_fields": truncated,
+    }
+    return text, usage
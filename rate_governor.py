@@ -0,0 +1,381 @@
+"""
+Rate governor for LLM calls, shared by every worker on the machine.
+
+Token buckets cap requests and tokens per minute for each tenant and for the
+whole deployment. A call that can't be admitted at once waits in a queue, and
+tenants take turns: the waiting tenant that was served least recently goes
+first, so one team's burst can't starve everyone else. Rate-limit headers from
+the provider lower the global buckets to what the provider says is left and
+pause admissions until its reset time (or Retry-After) has passed.
+
+Buckets, the wait queue and the backoff state live in a small SQLite file, so
+all gunicorn workers (and the ASGI app) draw from the same limits.
+"""
+import math
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    ticket TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    enqueued REAL NOT NULL,
+    seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tenants (tenant TEXT PRIMARY KEY, served REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS backoff (name TEXT PRIMARY KEY, until REAL NOT NULL);
+"""
+
+REASONS = {
+    "tenant_requests": "your team's request limit",
+    "tenant_tokens": "your team's token limit",
+    "global_requests": "the shared request limit",
+    "global_tokens": "the shared token limit",
+    "provider_backoff": "the provider asked us to slow down",
+    "queued": "other teams are ahead in the queue",
+}
+DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+# A waiter that hasn't polled for this long belongs to a worker that died
+STALE_WAITER_SECONDS = 5.0
+
+
+def parse_duration(value):
+    """Parse a rate-limit reset like "1s", "6m0s" or "20ms" into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimited(Exception):
+    """
+    Raised when a call can't be admitted within the governor's maximum wait.
+
+    Carries status_code and retry_after so callers can answer with a 429 and
+    batch retries honour the suggested delay.
+    """
+
+    status_code = 429
+
+    def __init__(self, reason, retry_after, waited=0.0):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.waited = waited
+        super().__init__(f"Too many assessments are running right now "
+                         f"({REASONS.get(reason, reason)}). "
+                         f"Please try again in {self.retry_after} seconds.")
+
+
+class Grant:
+    """An admitted call; settle() corrects the token estimate once usage is known."""
+
+    def __init__(self, governor, tenant, tokens, waited):
+        self.governor = governor
+        self.tenant = tenant
+        self.tokens = tokens
+        self.waited = waited
+
+    def settle(self, used_tokens):
+        if used_tokens is not None and used_tokens != self.tokens:
+            self.governor._adjust_tokens(self.tenant, used_tokens - self.tokens)
+
+
+class RateGovernor:
+    """
+    Cross-worker token buckets with fair queuing between tenants.
+
+    Limits are per minute and also set the burst size; 0 turns a limit off.
+
+    Args:
+        db_path: SQLite file holding the shared state
+        global_rpm: Requests per minute for the whole deployment
+        global_tpm: Tokens per minute for the whole deployment
+        tenant_rpm: Requests per minute for each tenant
+        tenant_tpm: Tokens per minute for each tenant
+        max_wait: Seconds a call may wait before it is rejected
+        poll_seconds: How often a queued call checks whether it's its turn
+        on_admit: Called with the seconds waited when a call is admitted
+        on_reject: Called with the reason and seconds waited when one is rejected
+        on_backoff: Called with the pause in seconds and its source when the
+            provider's headers pause admissions
+    """
+
+    def __init__(self, db_path, global_rpm=500, global_tpm=200000, tenant_rpm=100,
+                 tenant_tpm=60000, max_wait=30.0, poll_seconds=0.1, on_admit=None,
+                 on_reject=None, on_backoff=None):
+        self.db_path = db_path
+        self.global_rpm = global_rpm
+        self.global_tpm = global_tpm
+        self.tenant_rpm = tenant_rpm
+        self.tenant_tpm = tenant_tpm
+        self.max_wait = max_wait
+        self.poll_seconds = poll_seconds
+        self.on_admit = on_admit
+        self.on_reject = on_reject
+        self.on_backoff = on_backoff
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so reading a bucket and
+        # debiting it can't interleave with another worker's admission
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def admit(self, tenant, calls=1, tokens=0):
+        """
+        Wait until a tenant may make calls using about this many tokens.
+
+        Returns:
+            Grant for the admitted calls
+
+        Raises:
+            RateLimited: If the calls can't be admitted within max_wait
+        """
+        ticket, started = uuid.uuid4().hex, time.time()
+        try:
+            while True:
+                wait, reason = self._attempt(ticket, tenant, calls, tokens, started)
+                if reason is None:
+                    return self._admitted(tenant, tokens, started)
+                self._check_deadline(wait, reason, started)
+                time.sleep(self._sleep(wait, reason))
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    async def aadmit(self, tenant, calls=1, tokens=0):
+        """Async twin of admit(): the waits are awaited and SQLite runs on a thread."""
+        import asyncio
+
+        ticket, started = uuid.uuid4().hex, time.time()
+        try:
+            while True:
+                wait, reason = await asyncio.to_thread(self._attempt, ticket, tenant,
+                                                       calls, tokens, started)
+                if reason is None:
+                    return self._admitted(tenant, tokens, started)
+                self._check_deadline(wait, reason, started)
+                await asyncio.sleep(self._sleep(wait, reason))
+        except BaseException:
+            # One quick delete, run inline so it still happens when the task is
+            # cancelled
+            self._leave(ticket)
+            raise
+
+    def observe_headers(self, headers, status=None):
+        """
+        Adapt to the provider's rate-limit headers from a response or error.
+
+        The global buckets are lowered to the provider's remaining counts, and
+        admissions pause until the reset time when one is used up, or for
+        Retry-After on a 429.
+        """
+        now = time.time()
+        pause, source = 0.0, None
+        with self._transaction() as conn:
+            for kind, capacity in (("requests", self.global_rpm),
+                                   ("tokens", self.global_tpm)):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                try:
+                    remaining = float(remaining) if remaining is not None else None
+                except ValueError:
+                    remaining = None
+                if remaining is None:
+                    continue
+                if capacity:
+                    name = f"global:{kind}"
+                    level = self._level(conn, name, capacity, now)
+                    self._store(conn, name, min(level, remaining), now)
+                if remaining <= 0:
+                    reset = headers.get(f"x-ratelimit-reset-{kind}")
+                    reset = parse_duration(reset) or 1.0
+                    if reset > pause:
+                        pause, source = reset, "remaining"
+            if status == 429:
+                retry_after = parse_duration(headers.get("retry-after")) or 1.0
+                if retry_after > pause:
+                    pause, source = retry_after, "retry_after"
+            if pause:
+                conn.execute(
+                    "INSERT INTO backoff (name, until) VALUES ('provider', ?) "
+                    "ON CONFLICT (name) DO UPDATE "
+                    "SET until = MAX(until, excluded.until)",
+                    (now + pause,),
+                )
+        if pause and self.on_backoff is not None:
+            self.on_backoff(pause, source)
+        return pause
+
+    def _admitted(self, tenant, tokens, started):
+        waited = time.time() - started
+        if self.on_admit is not None:
+            self.on_admit(waited)
+        return Grant(self, tenant, tokens, waited)
+
+    def _check_deadline(self, wait, reason, started):
+        now = time.time()
+        # Fail fast when the buckets can't refill in time; a queued call keeps
+        # its turn until the deadline
+        if now - started >= self.max_wait or (reason != "queued"
+                                              and now + wait - started > self.max_wait):
+            waited = now - started
+            if self.on_reject is not None:
+                self.on_reject(reason, waited)
+            raise RateLimited(reason, wait, waited)
+
+    def _sleep(self, wait, reason):
+        # Queued calls poll for their turn; the others sleep until their buckets refill
+        if reason == "queued":
+            return self.poll_seconds
+        return max(self.poll_seconds, min(wait, 1.0))
+
+    def _buckets(self, tenant, scope):
+        limits = {
+            "global": (("global:requests", "requests", self.global_rpm),
+                       ("global:tokens", "tokens", self.global_tpm)),
+            "tenant": ((f"tenant:{tenant}:requests", "requests", self.tenant_rpm),
+                       (f"tenant:{tenant}:tokens", "tokens", self.tenant_tpm)),
+        }[scope]
+        return [(name, kind, capacity) for name, kind, capacity in limits if capacity]
+
+    def _level(self, conn, name, capacity, now):
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?",
+                           (name,)).fetchone()
+        if row is None:
+            return float(capacity)
+        level, updated = row
+        return min(float(capacity), level + (now - updated) * capacity / 60)
+
+    def _store(self, conn, name, level, now):
+        conn.execute("INSERT OR REPLACE INTO buckets (name, level, updated) "
+                     "VALUES (?, ?, ?)", (name, level, now))
+
+    def _shortfall(self, conn, buckets, amounts, now):
+        """Longest wait for every bucket to cover its amount, and the slowest bucket."""
+        wait, reason = 0.0, None
+        for name, kind, capacity in buckets:
+            # A call bigger than a whole bucket only waits for a full one, then borrows
+            needed = min(amounts[kind], capacity)
+            level = self._level(conn, name, capacity, now)
+            if level < needed:
+                bucket_wait = (needed - level) * 60 / capacity
+                if bucket_wait > wait:
+                    wait, reason = bucket_wait, f"{name.split(':')[0]}_{kind}"
+        return wait, reason
+
+    def _head(self, conn, now):
+        """
+        Ticket of the next waiter to serve: the least recently served tenant
+        with capacity.
+        """
+        rows = conn.execute(
+            "SELECT w.ticket, w.tenant, w.calls, w.tokens FROM waiters w "
+            "LEFT JOIN tenants t ON t.tenant = w.tenant "
+            "ORDER BY COALESCE(t.served, 0), w.enqueued"
+        ).fetchall()
+        skipped = set()
+        for ticket, tenant, calls, tokens in rows:
+            if tenant in skipped:
+                continue
+            # Only a tenant's oldest waiter is considered, so each tenant stays FIFO
+            skipped.add(tenant)
+            amounts = {"requests": calls, "tokens": tokens}
+            buckets = self._buckets(tenant, "tenant")
+            if not self._shortfall(conn, buckets, amounts, now)[0]:
+                return ticket
+        return None
+
+    def _attempt(self, ticket, tenant, calls, tokens, enqueued):
+        """
+        Try to admit a call in one transaction, joining the queue if it must wait.
+
+        Returns:
+            (seconds to wait, reason) or (0, None) once admitted
+        """
+        now = time.time()
+        amounts = {"requests": calls, "tokens": tokens}
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM waiters WHERE seen < ?",
+                         (now - STALE_WAITER_SECONDS,))
+            conn.execute(
+                "INSERT INTO waiters (ticket, tenant, calls, tokens, enqueued, seen) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (ticket) DO UPDATE SET seen = excluded.seen",
+                (ticket, tenant, calls, tokens, enqueued, now),
+            )
+            row = conn.execute(
+                "SELECT until FROM backoff WHERE name = 'provider'"
+            ).fetchone()
+            if row is not None and row[0] > now:
+                return row[0] - now, "provider_backoff"
+
+            tenant_buckets = self._buckets(tenant, "tenant")
+            wait, reason = self._shortfall(conn, tenant_buckets, amounts, now)
+            if reason is not None:
+                return wait, reason
+            global_buckets = self._buckets(tenant, "global")
+            wait, reason = self._shortfall(conn, global_buckets, amounts, now)
+            if self._head(conn, now) != ticket:
+                return max(wait, self.poll_seconds), "queued"
+            if reason is not None:
+                return wait, reason
+
+            for name, kind, capacity in tenant_buckets + global_buckets:
+                level = self._level(conn, name, capacity, now)
+                self._store(conn, name, level - amounts[kind], now)
+            conn.execute("INSERT OR REPLACE INTO tenants (tenant, served) "
+                         "VALUES (?, ?)", (tenant, now))
+            conn.execute("DELETE FROM waiters WHERE ticket = ?", (ticket,))
+            # Long-idle tenants' buckets have refilled and carry no state worth keeping
+            conn.execute("DELETE FROM buckets "
+                         "WHERE name LIKE 'tenant:%' AND updated < ?", (now - 600,))
+            conn.execute("DELETE FROM tenants WHERE served < ?", (now - 3600,))
+        return 0.0, None
+
+    def _leave(self, ticket):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM waiters WHERE ticket = ?", (ticket,))
+
+    def _adjust_tokens(self, tenant, extra):
+        """Charge (or refund) the difference between used and estimated tokens."""
+        now = time.time()
+        with self._transaction() as conn:
+            buckets = self._buckets(tenant, "tenant") + self._buckets(tenant, "global")
+            for name, kind, capacity in buckets:
+                if kind == "tokens":
+                    level = self._level(conn, name, capacity, now) - extra
+                    self._store(conn, name, min(capacity, level), now)
@@ -0,0 +1,93 @@
+"""
+Pre-rendered report artifacts.
+
+A finished assessment never changes, so its printable report is rendered once
+and written to disk as immutable HTML (and, when WeasyPrint is installed, a
+PDF). The /report endpoints serve these files with ETag/Last-Modified so
+refreshes and shared links are answered with a file read or a 304.
+"""
+import importlib.util
+import os
+import re
+import tempfile
+
+ARTIFACT_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+# Base URL the report is rendered against for PDF export; only its static
+# files are fetched so the export works offline
+PDF_BASE_URL = "http://report.local/"
+
+
+class ReportArtifacts:
+    """
+    Directory of rendered report files named <assessment_id>.<ext>.
+
+    Args:
+        directory: Where artifacts are written (created if missing)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, assessment_id, ext):
+        """Return the artifact's file path, or None for an unsafe ID."""
+        if not ARTIFACT_ID_RE.fullmatch(assessment_id):
+            return None
+        return os.path.join(self.directory, f"{assessment_id}.{ext}")
+
+    def exists(self, assessment_id, ext):
+        path = self.path(assessment_id, ext)
+        return path is not None and os.path.exists(path)
+
+    def put(self, assessment_id, ext, data):
+        """Atomically write an artifact and return its path."""
+        path = self.path(assessment_id, ext)
+        if path is None:
+            raise ValueError(f"Invalid assessment ID: {assessment_id!r}")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        # Write to a temp file and rename so readers never see a partial report
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+
+def pdf_available():
+    # Server-side PDF export is optional; WeasyPrint is only imported to render one
+    return importlib.util.find_spec("weasyprint") is not None
+
+
+def render_pdf(html, static_folder, static_url_path="/static"):
+    """
+    Convert a rendered report to PDF without network access.
+
+    Args:
+        html: Report HTML
+        static_folder: Directory that static_url_path is served from
+    """
+    try:
+        import weasyprint
+    except ImportError:
+        raise RuntimeError(
+            "PDF export requires WeasyPrint (pip install weasyprint)"
+        ) from None
+    static_prefix = PDF_BASE_URL.rstrip("/") + static_url_path.rstrip("/") + "/"
+
+    def fetch(url):
+        if not url.startswith(static_prefix):
+            raise ValueError(f"Offline PDF export cannot fetch {url}")
+        relative = url[len(static_prefix):].split("?", 1)[0]
+        path = os.path.realpath(os.path.join(static_folder, relative))
+        if not path.startswith(os.path.realpath(static_folder) + os.sep):
+            raise ValueError(f"Offline PDF export cannot fetch {url}")
+        with open(path, "rb") as f:
+            return {"string": f.read(), "filename": path}
+
+    return weasyprint.HTML(string=html, base_url=PDF_BASE_URL,
+                           url_fetcher=fetch).write_pdf()
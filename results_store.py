@@ -0,0 +1,244 @@
+"""
+Compact, evicting store for finished assessments.
+
+Records are small dicts (rendered result, scores, vendor IDs) serialized to
+JSON and zlib-compressed. Each backend enforces a TTL and a size cap:
+
+    memory://                     in-process LRU (single worker only)
+    sqlite:////path/to/results.db  shared by workers on one machine
+    redis://host:6379/0           any Redis-protocol server, shared by containers
+"""
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+
+def encode_record(record):
+    return zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_record(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class MemoryBackend:
+    """In-process LRU holding at most max_bytes of compressed records."""
+
+    def __init__(self, ttl_seconds, max_bytes):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def set(self, key, blob):
+        with self.lock:
+            self._discard(key)
+            self.entries[key] = (time.time() + self.ttl_seconds, blob)
+            self.size += len(blob)
+            while self.size > self.max_bytes and self.entries:
+                self._discard(next(iter(self.entries)))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, blob = entry
+            if expires < time.time():
+                self._discard(key)
+                return None
+            self.entries.move_to_end(key)
+            return blob
+
+    def delete(self, key):
+        with self.lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class SQLiteBackend:
+    """SQLite table capped at max_rows, pruned every prune_every writes."""
+
+    def __init__(self, path, ttl_seconds, max_rows, prune_every=100):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self.writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_expires ON results (expires)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def set(self, key, blob):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                (key, blob, now + self.ttl_seconds),
+            )
+            self.writes += 1
+            if self.writes % self.prune_every == 0:
+                conn.execute("DELETE FROM results WHERE expires < ?", (now,))
+                conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM results WHERE key = ? AND expires >= ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend:
+    """
+    Minimal client for the Redis wire protocol (RESP).
+
+    Only SET/GET/DEL are needed, so this avoids a client dependency and works
+    against Redis or any compatible server. Eviction beyond the TTL is left to
+    the server's maxmemory policy.
+    """
+
+    def __init__(self, url, ttl_seconds, prefix="assessment:"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=5)
+            conn = (sock, sock.makefile("rb"))
+            self.local.conn = conn
+            if self.password:
+                self._command("AUTH", self.password)
+            if self.db:
+                self._command("SELECT", self.db)
+        return conn
+
+    def _command(self, *args):
+        sock, reader = self._connection()
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            sock.sendall(b"".join(parts))
+            return self._read_reply(reader)
+        except OSError:
+            self.local.conn = None
+            sock.close()
+            raise
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RedisError(payload.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            return None if count == -1 else [self._read_reply(reader)
+                                             for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def set(self, key, blob):
+        self._command("SET", self.prefix + key, blob, "EX", int(self.ttl_seconds))
+
+    def get(self, key):
+        return self._command("GET", self.prefix + key)
+
+    def delete(self, key):
+        self._command("DEL", self.prefix + key)
+
+
+class ResultsStore:
+    """
+    Store of finished assessments keyed by assessment ID.
+
+    Args:
+        url: Backend URL (memory://, sqlite:///path or redis://host:port/db)
+        ttl_seconds: How long a record is kept
+        max_bytes: Size cap for the in-memory backend
+        max_rows: Size cap for the SQLite backend
+    """
+
+    def __init__(self, url, ttl_seconds=86400, max_bytes=64 * 1024 * 1024,
+                 max_rows=50000):
+        scheme = urlparse(url).scheme
+        if scheme == "memory":
+            self.backend = MemoryBackend(ttl_seconds, max_bytes)
+        elif scheme == "sqlite":
+            self.backend = SQLiteBackend(url[len("sqlite:///"):], ttl_seconds, max_rows)
+        elif scheme == "redis":
+            self.backend = RedisBackend(url, ttl_seconds)
+        else:
+            raise ValueError(f"Unsupported results store URL: {url}")
+
+    def put(self, record, assessment_id=None):
+        """Save a record and return its assessment ID."""
+        assessment_id = assessment_id or uuid.uuid4().hex
+        self.backend.set(assessment_id, encode_record(record))
+        return assessment_id
+
+    def get(self, assessment_id):
+        blob = self.backend.get(assessment_id)
+        return decode_record(blob) if blob is not None else None
+
+    def delete(self, assessment_id):
+        self.backend.delete(assessment_id)
@@ -0,0 +1,288 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+When several requests need the same result at the same time, the first one
+(the leader) does the work and the rest wait for it instead of repeating it.
+Within a process the waiters receive the leader's result, or its exception,
+directly. Across gunicorn workers the leader holds a lease row in a SQLite
+lock table and leaves its (JSON-serialisable) result there for a short while
+when it is done; waiters in other workers poll until the lease is released
+and then read the result from the shared cache or that table, or take the
+lease over if the leader produced nothing or died without releasing it.
+
+Work that isn't a single function call, such as a streamed response, can
+lead a flight too: begin() returns a Flight that the caller settles itself.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Call:
+    """One in-process flight: the leader's result is handed to every waiter."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.async_waiters = []
+
+    def resolve(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.event.set()
+        for loop, future in self.async_waiters:
+            loop.call_soon_threadsafe(self._settle, future)
+
+    def _settle(self, future):
+        if not future.done():
+            future.set_result(None)
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class Flight:
+    """
+    A flight led by the caller of SingleFlight.begin(), settled once with
+    finish() or fail().
+    """
+
+    def __init__(self, owner, key, call):
+        self.owner = owner
+        self.key = key
+        self.call = call
+        self.settled = False
+
+    def finish(self, result):
+        self._settle(result=result)
+
+    def fail(self, error):
+        self._settle(error=error)
+
+    def _settle(self, result=None, error=None):
+        if self.settled:
+            return
+        self.settled = True
+        try:
+            self.owner._release(self.key, result)
+        finally:
+            self.owner._resolve(self.key, self.call, result, error)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+
+    Args:
+        db_path: Optional SQLite file for the cross-worker lock table (use the
+            same file as the on-disk cache the results are read back from)
+        lease_seconds: How long a worker's lease lasts before others may take
+            over; keep it above the longest call, retries included
+        poll_seconds: How often waiters in other workers check the lease
+        result_seconds: How long a finished result stays readable by waiters
+            in other workers
+    """
+
+    def __init__(self, db_path=None, lease_seconds=300, poll_seconds=0.25,
+                 result_seconds=60):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.result_seconds = result_seconds
+        self.calls = {}
+        self.lock = threading.Lock()
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS inflight ("
+                    "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS settled ("
+                    "key TEXT PRIMARY KEY, result TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def do(self, key, func, lookup):
+        """
+        Run func() once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the work (e.g. a content-addressed cache key)
+            func: Does the work; waiters in other workers read its result
+                from the shared cache or, if it is JSON-serialisable, from
+                the lock table
+            lookup: Returns the cached result for key, or None
+
+        Returns:
+            Tuple of (result, how it was obtained: "leader", "process" for a
+            waiter in this process, or "worker" for one served from the cache
+            after another worker's call)
+        """
+        call, leader = self._join(key)
+        if not leader:
+            call.event.wait()
+            return call.outcome(), "process"
+        try:
+            while not self._acquire(key):
+                time.sleep(self.poll_seconds)
+                if not self._held(key):
+                    cached = self._lookup(key, lookup)
+                    if cached is not None:
+                        self._resolve(key, call, cached)
+                        return cached, "worker"
+            result = None
+            try:
+                result = func()
+            finally:
+                self._release(key, result)
+        except BaseException as e:
+            self._resolve(key, call, error=e)
+            raise
+        self._resolve(key, call, result)
+        return result, "leader"
+
+    async def ado(self, key, func, lookup):
+        """Async twin of do(): func is a coroutine function and waits are awaited."""
+        import asyncio
+
+        call, leader = self._join(key)
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            # Calls resolve under the lock, so the check and the registration can't race
+            with self.lock:
+                if call.event.is_set():
+                    future.set_result(None)
+                else:
+                    call.async_waiters.append((loop, future))
+            await future
+            return call.outcome(), "process"
+        try:
+            while not await asyncio.to_thread(self._acquire, key):
+                await asyncio.sleep(self.poll_seconds)
+                if not await asyncio.to_thread(self._held, key):
+                    cached = await asyncio.to_thread(self._lookup, key, lookup)
+                    if cached is not None:
+                        self._resolve(key, call, cached)
+                        return cached, "worker"
+            result = None
+            try:
+                result = await func()
+            finally:
+                await asyncio.to_thread(self._release, key, result)
+        except BaseException as e:
+            self._resolve(key, call, error=e)
+            raise
+        self._resolve(key, call, result)
+        return result, "leader"
+
+    def begin(self, key):
+        """
+        Lead a flight for key when none is in flight here or in another worker.
+
+        Returns:
+            Flight to settle with the result (or error) when the work is done,
+            or None if a call for key is already in flight; callers then wait
+            for it with do() or ado()
+        """
+        # Checked and registered under the lock, so no do() call can slip in between
+        with self.lock:
+            if key in self.calls or not self._acquire(key):
+                return None
+            call = self.calls[key] = Call()
+        return Flight(self, key, call)
+
+    def in_flight(self, key):
+        """Whether a call for key is running in this process or another worker."""
+        with self.lock:
+            if key in self.calls:
+                return True
+        return self._held(key)
+
+    def _join(self, key):
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                return call, False
+            call = self.calls[key] = Call()
+            return call, True
+
+    def _resolve(self, key, call, result=None, error=None):
+        with self.lock:
+            self.calls.pop(key, None)
+            call.resolve(result, error)
+
+    def _acquire(self, key):
+        """Take the cross-worker lease for key; True if this worker now holds it."""
+        if not self.db_path:
+            return True
+        now = time.time()
+        with self._connect() as conn:
+            # An expired lease belongs to a worker that died mid-call
+            conn.execute("DELETE FROM inflight WHERE key = ? AND expires < ?",
+                         (key, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO inflight (key, owner, expires) VALUES (?, ?, ?)",
+                (key, str(os.getpid()), now + self.lease_seconds),
+            ).rowcount
+        return inserted == 1
+
+    def _held(self, key):
+        if not self.db_path:
+            return False
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM inflight WHERE key = ? AND expires >= ?",
+                (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def _release(self, key, result=None):
+        if not self.db_path:
+            return
+        try:
+            settled = json.dumps(result) if result is not None else None
+        except (TypeError, ValueError):
+            settled = None
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM inflight WHERE key = ? AND owner = ?",
+                         (key, str(os.getpid())))
+            conn.execute("DELETE FROM settled WHERE expires < ?", (now,))
+            if settled is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO settled (key, result, expires) "
+                    "VALUES (?, ?, ?)",
+                    (key, settled, now + self.result_seconds),
+                )
+
+    def _lookup(self, key, lookup):
+        """
+        Result for a waiter in another worker: the shared cache, else the
+        leader's settled result.
+        """
+        cached = lookup()
+        if cached is not None or not self.db_path:
+            return cached
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM settled WHERE key = ? AND expires >= ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
@@ -0,0 +1,19 @@
+(function pollJob() {
+  const status = document.getElementById("job-status");
+  function poll() {
+    fetch(window.location.href, { headers: { "Accept": "application/json" } })
+      .then(response => response.json())
+      .then(job => {
+        if (job.results_url) {
+          window.location.href = job.results_url;
+          return;
+        }
+        status.textContent = job.status === "queued"
+          ? "Waiting for a free evaluator…"
+          : "Evaluating your AI system idea…";
+        setTimeout(poll, 2000);
+      })
+      .catch(() => setTimeout(poll, 5000));
+  }
+  setTimeout(poll, 1000);
+})();
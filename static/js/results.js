@@ -0,0 +1,91 @@
+function startNewEvaluation() {
+  // Clear all form data from sessionStorage
+  Object.keys(sessionStorage).forEach(key => {
+    if (key.startsWith('gov_')) {
+      sessionStorage.removeItem(key);
+    }
+  });
+  // Redirect to the form
+  window.location.href = '/';
+}
+
+(function whatIf() {
+  const panel = document.getElementById("what-if");
+  if (!panel) return;
+  const selects = Array.from(panel.querySelectorAll("select[data-category]"));
+  const boxes = Array.from(panel.querySelectorAll(".what-if-vendors input"));
+  const baselineScore = Number(panel.dataset.baselineScore);
+  const scoreEl = document.getElementById("what-if-score");
+  const deltaEl = document.getElementById("what-if-delta");
+  const recommendationEl = document.getElementById("what-if-recommendation");
+  const vendorEl = document.getElementById("what-if-vendor-score");
+  let grid = null;
+
+  function signed(value) {
+    return value > 0 ? `+${value}` : `${value}`;
+  }
+
+  // Scores are laid out row-major with one axis per category, as in governance_score_grid()
+  function gridScore(tiers) {
+    let index = 0;
+    grid.categories.forEach((category, axis) => {
+      index = index * grid.shape[axis] + grid.tiers[category].indexOf(tiers[category]);
+    });
+    return grid.scores[index];
+  }
+
+  function recommendation(score) {
+    if (score >= grid.thresholds["GO"]) return "GO";
+    if (score >= grid.thresholds["GO WITH CONDITIONS"]) return "GO WITH CONDITIONS";
+    return "NO-GO";
+  }
+
+  function updateTiers() {
+    const tiers = {};
+    selects.forEach(select => { tiers[select.dataset.category] = select.value; });
+    selects.forEach(select => {
+      Array.from(select.options).forEach(option => {
+        const score = gridScore(Object.assign({}, tiers, { [select.dataset.category]: option.value }));
+        option.textContent = `${option.value} (${score})`;
+      });
+    });
+    const score = gridScore(tiers);
+    const delta = score - baselineScore;
+    scoreEl.textContent = score;
+    deltaEl.textContent = delta ? signed(delta) : "";
+    deltaEl.className = "what-if-delta" + (delta > 0 ? " up" : delta < 0 ? " down" : "");
+    recommendationEl.textContent = recommendation(score);
+  }
+
+  function updateVendors() {
+    const vendorIds = boxes.filter(box => box.checked).map(box => box.value);
+    fetch(panel.dataset.url, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "Accept": "application/json" },
+      body: JSON.stringify({ vendor_ids: vendorIds })
+    })
+      .then(response => response.json())
+      .then(result => {
+        const score = result.scenario.vendor_risk_score;
+        const delta = result.delta.vendor_risk_score;
+        vendorEl.textContent = score === null
+          ? "No vendors selected"
+          : `Vendor risk score: ${score}` + (delta ? ` (${signed(delta)})` : "");
+      });
+  }
+
+  fetch(panel.dataset.gridUrl)
+    .then(response => response.json())
+    .then(data => {
+      grid = data;
+      selects.forEach(select => {
+        grid.tiers[select.dataset.category].forEach(tier => {
+          const baseline = tier === select.dataset.baseline;
+          select.add(new Option(tier, tier, baseline, baseline));
+        });
+        select.addEventListener("change", updateTiers);
+      });
+      boxes.forEach(box => box.addEventListener("change", updateVendors));
+      updateTiers();
+    });
+})();
@@ -0,0 +1,231 @@
+// Simple multi-step wizard with basic persistence (fields retain values when moving back/next)
+let currentStep = 1;
+const totalSteps = 4;
+
+function showStep(step) {
+  currentStep = step;
+  document.querySelectorAll(".wizard-step").forEach(sec => {
+    sec.classList.toggle("active", Number(sec.dataset.step) === step);
+  });
+  document.querySelectorAll(".dot").forEach(dot => {
+    dot.classList.toggle("active", Number(dot.dataset.step) === step);
+  });
+}
+
+// Validation function for a step
+function validateStep(stepNum) {
+  const stepSection = document.querySelector(`.wizard-step[data-step="${stepNum}"]`);
+  const requiredFields = stepSection.querySelectorAll('[required]');
+  const summaryDiv = document.getElementById(`validation-summary-${stepNum}`);
+  let isValid = true;
+  let emptyCount = 0;
+  
+  // Clear previous validation states
+  requiredFields.forEach(field => {
+    field.classList.remove('invalid');
+  });
+  
+  // Check each required field
+  requiredFields.forEach(field => {
+    const value = field.value.trim();
+    if (!value) {
+      field.classList.add('invalid');
+      isValid = false;
+      emptyCount++;
+      
+      // Remove invalid class when user starts typing
+      field.addEventListener('input', function handler() {
+        if (this.value.trim()) {
+          this.classList.remove('invalid');
+        }
+        this.removeEventListener('input', handler);
+      });
+    }
+  });
+  
+  // Show or hide validation summary
+  if (summaryDiv) {
+    if (!isValid) {
+      summaryDiv.textContent = `Please fill in ${emptyCount} required field${emptyCount > 1 ? 's' : ''} highlighted below.`;
+      summaryDiv.classList.add('visible');
+      // Scroll to first invalid field
+      const firstInvalid = stepSection.querySelector('.invalid');
+      if (firstInvalid) {
+        firstInvalid.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        firstInvalid.focus();
+      }
+    } else {
+      summaryDiv.classList.remove('visible');
+    }
+  }
+  
+  return isValid;
+}
+
+// Navigation with validation
+function nextStep(fromStep, toStep) {
+  if (validateStep(fromStep)) {
+    showStep(toStep);
+  }
+}
+
+// Navigation buttons
+document.getElementById("next1").onclick = () => nextStep(1, 2);
+document.getElementById("next2").onclick = () => nextStep(2, 3);
+document.getElementById("next3").onclick = () => nextStep(3, 4);
+document.getElementById("back2").onclick = () => showStep(1);
+document.getElementById("back3").onclick = () => showStep(2);
+document.getElementById("back4").onclick = () => showStep(3);
+
+// Validate step 4 before form submission
+document.getElementById("wizardForm").addEventListener("submit", function(e) {
+  if (!validateStep(4)) {
+    e.preventDefault();
+    return;
+  }
+  if (this.dataset.streamUrl && window.fetch && window.ReadableStream) {
+    e.preventDefault();
+    streamEvaluation(this);
+  }
+});
+
+// Streaming mode: show each section as the model writes it
+function streamEvaluation(form) {
+  const card = document.querySelector("main.card");
+  const formData = new FormData(form);
+  const wizard = Array.from(card.children);
+  const view = document.createElement("div");
+  view.innerHTML =
+    '<div class="results-header"><h1>Governance Evaluation</h1>' +
+    '<p class="stream-status" id="stream-status">Evaluating your AI system idea…</p></div>' +
+    '<div class="result-content" id="stream-sections"></div>' +
+    '<div class="stream-pending" id="stream-pending"></div>';
+  wizard.forEach(el => { el.hidden = true; });
+  card.appendChild(view);
+  const status = document.getElementById("stream-status");
+  const sections = document.getElementById("stream-sections");
+  const pending = document.getElementById("stream-pending");
+
+  let received = false;
+  let finished = false;
+
+  function handleEvent(event, data) {
+    if (event === "delta") {
+      pending.textContent += data.text;
+    } else if (event === "section") {
+      sections.insertAdjacentHTML("beforeend", data.html);
+      pending.textContent = "";
+    } else if (event === "scores") {
+      status.textContent = "Calculating governance score…";
+    } else if (event === "done") {
+      finished = true;
+      window.location.href = data.redirect;
+    }
+  }
+
+  // Show an error in place of the stream, with a way back to the filled-in form
+  function showError(message) {
+    status.textContent = message;
+    status.classList.add("stream-error");
+    pending.textContent = "";
+    const back = document.createElement("button");
+    back.type = "button";
+    back.className = "btn-secondary";
+    back.textContent = "← Back to the form";
+    back.addEventListener("click", () => {
+      view.remove();
+      wizard.forEach(el => { el.hidden = false; });
+    });
+    view.appendChild(back);
+  }
+
+  fetch(form.dataset.streamUrl, {
+    method: "POST",
+    body: formData,
+    headers: { "Accept": "text/event-stream, application/json" }
+  })
+    .then(response => {
+      if (!response.ok) {
+        // The server turned the submission away (e.g. 429 when busy); resubmitting would too
+        received = true;
+        return response.json()
+          .catch(() => ({}))
+          .then(body => showError(body.error || `The evaluation could not be started (HTTP ${response.status}).`));
+      }
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      function read() {
+        return reader.read().then(({ done, value }) => {
+          if (done) {
+            if (!finished) showError("The evaluation stopped before it finished. Please try again.");
+            return;
+          }
+          received = true;
+          buffer += decoder.decode(value, { stream: true });
+          let boundary;
+          while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = "message";
+            let data = "";
+            raw.split("\n").forEach(line => {
+              if (line.startsWith("event: ")) event = line.slice(7);
+              else if (line.startsWith("data: ")) data += line.slice(6);
+            });
+            handleEvent(event, data ? JSON.parse(data) : {});
+          }
+          return read();
+        });
+      }
+      return read();
+    })
+    .catch(() => {
+      if (received) {
+        // The model call already ran; submitting again would pay for it twice
+        showError("The connection was lost during the evaluation. Please try again.");
+        return;
+      }
+      // Nothing came back: fall back to the regular blocking submission
+      view.remove();
+      wizard.forEach(el => { el.hidden = false; });
+      form.removeAttribute("data-stream-url");
+      form.submit();
+    });
+}
+
+// Optional: sessionStorage to survive refreshes
+const fields = document.querySelectorAll("input, textarea, select");
+fields.forEach(field => {
+  const key = "gov_" + field.id;
+  const saved = sessionStorage.getItem(key);
+  if (saved !== null) {
+    if (field.type === "checkbox") {
+      field.checked = saved === "true";
+    } else {
+      field.value = saved;
+    }
+  }
+  field.addEventListener("input", () => {
+    if (field.type === "checkbox") {
+      sessionStorage.setItem(key, field.checked);
+    } else {
+      sessionStorage.setItem(key, field.value);
+    }
+  });
+});
+
+// Conditional fields toggle for annotators section
+const annotatorsCheckbox = document.getElementById("uses_annotators");
+const annotatorFields = document.getElementById("annotator-fields");
+
+function toggleAnnotatorFields() {
+  if (annotatorsCheckbox.checked) {
+    annotatorFields.classList.add("visible");
+  } else {
+    annotatorFields.classList.remove("visible");
+  }
+}
+
+annotatorsCheckbox.addEventListener("change", toggleAnnotatorFields);
+toggleAnnotatorFields();
@@ -0,0 +1,196 @@
+"""
+Build and serve fingerprinted, pre-compressed static assets.
+
+The stylesheets and page scripts in static/ are minified, written to
+static/dist/ under names that carry a hash of their content, and
+pre-compressed with gzip (and brotli when the `brotli` package is installed).
+A manifest maps each source name to its built file, so templates link to
+the current version and browsers can cache every version forever.
+
+Run the build before starting the app (the deployment build step does this):
+
+    python static_assets.py
+
+Without a build the app links to the unminified sources in static/ instead.
+rjsmin and rcssmin are used for minifying when installed; otherwise a
+conservative built-in pass strips comments and whitespace.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+SOURCES = (
+    "style.css",
+    "css/results.css",
+    "css/assessments.css",
+    "js/wizard.js",
+    "js/results.js",
+    "js/job.js",
+)
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CSS_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE_RE = re.compile(r'\s+')
+# A space before ":" can be a descendant combinator (".a :hover"), so only the
+# space after goes
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,>])\s*|:\s+')
+
+
+def _minify_css_code(code):
+    code = CSS_SPACE_RE.sub(" ", code)
+    return CSS_PUNCTUATION_RE.sub(lambda match: match.group(1) or ":", code)
+
+
+def minify_css(text):
+    """Minify a stylesheet, leaving quoted strings untouched."""
+    try:
+        import rcssmin
+    except ImportError:
+        pass
+    else:
+        return rcssmin.cssmin(text)
+    text = CSS_COMMENT_RE.sub("", text)
+    parts = CSS_STRING_RE.split(text)
+    # Odd parts are the quoted strings captured by the split
+    minified = "".join(part if index % 2 else _minify_css_code(part)
+                       for index, part in enumerate(parts))
+    return minified.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """
+    Minify a script.
+
+    The built-in pass only drops indentation, blank lines and whole-line
+    comments: line breaks are kept so automatic semicolon insertion still
+    applies, and nothing inside a line (strings, regexes) is touched.
+    """
+    try:
+        import rjsmin
+    except ImportError:
+        pass
+    else:
+        return rjsmin.jsmin(text)
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+def compress(data):
+    """Yield (encoding, suffix, compressed bytes) for each available encoding."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        yield "br", ".br", brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical between builds
+    yield "gzip", ".gz", gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def build(static_dir, sources=SOURCES):
+    """
+    Minify, fingerprint and compress sources into static_dir/dist.
+
+    Returns:
+        Manifest dict mapping each source name to its built file name
+    """
+    dist = os.path.join(static_dir, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+    os.makedirs(dist)
+    manifest = {}
+    for name in sources:
+        with open(os.path.join(static_dir, name), encoding="utf-8") as f:
+            text = f.read()
+        minify = minify_css if name.endswith(".css") else minify_js
+        data = minify(text).encode("utf-8")
+        stem, ext = os.path.splitext(name)
+        built = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        path = os.path.join(dist, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        for _, suffix, compressed in compress(data):
+            # Only worth serving when it saves bytes
+            if len(compressed) < len(data):
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+        manifest[name] = built
+    with open(os.path.join(dist, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Built assets: fingerprinted names and the compressed variant to serve.
+
+    Args:
+        static_dir: The app's static folder; built files are in its dist/
+    """
+
+    def __init__(self, static_dir):
+        self.dist = os.path.join(static_dir, DIST_DIR)
+        self.built = {}
+        try:
+            with open(os.path.join(self.dist, MANIFEST), encoding="utf-8") as f:
+                self.built = json.load(f)
+        except FileNotFoundError:
+            pass
+        self.files = set(self.built.values())
+
+    def get(self, name):
+        """Built file name for a source, or None when assets haven't been built."""
+        return self.built.get(name)
+
+    def variant(self, filename, accept_encodings):
+        """
+        Pick the file to send for a built asset.
+
+        Args:
+            filename: Built file name from the manifest
+            accept_encodings: The request's parsed Accept-Encoding header
+
+        Returns:
+            (path, content encoding or None), or (None, None) for an unknown file
+        """
+        if filename not in self.files:
+            return None, None
+        path = os.path.join(self.dist, filename)
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and os.path.exists(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build fingerprinted, compressed static assets.")
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument("--static-dir", default=os.path.join(here, "static"),
+                        help="Static folder holding the sources (default: ./static)")
+    args = parser.parse_args(argv)
+
+    manifest = build(args.static_dir)
+    dist = os.path.join(args.static_dir, DIST_DIR)
+    for name, built in sorted(manifest.items()):
+        source = os.path.getsize(os.path.join(args.static_dir, name))
+        sizes = [f"{os.path.getsize(os.path.join(dist, built))} min"]
+        sizes += [f"{os.path.getsize(os.path.join(dist, built + suffix))} {encoding}"
+                  for encoding, suffix in ENCODINGS
+                  if os.path.exists(os.path.join(dist, built + suffix))]
+        print(f"{name:<24} {source:>7} -> {', '.join(sizes)}  ({built})",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
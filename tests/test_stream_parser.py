@@ -0,0 +1,53 @@
+import json
+import random
+
+import pytest
+
+import main
+from assessment_parser import parse_assessment
+
+TIERS = {key: next(iter(tier_map)) for key, tier_map in main.GOVERNANCE_WEIGHTS.items()}
+BODY = (
+    "### 1. SYSTEM INTAKE\nA screening assistant.\n\n"
+    "```python\nprint({'kept': True})\n```\n\n"
+    "### 6. FEASIBILITY GATE (GO / NO-GO)\n**GO**\n"
+    '{"example": "not a tier block"}\n\n---\n\n'
+)
+TRAILERS = {
+    "fenced": f"```json\n{json.dumps(TIERS, indent=2)}\n```\n",
+    "fenced_inline": f"```json {json.dumps(TIERS)}```",
+    "bare": f"{json.dumps(TIERS)}\n",
+    "bare_multiline": json.dumps(TIERS, indent=2),
+}
+
+
+def stream(raw, seed):
+    """Feed raw to a stream parser in random chunks; return its events and result."""
+    chunks = random.Random(seed)
+    parser = main.AssessmentStreamParser()
+    events = []
+    start = 0
+    while start < len(raw):
+        size = chunks.randint(1, 9)
+        events += parser.feed(raw[start:start + size])
+        start += size
+    closing, raw_result = parser.close()
+    return events + closing, raw_result
+
+
+@pytest.mark.parametrize("trailer", TRAILERS.values(), ids=TRAILERS.keys())
+@pytest.mark.parametrize("seed", range(20))
+def test_tier_trailer_is_held_back(trailer, seed):
+    raw = BODY + trailer
+    assert parse_assessment(raw, main.GOVERNANCE_WEIGHTS).tiers == TIERS
+
+    events, raw_result = stream(raw, seed)
+
+    assert raw_result == raw
+    shown = "".join(data["text"] for event, data in events if event == "delta")
+    html = "".join(data["html"] for event, data in events if event == "section")
+    for key in TIERS:
+        assert key not in shown
+        assert key not in html
+    assert "print({'kept': True})" in shown
+    assert "not a tier block" in shown
@@ -0,0 +1,54 @@
+"""
+Per-request trace IDs for log correlation.
+
+A trace ID is taken from the incoming X-Request-ID header (or generated),
+held in a context variable for the rest of the request and added to every
+log record, so all lines logged while handling one request can be grepped
+together. Background work carries the ID of the request that queued it.
+"""
+import logging
+import re
+import uuid
+from contextvars import ContextVar
+
+TRACE_HEADER = "X-Request-ID"
+TRACE_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+LOG_FORMAT = ("[%(asctime)s] %(levelname)s in %(module)s [trace=%(trace_id)s]: "
+              "%(message)s")
+
+_trace_id = ContextVar("trace_id", default="-")
+
+
+def new_trace_id(incoming=None):
+    """Reuse a well-formed incoming trace ID or generate a fresh one."""
+    if incoming and TRACE_ID_RE.fullmatch(incoming):
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+def set_trace_id(trace_id):
+    """Make trace_id current; returns a token for reset_trace_id."""
+    return _trace_id.set(trace_id)
+
+
+def reset_trace_id(token):
+    _trace_id.reset(token)
+
+
+class TraceIdFilter(logging.Filter):
+    """Attach the current trace ID to log records as %(trace_id)s."""
+
+    def filter(self, record):
+        record.trace_id = _trace_id.get()
+        return True
+
+
+def install_log_format(logger):
+    """Add trace IDs to a logger's handlers."""
+    for handler in logger.handlers:
+        handler.addFilter(TraceIdFilter())
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
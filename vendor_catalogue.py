@@ -0,0 +1,217 @@
+"""
+Vendor catalogue loaded from a JSON data file.
+
+The catalogue is parsed lazily on first use, indexed once per load and
+reloaded automatically when the file changes on disk, so adding a vendor no
+longer needs a redeploy.
+"""
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+
+from vendor_matcher import VendorMatcher
+
+SEVERITIES = ("high", "medium", "low")
+# Points deducted from the vendor risk score per risk flag of each severity
+SEVERITY_POINTS = {"high": 10, "medium": 5, "low": 2}
+
+
+def _numpy():
+    """NumPy, imported on first use; only batch portfolio scoring needs it."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def count_risks(vendor):
+    """Count a vendor profile's risk flags as a (high, medium, low) tuple."""
+    counts = dict.fromkeys(SEVERITIES, 0)
+    for risk in vendor.get("risks", []):
+        if risk["severity"] in counts:
+            counts[risk["severity"]] += 1
+    return tuple(counts[severity] for severity in SEVERITIES)
+
+
+def risk_deduction(counts):
+    """Total points a (high, medium, low) count tuple deducts from the score."""
+    return sum(count * SEVERITY_POINTS[severity]
+               for severity, count in zip(SEVERITIES, counts, strict=True))
+
+
+class CatalogueSnapshot:
+    """
+    Immutable view of one catalogue load with its precomputed indexes.
+
+    A reload builds a new snapshot and swaps it in whole, so readers never see
+    a half-updated catalogue.
+    """
+
+    def __init__(self, vendors, version, mtime):
+        self.vendors = vendors
+        self.version = version
+        self.mtime = mtime
+        self.by_id = {}
+        self.by_alias = {}
+        self.by_category = {}
+        self.by_transparency = {}
+        # Compact per-vendor risk records: row i of risk_matrix holds the
+        # (high, medium, low) counts of vendors[i] and deductions[i] its points
+        self.row = {}
+        self.risk_matrix = []
+        self.deductions = []
+        for vendor in vendors:
+            vendor_id = vendor["id"]
+            self.by_id[vendor_id] = vendor
+            for alias in [*vendor.get("aliases", []), vendor["name"]]:
+                self.by_alias.setdefault(alias.lower(), vendor_id)
+            self.by_category.setdefault(vendor.get("category", ""), []).append(vendor)
+            level = vendor.get("transparency", {}).get("level", "")
+            self.by_transparency.setdefault(level, []).append(vendor)
+            counts = count_risks(vendor)
+            self.row[vendor_id] = len(self.risk_matrix)
+            self.risk_matrix.append(counts)
+            self.deductions.append(risk_deduction(counts))
+        self._deduction_array = None
+        self.matcher = VendorMatcher(vendors)
+
+    def deduction_array(self, np):
+        """Per-row deductions as a NumPy array, built on first portfolio scoring."""
+        if self._deduction_array is None:
+            self._deduction_array = np.array(self.deductions, dtype=np.int64)
+        return self._deduction_array
+
+    def risk_record(self, vendor):
+        """Return the (counts, deduction) record for a vendor profile."""
+        row = self.row.get(vendor["id"])
+        # Vendors no longer in the catalogue (e.g. from an old session) are counted
+        # directly
+        if row is None:
+            counts = count_risks(vendor)
+            return counts, risk_deduction(counts)
+        return self.risk_matrix[row], self.deductions[row]
+
+
+class VendorCatalogue:
+    """
+    Lazily loaded, hot-reloading vendor catalogue.
+
+    Args:
+        path: JSON file holding a list of vendor profiles
+        check_interval: Minimum seconds between checks for a changed file
+    """
+
+    def __init__(self, path, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self._snapshot = None
+        self._checked = 0.0
+
+    def snapshot(self):
+        """Return the current snapshot, loading or reloading the file if needed."""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked < self.check_interval:
+            return snapshot
+        with self.lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                if self._snapshot is None:
+                    raise
+                return self._snapshot
+            if self._snapshot is None or mtime != self._snapshot.mtime:
+                self._snapshot = self._load(mtime)
+            return self._snapshot
+
+    def reload(self):
+        """Force a reload from disk and return the new snapshot."""
+        with self.lock:
+            self._snapshot = self._load(os.stat(self.path).st_mtime_ns)
+            self._checked = time.monotonic()
+            return self._snapshot
+
+    def _load(self, mtime):
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        vendors = json.loads(raw)
+        return CatalogueSnapshot(vendors, hashlib.sha256(raw).hexdigest(), mtime)
+
+    @property
+    def vendors(self):
+        return self.snapshot().vendors
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    def get(self, vendor_id):
+        return self.snapshot().by_id.get(vendor_id)
+
+    def by_alias(self, alias):
+        snapshot = self.snapshot()
+        return snapshot.by_id.get(snapshot.by_alias.get(alias.lower()))
+
+    def by_category(self, category):
+        return list(self.snapshot().by_category.get(category, []))
+
+    def by_transparency(self, level):
+        return list(self.snapshot().by_transparency.get(level, []))
+
+    def risk_counts(self, vendor):
+        """Return a vendor's precomputed risk flag counts keyed by severity."""
+        counts, _ = self.snapshot().risk_record(vendor)
+        return dict(zip(SEVERITIES, counts, strict=True))
+
+    def risk_deduction(self, vendors):
+        """Sum the precomputed score deductions for a list of vendor profiles."""
+        snapshot = self.snapshot()
+        return sum(snapshot.risk_record(vendor)[1] for vendor in vendors)
+
+    def score_portfolios(self, portfolios):
+        """
+        Score many vendor sets at once for portfolio-level reporting.
+
+        Args:
+            portfolios: Iterable of vendor ID lists; unknown IDs are ignored
+
+        Returns:
+            NumPy float array of vendor risk scores (0-100), NaN where a
+            portfolio has no known vendors
+        """
+        np = _numpy()
+        if np is None:
+            raise RuntimeError(
+                "Batch portfolio scoring requires NumPy (pip install numpy)"
+            )
+        snapshot = self.snapshot()
+        portfolios = list(portfolios)
+        count = len(portfolios)
+        # Flatten every portfolio's IDs, tagging each with its portfolio's
+        # position, and look up their rows (-1 when unknown) with C-level
+        # map/fromiter rather than a Python loop per vendor
+        sizes = np.fromiter(map(len, portfolios), dtype=np.int64, count=count)
+        owners = np.repeat(np.arange(count, dtype=np.int64), sizes)
+        vendor_ids = itertools.chain.from_iterable(portfolios)
+        rows = np.fromiter(map(snapshot.row.get, vendor_ids, itertools.repeat(-1)),
+                           dtype=np.int64, count=len(owners))
+        known = rows >= 0
+        owners = owners[known]
+        rows = rows[known]
+        deducted = np.bincount(owners, weights=snapshot.deduction_array(np)[rows],
+                               minlength=count)
+        matched = np.bincount(owners, minlength=count)
+        scores = np.clip(100.0 - deducted, 0, 100)
+        scores[matched == 0] = np.nan
+        return scores
+
+    def find(self, text):
+        """Return the vendors mentioned in text, in catalogue order."""
+        snapshot = self.snapshot()
+        return [snapshot.by_id[vendor_id] for vendor_id in snapshot.matcher.match(text)]
@@ -0,0 +1,103 @@
+"""
+Aho-Corasick matcher for vendor aliases.
+
+The automaton is compiled once from the vendor catalogue and then finds every
+alias in a single linear pass over the input, regardless of catalogue size.
+"""
+from collections import deque
+
+
+def is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+class VendorMatcher:
+    """
+    Compiled multi-pattern matcher mapping aliases to vendor IDs.
+
+    Matches are case-insensitive and only count when the alias is not
+    embedded in a longer word, so "gpt" does not fire inside "chatgpts".
+
+    Args:
+        vendors: Vendor dicts with "id", "name" and "aliases"
+    """
+
+    def __init__(self, vendors):
+        # Trie stored as parallel lists: goto transitions, failure links and outputs
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.vendor_order = {}
+        for position, vendor in enumerate(vendors):
+            self.vendor_order[vendor["id"]] = position
+            for alias in [*vendor.get("aliases", []), vendor["name"]]:
+                self._add(alias.lower(), vendor["id"])
+        self._build_failure_links()
+
+    def _add(self, pattern, vendor_id):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = next_state
+            state = next_state
+        self.output[state].append((len(pattern), vendor_id))
+
+    def _build_failure_links(self):
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = (self.output[next_state]
+                                           + self.output[self.fail[next_state]])
+
+    def find_spans(self, text):
+        """
+        Find every word-bounded alias occurrence in text.
+
+        Returns:
+            List of (start, end, vendor_id) tuples in order of their end offset
+        """
+        spans = []
+        if not text:
+            return spans
+        lowered = text.lower()
+        # Lowercasing can change string length for a few characters; fall back
+        # to offsets in the lowered text in that case
+        source = text if len(lowered) == len(text) else lowered
+        length = len(lowered)
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for index, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            after_ok = end == length or not is_word_char(source[end])
+            for pattern_length, vendor_id in output[state]:
+                start = end - pattern_length
+                before_ok = start == 0 or not is_word_char(source[start - 1])
+                if before_ok and after_ok:
+                    spans.append((start, end, vendor_id))
+        return spans
+
+    def match(self, text):
+        """Return the IDs of vendors mentioned in text, in catalogue order."""
+        found = {vendor_id for _, _, vendor_id in self.find_spans(text)}
+        return sorted(found, key=self.vendor_order.__getitem__)